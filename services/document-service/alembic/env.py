@@ -8,8 +8,11 @@ from alembic import context
 import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'app')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from models.document import Base
+from app.core.config import settings
+from app.db.session import sync_database_url
 
 
 # this is the Alembic Config object, which provides
@@ -21,6 +24,10 @@ config = context.config
 if config.config_file_name is not None:
     fileConfig(config.config_file_name)
 
+# Migrate the database the service runs against, not the placeholder in alembic.ini
+# (% is doubled because the config is an interpolating ConfigParser)
+config.set_main_option("sqlalchemy.url", sync_database_url(settings.DATABASE_URL).replace("%", "%%"))
+
 # add your model's MetaData object here
 # for 'autogenerate' support
 # from myapp import mymodel
@@ -0,0 +1,30 @@
+"""Add chunking config splitter engine
+
+Revision ID: 2d6e8b4a9c13
+Revises: f19a4c7d2b88
+Create Date: 2026-10-18 15:56:12.408215
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2d6e8b4a9c13'
+down_revision: Union[str, None] = 'f19a4c7d2b88'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('chunking_configs') as batch_op:
+        batch_op.add_column(sa.Column('splitter_engine', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('chunking_configs') as batch_op:
+        batch_op.drop_column('splitter_engine')
@@ -0,0 +1,32 @@
+"""Add document content hash
+
+Revision ID: 7a1c5e2f9b30
+Revises: 3f2b9c1d7e4a
+Create Date: 2026-10-18 10:02:37.114902
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7a1c5e2f9b30'
+down_revision: Union[str, None] = '3f2b9c1d7e4a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('documents') as batch_op:
+        batch_op.add_column(sa.Column('content_hash', sa.String(length=64), nullable=True))
+        batch_op.create_index(batch_op.f('ix_documents_content_hash'), ['content_hash'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('documents') as batch_op:
+        batch_op.drop_index(batch_op.f('ix_documents_content_hash'))
+        batch_op.drop_column('content_hash')
@@ -0,0 +1,64 @@
+"""Add chunking config versions and per-config chunk sets
+
+Revision ID: 9b4e1f6a2c75
+Revises: 2d6e8b4a9c13
+Create Date: 2026-10-18 16:21:40.118302
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9b4e1f6a2c75'
+down_revision: Union[str, None] = '2d6e8b4a9c13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('chunking_configs') as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), nullable=False, server_default='1'))
+        batch_op.add_column(sa.Column('created_at', sa.DateTime(timezone=True), nullable=True))
+    with op.batch_alter_table('documents') as batch_op:
+        batch_op.add_column(sa.Column('page_offsets', sa.JSON(), nullable=True))
+        batch_op.add_column(sa.Column('active_chunking_config_id', sa.String(), nullable=True))
+    with op.batch_alter_table('document_chunks') as batch_op:
+        batch_op.add_column(sa.Column('chunking_config_id', sa.String(), nullable=True))
+    # Until now a document had exactly one config, and its chunks were that config's chunk set
+    op.execute(
+        "UPDATE documents SET active_chunking_config_id = ("
+        "SELECT id FROM chunking_configs "
+        "WHERE chunking_configs.document_id = documents.id LIMIT 1)"
+    )
+    op.execute(
+        "UPDATE document_chunks SET chunking_config_id = ("
+        "SELECT active_chunking_config_id FROM documents "
+        "WHERE documents.id = document_chunks.document_id)"
+    )
+    op.create_index(
+        'ix_document_chunks_chunking_config_id_chunk_index', 'document_chunks',
+        ['chunking_config_id', 'chunk_index'], unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Only the active chunk set of each document survives the downgrade
+    op.execute(
+        "DELETE FROM document_chunks WHERE chunking_config_id IS NOT NULL AND chunking_config_id != ("
+        "SELECT active_chunking_config_id FROM documents "
+        "WHERE documents.id = document_chunks.document_id)"
+    )
+    op.drop_index('ix_document_chunks_chunking_config_id_chunk_index', table_name='document_chunks')
+    with op.batch_alter_table('document_chunks') as batch_op:
+        batch_op.drop_column('chunking_config_id')
+    with op.batch_alter_table('documents') as batch_op:
+        batch_op.drop_column('active_chunking_config_id')
+        batch_op.drop_column('page_offsets')
+    with op.batch_alter_table('chunking_configs') as batch_op:
+        batch_op.drop_column('created_at')
+        batch_op.drop_column('version')
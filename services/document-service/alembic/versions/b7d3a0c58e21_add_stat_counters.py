@@ -0,0 +1,50 @@
+"""Add stat counters
+
+Revision ID: b7d3a0c58e21
+Revises: 9b4e1f6a2c75
+Create Date: 2026-10-18 16:34:05.527194
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d3a0c58e21'
+down_revision: Union[str, None] = '9b4e1f6a2c75'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'stat_counters',
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('value', sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint('name')
+    )
+    # Seed the counters from the existing rows; from here on writes keep them current
+    op.execute(
+        "INSERT INTO stat_counters (name, value) "
+        "SELECT 'documents', COUNT(*) FROM documents "
+        "UNION ALL SELECT 'bytes_ingested', COALESCE(SUM(file_size), 0) FROM documents "
+        "UNION ALL SELECT 'chunks', COUNT(*) FROM document_chunks "
+        "UNION ALL SELECT 'chunk_characters', COALESCE(SUM(content_length), 0) FROM document_chunks"
+    )
+    op.execute(
+        "INSERT INTO stat_counters (name, value) "
+        "SELECT 'status:' || processing_status, COUNT(*) FROM documents "
+        "WHERE processing_status IS NOT NULL GROUP BY processing_status"
+    )
+    op.execute(
+        "INSERT INTO stat_counters (name, value) "
+        "SELECT 'content_type:' || content_type, COUNT(*) FROM documents GROUP BY content_type"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('stat_counters')
@@ -0,0 +1,43 @@
+"""Store extraction metadata once per document
+
+Revision ID: c84d2e6b1f57
+Revises: 7a1c5e2f9b30
+Create Date: 2026-10-18 10:41:15.902113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c84d2e6b1f57'
+down_revision: Union[str, None] = '7a1c5e2f9b30'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('documents') as batch_op:
+        batch_op.add_column(sa.Column('extraction_metadata', sa.JSON(), nullable=True))
+    # Every chunk of a document carried the same document-level dict; keep one copy
+    op.execute(
+        "UPDATE documents SET extraction_metadata = ("
+        "SELECT chunk_metadata FROM document_chunks "
+        "WHERE document_chunks.document_id = documents.id "
+        "ORDER BY chunk_index LIMIT 1)"
+    )
+    op.execute("UPDATE document_chunks SET chunk_metadata = NULL")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute(
+        "UPDATE document_chunks SET chunk_metadata = ("
+        "SELECT extraction_metadata FROM documents "
+        "WHERE documents.id = document_chunks.document_id)"
+    )
+    with op.batch_alter_table('documents') as batch_op:
+        batch_op.drop_column('extraction_metadata')
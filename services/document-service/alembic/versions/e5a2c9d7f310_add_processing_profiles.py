@@ -0,0 +1,50 @@
+"""Add processing profiles
+
+Revision ID: e5a2c9d7f310
+Revises: b7d3a0c58e21
+Create Date: 2026-10-18 16:52:41.208337
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5a2c9d7f310'
+down_revision: Union[str, None] = 'b7d3a0c58e21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('processing_jobs') as batch_op:
+        batch_op.add_column(
+            sa.Column('profile_requested', sa.Boolean(), nullable=False, server_default='0')
+        )
+    op.create_table(
+        'processing_profiles',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('document_id', sa.String(), nullable=False),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('total_seconds', sa.Float(), nullable=True),
+        sa.Column('stages', sa.JSON(), nullable=True),
+        sa.Column('summary', sa.Text(), nullable=True),
+        sa.Column('profile_data', sa.LargeBinary(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['document_id'], ['documents.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_processing_profiles_document_id'), 'processing_profiles', ['document_id'], unique=False)
+    op.create_index(op.f('ix_processing_profiles_created_at'), 'processing_profiles', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_processing_profiles_created_at'), table_name='processing_profiles')
+    op.drop_index(op.f('ix_processing_profiles_document_id'), table_name='processing_profiles')
+    op.drop_table('processing_profiles')
+    with op.batch_alter_table('processing_jobs') as batch_op:
+        batch_op.drop_column('profile_requested')
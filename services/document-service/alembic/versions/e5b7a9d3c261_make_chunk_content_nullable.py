@@ -0,0 +1,38 @@
+"""Make chunk content nullable for offsets-only storage
+
+Revision ID: e5b7a9d3c261
+Revises: c84d2e6b1f57
+Create Date: 2026-10-18 11:20:48.337605
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5b7a9d3c261'
+down_revision: Union[str, None] = 'c84d2e6b1f57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('document_chunks') as batch_op:
+        batch_op.alter_column('content', existing_type=sa.Text(), nullable=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Materialize offsets-only chunks before restoring the NOT NULL constraint
+    op.execute(
+        "UPDATE document_chunks SET content = ("
+        "SELECT substr(documents.content, document_chunks.start_pos + 1, "
+        "document_chunks.end_pos - document_chunks.start_pos) "
+        "FROM documents WHERE documents.id = document_chunks.document_id) "
+        "WHERE content IS NULL"
+    )
+    with op.batch_alter_table('document_chunks') as batch_op:
+        batch_op.alter_column('content', existing_type=sa.Text(), nullable=False)
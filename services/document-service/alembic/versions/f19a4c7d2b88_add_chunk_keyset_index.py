@@ -0,0 +1,28 @@
+"""Add (document_id, chunk_index) index for keyset pagination
+
+Revision ID: f19a4c7d2b88
+Revises: e5b7a9d3c261
+Create Date: 2026-10-18 11:58:03.640517
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f19a4c7d2b88'
+down_revision: Union[str, None] = 'e5b7a9d3c261'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_document_chunks_document_id_chunk_index', 'document_chunks', ['document_id', 'chunk_index'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_document_chunks_document_id_chunk_index', table_name='document_chunks')
@@ -1,9 +1,97 @@
+from typing import List
+
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
     DATABASE_URL: str = "sqlite:///./app.db"
+    # Async engine pool (the driver is swapped for aiosqlite/asyncpg); pre-ping
+    # replaces connections the database dropped while they sat idle
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT_SECONDS: float = 30.0
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    # SQLite pragmas applied to every connection: WAL lets readers run during a
+    # write, NORMAL synchronous drops the fsync per commit (WAL stays
+    # consistent), and mmap/page cache sizes are per connection
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_MMAP_SIZE_MB: int = 256
+    SQLITE_CACHE_SIZE_MB: int = 64
+    # On SQLite, writes go through one task that commits up to DB_WRITE_GROUP_MAX
+    # queued writes per transaction
+    SQLITE_GROUP_COMMIT: bool = True
+    DB_WRITE_GROUP_MAX: int = 128
     ALLOWED_ORIGINS: str = "*"
 
+    # Uploads are streamed to disk in fixed-size chunks
+    MAX_UPLOAD_SIZE_MB: int = 512
+    UPLOAD_CHUNK_SIZE_BYTES: int = 1024 * 1024
+
+    # Batch uploads: files stored concurrently, documents registered per transaction,
+    # at most BATCH_MAX_FILES files per request (archive members included); an archive
+    # may expand to at most BATCH_MAX_EXPANDED_SIZE_MB of members in total
+    BATCH_UPLOAD_CONCURRENCY: int = 8
+    BATCH_INSERT_SIZE: int = 500
+    BATCH_MAX_FILES: int = 10000
+    BATCH_MAX_ARCHIVE_SIZE_MB: int = 4096
+    BATCH_MAX_EXPANDED_SIZE_MB: int = 16384
+
+    # Background processing queue (0 workers = one per core)
+    WORKER_CONCURRENCY: int = 0
+    JOB_MAX_ATTEMPTS: int = 3
+    JOB_RETRY_BACKOFF_SECONDS: float = 5.0
+    JOB_POLL_INTERVAL_SECONDS: float = 2.0
+
+    # Process pool for CPU-bound extraction and splitting (0 workers = one per core)
+    PROCESS_POOL_WORKERS: int = 0
+    PROCESS_TASK_TIMEOUT_SECONDS: float = 300.0
+    PROCESS_TASK_MEMORY_LIMIT_MB: int = 2048
+
+    # Per-process caches of tiktoken encoders (preloaded in pool workers) and text splitters
+    WARM_ENCODINGS: List[str] = ["cl100k_base"]
+    SPLITTER_CACHE_SIZE: int = 64
+    # Threads per encode_batch call; pool workers already use every core, so keep this low
+    TOKEN_BATCH_THREADS: int = 1
+    # Local tokenizer.json for the "huggingface" length function; never downloaded
+    HUGGINGFACE_TOKENIZER_PATH: str = "tokenizers/tokenizer.json"
+
+    # CSV/Excel extraction: rows parsed per pandas batch, and rows per header-led
+    # group in the extracted text
+    TABULAR_READ_BATCH_ROWS: int = 10000
+    TABULAR_ROWS_PER_GROUP: int = 50
+
+    # Plain-text extraction detects the encoding from at most this many bytes
+    # at the start of the file (and again near the first undecodable byte)
+    TEXT_ENCODING_SAMPLE_BYTES: int = 64 * 1024
+
+    # In-memory LRU of extracted text keyed by upload SHA-256
+    EXTRACTION_CACHE_MAX_MB: int = 256
+
+    # Rows per executemany batch when writing document chunks
+    CHUNK_INSERT_BATCH_SIZE: int = 1000
+    # "full" stores chunk text in every row; "offsets" stores only start/end
+    # offsets and slices chunk text out of Document.content on read
+    CHUNK_STORAGE_MODE: str = "full"
+    # Rows fetched per keyset page when streaming a chunk export
+    CHUNK_EXPORT_BATCH_SIZE: int = 500
+
+    # /stats reads counters kept up to date by every write; a background job can
+    # rescan the tables and repair drift every this many seconds (0 = never)
+    STATS_RECONCILE_INTERVAL_SECONDS: float = 0
+
+    # Event-loop lag (how late a timed wakeup runs) is sampled this often and
+    # reported on /metrics (0 = off)
+    EVENT_LOOP_LAG_INTERVAL_SECONDS: float = 0.25
+
+    # Processing profiles: an upload sent with X-Profile-Processing (honoured while
+    # PROFILE_HEADER_ENABLED) or any document when PROFILE_ALL_DOCUMENTS is set
+    # is processed under cProfile; the newest PROFILE_MAX_KEPT profiles are kept
+    PROFILE_HEADER_ENABLED: bool = True
+    PROFILE_ALL_DOCUMENTS: bool = False
+    PROFILE_MAX_KEPT: int = 50
+    PROFILE_SUMMARY_LINES: int = 40
+
     class Config:
         env_file = ".env"
 
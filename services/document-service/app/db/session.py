@@ -1,10 +1,79 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 
 from app.core.config import settings
 
-engine = create_engine(
-    settings.DATABASE_URL, connect_args={"check_same_thread": False}
-)
+# Async driver for each backend; alembic migrates DATABASE_URL with the sync one
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+}
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
\ No newline at end of file
+
+def async_database_url(url: str) -> str:
+    """Swap a sync driver for its async counterpart; URLs that already name one are kept"""
+    parsed = make_url(url)
+    backend, _, driver_name = parsed.drivername.partition("+")
+    driver = ASYNC_DRIVERS.get(backend)
+    if driver is None or driver_name in ("aiosqlite", "asyncpg"):
+        return url
+    return parsed.set(drivername=driver).render_as_string(hide_password=False)
+
+
+# Sync driver for each backend, for alembic
+SYNC_DRIVERS = {
+    "sqlite": "sqlite",
+    "postgresql": "postgresql+psycopg2",
+    "postgres": "postgresql+psycopg2",
+}
+
+
+def sync_database_url(url: str) -> str:
+    """Swap an async driver for its sync counterpart; URLs that already name a sync one are kept"""
+    parsed = make_url(url)
+    backend, _, driver_name = parsed.drivername.partition("+")
+    driver = SYNC_DRIVERS.get(backend)
+    if driver is None or (driver_name and driver_name not in ("aiosqlite", "asyncpg")):
+        return url
+    return parsed.set(drivername=driver).render_as_string(hide_password=False)
+
+
+def _engine_options(url: str) -> dict:
+    options = {"pool_pre_ping": settings.DB_POOL_PRE_PING}
+    parsed = make_url(url)
+    if parsed.drivername.startswith("sqlite") and parsed.database in (None, "", ":memory:"):
+        # An in-memory database lives in one connection; a sized pool would hand out empty ones
+        return options
+    options.update(
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+        pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+    )
+    return options
+
+
+def sqlite_pragmas() -> list:
+    return [
+        f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}",
+        f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}",
+        f"PRAGMA mmap_size={settings.SQLITE_MMAP_SIZE_MB * 1024 * 1024}",
+        # Negative cache_size is in KiB rather than pages
+        f"PRAGMA cache_size={-settings.SQLITE_CACHE_SIZE_MB * 1024}",
+    ]
+
+
+engine = create_async_engine(async_database_url(settings.DATABASE_URL), **_engine_options(settings.DATABASE_URL))
+
+if engine.dialect.name == "sqlite":
+    @event.listens_for(engine.sync_engine, "connect")
+    def _configure_sqlite(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in sqlite_pragmas():
+            cursor.execute(pragma)
+        cursor.close()
+
+# Objects stay usable after commit; async sessions cannot lazy-load expired attributes
+SessionLocal = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
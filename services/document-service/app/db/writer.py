@@ -0,0 +1,121 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, List, Optional, Tuple, TypeVar
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.session import SessionLocal, engine
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+# A write: applies its changes to the session it is given and never commits
+WriteOperation = Callable[[AsyncSession], Awaitable[T]]
+_Pending = Tuple[WriteOperation, asyncio.Future]
+
+
+class DatabaseWriter:
+    """Single task that applies queued writes in order and commits them in groups.
+
+    SQLite admits one writer at a time, so concurrent sessions only take turns
+    on the database lock. Funnelling writes through one task turns that into
+    a queue, and whatever queued up while the previous group was committing
+    goes into the next transaction together. If a write in a group fails, the
+    group is rolled back and its writes are retried one transaction each, so
+    only the failing write reports an error.
+
+    While the writer is not running (other databases, scripts, or before
+    startup) each write runs in its own session and transaction instead.
+    """
+
+    def __init__(self, max_group: int = settings.DB_WRITE_GROUP_MAX):
+        self.max_group = max_group
+        self.groups = 0
+        self.writes = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return settings.SQLITE_GROUP_COMMIT and engine.dialect.name == "sqlite"
+
+    def depth(self) -> int:
+        """Number of writes waiting for the next group"""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def start(self):
+        if self._task is not None or not self.enabled:
+            return
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run(), name="db-writer")
+
+    async def stop(self):
+        """Commit everything already queued, then stop the task"""
+        if self._task is None:
+            return
+        self._queue.put_nowait(None)
+        await self._task
+        self._task = None
+        self._queue = None
+
+    async def run(self, operation: WriteOperation) -> Any:
+        """Apply one write and return its result once it is committed"""
+        if self._task is None:
+            async with SessionLocal() as session:
+                result = await operation(session)
+                await session.commit()
+                return result
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((operation, future))
+        return await future
+
+    async def _run(self):
+        while True:
+            item = await self._queue.get()
+            stopping = item is None
+            group: List[_Pending] = [] if stopping else [item]
+            while len(group) < self.max_group and not self._queue.empty():
+                item = self._queue.get_nowait()
+                if item is None:
+                    stopping = True
+                else:
+                    group.append(item)
+            group = [(operation, future) for operation, future in group if not future.cancelled()]
+            if group:
+                try:
+                    await self._commit_group(group)
+                except Exception as e:  # connection-level failure; keep serving later writes
+                    logger.exception("Database writer failed to commit a group of %s writes", len(group))
+                    for _, future in group:
+                        if not future.done():
+                            future.set_exception(e)
+            if stopping and self._queue.empty():
+                return
+
+    async def _commit_group(self, group: List[_Pending]):
+        async with SessionLocal() as session:
+            try:
+                results = []
+                for operation, _ in group:
+                    results.append(await operation(session))
+                    # Later writes in the group see this one's rows
+                    await session.flush()
+                await session.commit()
+            except Exception as e:
+                await session.rollback()
+                if len(group) == 1:
+                    if not group[0][1].done():
+                        group[0][1].set_exception(e)
+                    return
+                for pending in group:
+                    await self._commit_group([pending])
+                return
+        self.groups += 1
+        self.writes += len(group)
+        for (_, future), result in zip(group, results):
+            if not future.done():
+                future.set_result(result)
+
+
+db_writer = DatabaseWriter()
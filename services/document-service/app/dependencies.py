@@ -1,9 +1,8 @@
-from sqlalchemy.orm import Session
+from typing import AsyncIterator
+
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.session import SessionLocal
 
-def get_db():
-    db: Session = SessionLocal()
-    try:
+async def get_db() -> AsyncIterator[AsyncSession]:
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
\ No newline at end of file
@@ -1,11 +1,36 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.core.config import settings
-from app.routers import health, document, stats, splitter
+from app.db.session import engine
+from app.db.writer import db_writer
+from app.routers import health, document, stats, splitter, metrics, admin
+from app.services.job_queue import job_queue
+from app.services.metrics import loop_lag_monitor
+from app.services.process_pool import processing_pool
+from app.services.stats_counters import stats_reconciler
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Background workers drain queued uploads for the lifetime of the app
+    processing_pool.start()
+    await db_writer.start()
+    await job_queue.start()
+    await stats_reconciler.start()
+    await loop_lag_monitor.start()
+    yield
+    await loop_lag_monitor.stop()
+    await stats_reconciler.stop()
+    await job_queue.stop()
+    await db_writer.stop()
+    processing_pool.shutdown()
+    await engine.dispose()
 
 
-app = FastAPI(title="Document Chunking Service", version="1.0.0")
+app = FastAPI(title="Document Chunking Service", version="1.0.0", lifespan=lifespan)
 
 
 app.add_middleware(
@@ -20,4 +45,6 @@ app.add_middleware(
 app.include_router(health.router, prefix="/api/v1")
 app.include_router(document.router, prefix="/api/v1")
 app.include_router(stats.router, prefix="/api/v1")
-app.include_router(splitter.router, prefix="/api/v1")
\ No newline at end of file
+app.include_router(splitter.router, prefix="/api/v1")
+app.include_router(metrics.router, prefix="/api/v1")
+app.include_router(admin.router, prefix="/api/v1")
\ No newline at end of file
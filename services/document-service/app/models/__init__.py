@@ -1 +1,3 @@
-from .document import Document, DocumentChunk, ChunkingConfig
\ No newline at end of file
+from .document import (
+    Document, DocumentChunk, ChunkingConfig, ProcessingJob, ProcessingProfile, StatCounter
+)
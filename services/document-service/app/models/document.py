@@ -1,5 +1,8 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, JSON, ForeignKey
+from sqlalchemy import (
+    BigInteger, Boolean, Column, Float, Integer, LargeBinary, String, DateTime, Text, JSON, ForeignKey, Index
+)
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import deferred
 from sqlalchemy.sql import func
 import uuid
 
@@ -15,7 +18,11 @@ class Document(Base):
     file_size = Column(Integer, nullable=False)
     content_type = Column(String, nullable=False)
     file_extension = Column(String, nullable=True)
-    content = Column(Text)  # Extracted text content
+    content_hash = Column(String(64), nullable=True, index=True)  # SHA-256 of the uploaded bytes
+    content = deferred(Column(Text))  # Extracted text content, loaded only when accessed
+    extraction_metadata = Column(JSON)  # Document-level metadata from the extractor (pages, sheets, encoding, ...)
+    page_offsets = deferred(Column(JSON))  # Start offset of each PDF page in content; re-chunking rebuilds page ranges from it
+    active_chunking_config_id = Column(String, nullable=True)  # Config whose chunk set the chunk endpoints serve
     content_length = Column(Integer, default=0)
     total_chunks = Column(Integer, default=0)
     processing_status = Column(String, default="pending")  # pending, processing, completed, failed
@@ -35,17 +42,63 @@ class ChunkingConfig(Base):
     custom_separators = Column(JSON)
     splitter_type = Column(String, nullable=True)  # recursive, character, token
     length_function = Column(String, default="len")
+    splitter_engine = Column(String, default="langchain")  # langchain, native
     additional_params = Column(JSON)
+    version = Column(Integer, nullable=False, default=1, server_default="1")  # 1 for the upload config, +1 per re-chunk
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
 
 
 class DocumentChunk(Base):
     __tablename__ = "document_chunks"
+    __table_args__ = (
+        Index("ix_document_chunks_document_id_chunk_index", "document_id", "chunk_index"),
+        Index("ix_document_chunks_chunking_config_id_chunk_index", "chunking_config_id", "chunk_index"),
+    )
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     document_id = Column(String, ForeignKey("documents.id"), nullable=False, index=True)
+    chunking_config_id = Column(String, nullable=True)  # Chunk set this chunk belongs to
     chunk_index = Column(Integer, nullable=False)
-    content = Column(Text, nullable=False)
+    content = Column(Text, nullable=True)  # NULL in offsets-only storage; sliced from Document.content
     content_length = Column(Integer, nullable=True)
-    start_pos = Column(Integer)
+    start_pos = Column(Integer)  # Character offsets into Document.content
     end_pos = Column(Integer)
-    chunk_metadata = Column(JSON)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
\ No newline at end of file
+    chunk_metadata = Column(JSON(none_as_null=True))  # Chunk-specific metadata only; document-level data lives on Document
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class ProcessingJob(Base):
+    __tablename__ = "processing_jobs"
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    document_id = Column(String, ForeignKey("documents.id"), nullable=False, index=True)
+    chunking_config_id = Column(String, ForeignKey("chunking_configs.id"), nullable=False)
+    status = Column(String, default="pending", index=True)  # pending, running, completed, failed
+    attempts = Column(Integer, default=0)
+    max_attempts = Column(Integer, default=3)
+    last_error = Column(Text)
+    available_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True))
+    finished_at = Column(DateTime(timezone=True))
+    # Set from the upload's X-Profile-Processing header; every attempt then saves a ProcessingProfile
+    profile_requested = Column(Boolean, nullable=False, default=False, server_default="0")
+
+
+class StatCounter(Base):
+    """Aggregate counters behind /stats, maintained in the same transactions as the rows they count"""
+    __tablename__ = "stat_counters"
+    name = Column(String, primary_key=True)  # e.g. documents, chunks, status:completed, content_type:text/plain
+    value = Column(BigInteger, nullable=False, default=0)
+
+
+class ProcessingProfile(Base):
+    """cProfile data and stage timings of one profiled processing attempt"""
+    __tablename__ = "processing_profiles"
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    document_id = Column(String, ForeignKey("documents.id"), nullable=False, index=True)
+    status = Column(String, nullable=False)  # completed, failed
+    total_seconds = Column(Float)
+    stages = Column(JSON)  # stage name -> seconds
+    summary = Column(Text)  # pstats listing of the top functions by cumulative time
+    # Marshalled pstats table; the bytes are a .prof file that pstats or snakeviz can load
+    profile_data = deferred(Column(LargeBinary))
+    created_at = Column(DateTime(timezone=True), index=True)
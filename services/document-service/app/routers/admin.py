@@ -0,0 +1,64 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from typing import Optional
+
+from app.dependencies import get_db
+from app.models import ProcessingProfile
+from app.schemas.document import ProcessingProfileListResponse, ProcessingProfileResponse
+
+router = APIRouter()
+
+
+def _profile_response(record: ProcessingProfile, include_summary: bool = True) -> ProcessingProfileResponse:
+    return ProcessingProfileResponse(
+        id=record.id,
+        document_id=record.document_id,
+        status=record.status,
+        total_seconds=record.total_seconds,
+        stages=record.stages or {},
+        created_at=record.created_at,
+        summary=record.summary if include_summary else None
+    )
+
+
+@router.get("/admin/profiles", response_model=ProcessingProfileListResponse)
+async def list_processing_profiles(
+    document_id: Optional[str] = Query(None, description="Only profiles of this document"),
+    limit: int = Query(50, ge=1, le=500),
+    db: AsyncSession = Depends(get_db)
+):
+    """List saved processing profiles, newest first"""
+
+    query = select(ProcessingProfile).order_by(ProcessingProfile.created_at.desc()).limit(limit)
+    if document_id is not None:
+        query = query.where(ProcessingProfile.document_id == document_id)
+    profiles = await db.scalars(query)
+    return ProcessingProfileListResponse(
+        profiles=[_profile_response(record, include_summary=False) for record in profiles]
+    )
+
+
+@router.get("/admin/profiles/{profile_id}", response_model=ProcessingProfileResponse)
+async def get_processing_profile(profile_id: str, db: AsyncSession = Depends(get_db)):
+    """A profile's stage timings and its top functions by cumulative time"""
+
+    record = await db.get(ProcessingProfile, profile_id)
+    if not record:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return _profile_response(record)
+
+
+@router.get("/admin/profiles/{profile_id}/pstats")
+async def download_processing_profile(profile_id: str, db: AsyncSession = Depends(get_db)):
+    """The raw profile as a .prof file for pstats, snakeviz or similar tools"""
+
+    profile_data = await db.scalar(select(ProcessingProfile.profile_data).where(ProcessingProfile.id == profile_id))
+    if profile_data is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return Response(
+        content=profile_data,
+        media_type="application/octet-stream",
+        headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.prof"'}
+    )
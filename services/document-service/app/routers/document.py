@@ -1,22 +1,36 @@
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, UploadFile, File, Form, Header, HTTPException, Depends, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from starlette.datastructures import UploadFile as StarletteUploadFile
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from typing import Optional
+from typing import List, Optional
 
 from app.schemas.document import (
     DocumentResponse, DocumentDetailResponse, DocumentListResponse,
-    DocumentChunkResponse, ProcessingStatus, ChunkingConfigBase
+    DocumentChunkResponse, ProcessingStatus, ChunkingConfigBase,
+    DocumentStatusResponse, ProcessingJobResponse, DocumentChunkPageResponse,
+    BatchUploadItem, BatchUploadResponse, ChunkingConfigResponse, ChunkingConfigListResponse,
+    RechunkResponse
 )
-from app.models import Document, DocumentChunk
-from app.services.document_service import DocumentService
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models import Document, DocumentChunk, ChunkingConfig
+from app.services.document_service import DocumentBusyError, DocumentNotFoundError, DocumentService
 from app.services.document_processor import DocumentProcessor
+from app.services.job_queue import job_queue
+from app.services.profiling import profile_requested
+from app.services.upload_storage import (
+    BatchEntry, discard_entries, is_archive, save_archive_members, save_upload, UploadTooLargeError
+)
 from app.dependencies import get_db
 from pathlib import Path
 
+import asyncio
 import uuid
 import json
 import math
-import magic
 
 router = APIRouter()
 
@@ -24,50 +38,90 @@ router = APIRouter()
 UPLOAD_DIR = Path("uploads")
 UPLOAD_DIR.mkdir(exist_ok=True)
 
-@router.post("/documents/upload", response_model=DocumentResponse)
-async def upload_document(
-    file: UploadFile = File(...),
-    splitter_config: str = Form(...),
-    db: Session = Depends(get_db)
-):
+def _chunk_response(
+    chunk: DocumentChunk,
+    document_metadata: Optional[dict],
+    content: Optional[str] = None
+) -> DocumentChunkResponse:
+    """Build a chunk response whose metadata is the document-level dict overlaid with the chunk's own.
+
+    ``content`` is the resolved chunk text; offsets-only chunks have none of
+    their own and are resolved by DocumentService.get_chunk_page.
+    """
+    return DocumentChunkResponse(
+        id=chunk.id,
+        chunk_index=chunk.chunk_index,
+        content=(content if content is not None else chunk.content) or "",
+        content_length=chunk.content_length,
+        start_pos=chunk.start_pos,
+        end_pos=chunk.end_pos,
+        chunk_metadata={**(document_metadata or {}), **(chunk.chunk_metadata or {})},
+        document_id=chunk.document_id,
+        created_at=chunk.created_at
+    )
+
+
+def _parse_splitter_config(splitter_config: str) -> ChunkingConfigBase:
     try:
         config_dict = json.loads(splitter_config)
-        config = ChunkingConfigBase(**config_dict)
+        return ChunkingConfigBase(**config_dict)
+    except ValidationError as e:
+        # Well-formed but invalid values, answered like a JSON body that fails validation
+        raise HTTPException(status_code=422, detail=f"Invalid splitter configuration: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Invalid splitter configuration: {str(e)}")
 
+
+@router.post("/documents/upload", response_model=DocumentResponse, status_code=202)
+async def upload_document(
+    request: Request,
+    file: UploadFile = File(...),
+    splitter_config: str = Form(...),
+    x_profile_processing: Optional[str] = Header(None, description="1 to profile this document's processing"),
+    db: AsyncSession = Depends(get_db)
+):
+    max_bytes = settings.MAX_UPLOAD_SIZE_MB * 1024 * 1024
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > max_bytes:
+        raise HTTPException(
+            status_code=413,
+            detail=f"File exceeds maximum upload size of {settings.MAX_UPLOAD_SIZE_MB} MB"
+        )
+
+    config = _parse_splitter_config(splitter_config)
+
     if not file.filename:
         raise HTTPException(status_code=400, detail="No file provided")
 
     file_extension = Path(file.filename).suffix.lower()
-    processor = DocumentProcessor()
-    if file_extension not in processor.SUPPORTED_EXTENSIONS:
+    if file_extension not in DocumentProcessor.SUPPORTED_EXTENSIONS:
         raise HTTPException(
             status_code=400,
-            detail=f"Unsupported file type: {file_extension}. Supported types: {list(processor.SUPPORTED_EXTENSIONS.keys())}"
+            detail=f"Unsupported file type: {file_extension}. Supported types: {list(DocumentProcessor.SUPPORTED_EXTENSIONS.keys())}"
         )
 
     unique_filename = f"{uuid.uuid4()}{file_extension}"
     file_path = UPLOAD_DIR / unique_filename
 
     try:
-        content = await file.read()
-        with open(file_path, "wb") as f:
-            f.write(content)
-
-        file_type = magic.from_file(str(file_path), mime=True)
-        file_size = len(content)
+        upload = await save_upload(file, file_path, max_bytes=max_bytes)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
 
+    try:
         service = DocumentService(db)
-        document = await service.process_document(
+        document = await service.create_document(
             file_path=str(file_path),
             filename=unique_filename,
             original_filename=file.filename,
-            file_size=file_size,
-            content_type=file_type,
+            file_size=upload.file_size,
+            content_type=upload.content_type,
             file_extension=file_extension,
-            config=config
+            config=config,
+            content_hash=upload.sha256,
+            profile=profile_requested(x_profile_processing)
         )
+        job_queue.notify()
 
         return DocumentResponse(
             id=document.id,
@@ -77,6 +131,7 @@ async def upload_document(
             content_type=document.content_type,
             file_path=str(file_path),
             file_extension=document.file_extension,
+            content_hash=document.content_hash,
             content_length=document.content_length,
             total_chunks=document.total_chunks,
             processing_status=document.processing_status,
@@ -89,30 +144,204 @@ async def upload_document(
     except Exception as e:
         if file_path.exists():
             file_path.unlink()
-        raise HTTPException(status_code=500, detail=f"Error processing document: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error queueing document: {str(e)}")
+
+
+async def _store_batch_file(file: UploadFile) -> List[BatchEntry]:
+    """Store one file of a batch upload; an archive is expanded into one entry per member"""
+    filename = file.filename or ""
+    if is_archive(filename):
+        archive_path = UPLOAD_DIR / f"{uuid.uuid4()}.archive"
+        try:
+            await save_upload(file, archive_path, max_bytes=settings.BATCH_MAX_ARCHIVE_SIZE_MB * 1024 * 1024)
+            # Extraction, hashing and MIME sniffing are blocking; keep them off the event loop
+            return await asyncio.to_thread(
+                save_archive_members,
+                archive_path,
+                UPLOAD_DIR,
+                DocumentProcessor.SUPPORTED_EXTENSIONS,
+                settings.BATCH_MAX_FILES,
+                max_expanded_bytes=settings.BATCH_MAX_EXPANDED_SIZE_MB * 1024 * 1024
+            )
+        except ValueError as e:  # includes UploadTooLargeError
+            return [BatchEntry(filename=filename, file_extension=Path(filename).suffix.lower(), error=str(e))]
+        except OSError as e:
+            return [BatchEntry(
+                filename=filename, file_extension=Path(filename).suffix.lower(), error=f"Could not store file: {e}"
+            )]
+        finally:
+            archive_path.unlink(missing_ok=True)
+
+    file_extension = Path(filename).suffix.lower()
+    entry = BatchEntry(filename=filename, file_extension=file_extension)
+    if not filename:
+        entry.error = "No file provided"
+    elif file_extension not in DocumentProcessor.SUPPORTED_EXTENSIONS:
+        entry.error = f"Unsupported file type: {file_extension}"
+    else:
+        try:
+            entry.upload = await save_upload(file, UPLOAD_DIR / f"{uuid.uuid4()}{file_extension}")
+        except UploadTooLargeError as e:
+            entry.error = str(e)
+        except OSError as e:
+            entry.error = f"Could not store file: {e}"
+    return [entry]
+
+
+# Documents the multipart body upload_documents_batch parses itself
+_BATCH_UPLOAD_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["files", "splitter_config"],
+                    "properties": {
+                        "files": {
+                            "type": "array",
+                            "items": {"type": "string", "format": "binary"},
+                            "description": "Documents and/or .zip/.tar(.gz) archives of documents"
+                        },
+                        "splitter_config": {"type": "string"}
+                    }
+                }
+            }
+        }
+    }
+}
+
+
+@router.post(
+    "/documents/upload/batch",
+    response_model=BatchUploadResponse,
+    status_code=202,
+    openapi_extra=_BATCH_UPLOAD_BODY
+)
+async def upload_documents_batch(
+    request: Request,
+    x_profile_processing: Optional[str] = Header(None, description="1 to profile each document's processing"),
+    db: AsyncSession = Depends(get_db)
+):
+    """Queue many documents with one splitter configuration in a single request.
+
+    Files are stored with at most BATCH_UPLOAD_CONCURRENCY in flight, then
+    registered BATCH_INSERT_SIZE documents per transaction; the job queue is
+    woken after each transaction so processing starts while the rest are
+    still being written. Rejected files are reported per file and never fail
+    the whole batch.
+
+    The form is parsed here rather than declared with File(...), whose parser
+    rejects more than Starlette's default of 1000 files.
+    """
+    async with request.form(max_files=settings.BATCH_MAX_FILES) as form:
+        files = [item for item in form.getlist("files") if isinstance(item, StarletteUploadFile)]
+        splitter_config = form.get("splitter_config")
+        if not files or not isinstance(splitter_config, str):
+            raise HTTPException(status_code=422, detail="Expected form fields 'files' and 'splitter_config'")
+        config = _parse_splitter_config(splitter_config)
+
+        semaphore = asyncio.Semaphore(settings.BATCH_UPLOAD_CONCURRENCY)
+
+        async def store(file: UploadFile) -> List[BatchEntry]:
+            async with semaphore:
+                return await _store_batch_file(file)
+
+        # Every file settles before a failure is raised, so nothing is still being written during cleanup
+        outcomes = await asyncio.gather(*(store(file) for file in files), return_exceptions=True)
+        entries = [entry for stored in outcomes if not isinstance(stored, BaseException) for entry in stored]
+        failure = next((stored for stored in outcomes if isinstance(stored, BaseException)), None)
+        if failure is not None:
+            discard_entries(entries)
+            raise failure
+    if len(entries) > settings.BATCH_MAX_FILES:
+        discard_entries(entries)
+        raise HTTPException(status_code=413, detail=f"A batch may contain at most {settings.BATCH_MAX_FILES} files")
+
+    service = DocumentService(db)
+    accepted = [entry for entry in entries if entry.upload is not None]
+    for start in range(0, len(accepted), settings.BATCH_INSERT_SIZE):
+        batch = accepted[start:start + settings.BATCH_INSERT_SIZE]
+        try:
+            document_ids = await service.create_documents([
+                dict(
+                    file_path=str(entry.upload.file_path),
+                    filename=entry.upload.file_path.name,
+                    original_filename=entry.filename,
+                    file_size=entry.upload.file_size,
+                    content_type=entry.upload.content_type,
+                    file_extension=entry.file_extension,
+                    content_hash=entry.upload.sha256
+                )
+                for entry in batch
+            ], config, profile=profile_requested(x_profile_processing))
+        except Exception as e:
+            discard_entries(batch)
+            for entry in batch:
+                entry.error = f"Error queueing document: {str(e)}"
+            continue
+        for entry, document_id in zip(batch, document_ids):
+            entry.document_id = document_id
+        job_queue.notify()
+
+    results = [
+        BatchUploadItem(
+            filename=entry.filename,
+            status="queued" if entry.document_id else "rejected",
+            document_id=entry.document_id,
+            error=entry.error
+        )
+        for entry in entries
+    ]
+    queued = sum(1 for entry in entries if entry.document_id)
+    return BatchUploadResponse(
+        total=len(results),
+        queued=queued,
+        rejected=len(results) - queued,
+        results=results
+    )
+
+
+@router.get("/documents/{document_id}/status", response_model=DocumentStatusResponse)
+async def get_document_status(document_id: str, db: AsyncSession = Depends(get_db)):
+    service = DocumentService(db)
+    document = await service.get_document(document_id)
+    if not document:
+        raise HTTPException(status_code=404, detail="Document not found")
+    job = await service.get_latest_job(document_id)
+    return DocumentStatusResponse(
+        document_id=document.id,
+        processing_status=document.processing_status,
+        error_message=document.error_message,
+        total_chunks=document.total_chunks or 0,
+        processed_at=document.processed_at,
+        job=ProcessingJobResponse(
+            id=job.id,
+            status=job.status,
+            attempts=job.attempts,
+            max_attempts=job.max_attempts,
+            last_error=job.last_error,
+            created_at=job.created_at,
+            started_at=job.started_at,
+            finished_at=job.finished_at
+        ) if job else None
+    )
 
 
 @router.get("/documents/{document_id}", response_model=DocumentDetailResponse)
-async def get_document_details(document_id: str, db: Session = Depends(get_db)):
+async def get_document_details(
+    document_id: str,
+    include_chunks: bool = Query(True, description="Set to false and page through /chunks instead"),
+    db: AsyncSession = Depends(get_db)
+):
     service = DocumentService(db)
-    document = service.get_document(document_id)
+    document = await service.get_document(document_id)
     if not document:
         raise HTTPException(status_code=404, detail="Document not found")
-    chunks = service.get_document_chunks(document_id)
     chunk_responses = [
-        DocumentChunkResponse(
-            id=chunk.id,
-            chunk_index=chunk.chunk_index,
-            content=chunk.content,
-            content_length=chunk.content_length,
-            start_pos=chunk.start_pos,
-            end_pos=chunk.end_pos,
-            chunk_metadata=chunk.chunk_metadata,
-            document_id=chunk.document_id,
-            created_at=chunk.created_at
-        )
-        for chunk in chunks
-    ]
+        _chunk_response(chunk, document.extraction_metadata, content)
+        for chunk, content in await service.get_chunk_page(document_id)
+    ] if include_chunks else []
     return DocumentDetailResponse(
         id=document.id,
         filename=document.filename,
@@ -121,32 +350,103 @@ async def get_document_details(document_id: str, db: Session = Depends(get_db)):
         file_path=document.file_path,
         content_type=document.content_type,
         file_extension=document.file_extension,
+        content_hash=document.content_hash,
         content_length=document.content_length,
+        extraction_metadata=document.extraction_metadata,
         total_chunks=document.total_chunks,
         processing_status=document.processing_status,
         error_message=document.error_message,
         created_at=document.created_at,
         updated_at=document.updated_at,
         processed_at=document.processed_at,
+        active_chunking_config_id=document.active_chunking_config_id,
         chunks=chunk_responses
     )
 
+
+def _config_response(record: ChunkingConfig) -> ChunkingConfigResponse:
+    return ChunkingConfigResponse(
+        id=record.id,
+        document_id=record.document_id,
+        version=record.version or 1,
+        created_at=record.created_at,
+        chunk_size=record.chunk_size,
+        chunk_overlap=record.chunk_overlap,
+        separator_type=record.separator_type,
+        custom_separators=record.custom_separators,
+        splitter_type=record.splitter_type,
+        length_function=record.length_function,
+        splitter_engine=record.splitter_engine or "langchain",
+        additional_params=record.additional_params
+    )
+
+
+@router.post("/documents/{document_id}/rechunk", response_model=RechunkResponse)
+async def rechunk_document(
+    document_id: str,
+    config: ChunkingConfigBase,
+    response: Response,
+    db: AsyncSession = Depends(get_db)
+):
+    """Split the stored text of a processed document with a new config.
+
+    The result is a new chunk set under a new config version, which becomes
+    the one the chunk endpoints serve (201). If the document already has an
+    identical config, that chunk set is made active again without splitting (200).
+    """
+    service = DocumentService(db)
+    document = await service.get_document(document_id)
+    if not document:
+        raise HTTPException(status_code=404, detail="Document not found")
+    if document.processing_status != ProcessingStatus.COMPLETED.value:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Document has no extracted text to re-chunk (status: {document.processing_status})"
+        )
+    try:
+        record, reused = await service.rechunk_document(document, config)
+    except DocumentNotFoundError:
+        raise HTTPException(status_code=404, detail="Document not found")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid splitter configuration: {str(e)}")
+    response.status_code = 200 if reused else 201
+    total_chunks = await db.scalar(select(Document.total_chunks).where(Document.id == document_id))
+    return RechunkResponse(
+        document_id=document_id,
+        chunking_config=_config_response(record),
+        total_chunks=total_chunks or 0,
+        reused=reused
+    )
+
+
+@router.get("/documents/{document_id}/chunking-configs", response_model=ChunkingConfigListResponse)
+async def list_chunking_configs(document_id: str, db: AsyncSession = Depends(get_db)):
+    """Every config version of a document; each one has its own chunk set"""
+    service = DocumentService(db)
+    document = await service.get_document(document_id)
+    if not document:
+        raise HTTPException(status_code=404, detail="Document not found")
+    return ChunkingConfigListResponse(
+        active_chunking_config_id=document.active_chunking_config_id,
+        configs=[_config_response(record) for record in await service.list_chunking_configs(document_id)]
+    )
+
 @router.get("/documents", response_model=DocumentListResponse)
 async def list_documents(
     page: int = Query(1, ge=1),
     per_page: int = Query(20, ge=1, le=100),
     status: Optional[ProcessingStatus] = None,
     content_type: Optional[str] = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     skip = (page - 1) * per_page
-    query = db.query(Document)
+    query = select(Document)
     if status:
-        query = query.filter(Document.processing_status == status)
+        query = query.where(Document.processing_status == status)
     if content_type:
-        query = query.filter(Document.content_type == content_type)
-    total = query.count()
-    documents = query.order_by(Document.created_at.desc()).offset(skip).limit(per_page).all()
+        query = query.where(Document.content_type == content_type)
+    total = await db.scalar(select(func.count()).select_from(query.subquery()))
+    documents = await db.scalars(query.order_by(Document.created_at.desc()).offset(skip).limit(per_page))
     document_responses = [
         DocumentResponse(
             id=doc.id,
@@ -155,6 +455,7 @@ async def list_documents(
             file_size=doc.file_size,
             content_type=doc.content_type,
             file_extension=doc.file_extension,
+            content_hash=doc.content_hash,
             content_length=doc.content_length,
             total_chunks=doc.total_chunks,
             processing_status=doc.processing_status,
@@ -175,36 +476,97 @@ async def list_documents(
         total_pages=total_pages
     )
 
+@router.get("/documents/{document_id}/chunks", response_model=DocumentChunkPageResponse)
+async def list_document_chunks(
+    document_id: str,
+    after: int = Query(-1, ge=-1, description="Return chunks with chunk_index greater than this"),
+    limit: int = Query(100, ge=1, le=1000),
+    chunking_config_id: Optional[str] = Query(None, description="Chunk set to read; defaults to the active one"),
+    db: AsyncSession = Depends(get_db)
+):
+    service = DocumentService(db)
+    document_row = (await db.execute(
+        select(Document.extraction_metadata).where(Document.id == document_id)
+    )).first()
+    if document_row is None:
+        raise HTTPException(status_code=404, detail="Document not found")
+    rows = await service.get_chunk_page(
+        document_id, after=after, limit=limit + 1, chunking_config_id=chunking_config_id
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return DocumentChunkPageResponse(
+        chunks=[_chunk_response(chunk, document_row.extraction_metadata, content) for chunk, content in rows],
+        limit=limit,
+        next_after=rows[-1][0].chunk_index if has_more else None,
+        has_more=has_more
+    )
+
+
+@router.get("/documents/{document_id}/chunks.ndjson")
+async def export_document_chunks(
+    document_id: str,
+    chunking_config_id: Optional[str] = Query(None, description="Chunk set to export; defaults to the active one"),
+    db: AsyncSession = Depends(get_db)
+):
+    """Stream every chunk as newline-delimited JSON, one keyset page at a time"""
+    document_row = (await db.execute(
+        select(Document.extraction_metadata, Document.active_chunking_config_id).where(Document.id == document_id)
+    )).first()
+    if document_row is None:
+        raise HTTPException(status_code=404, detail="Document not found")
+    # Pinned up front so a re-chunk during the export cannot switch sets between pages
+    chunk_set = chunking_config_id or document_row.active_chunking_config_id
+
+    async def generate_lines():
+        # The request-scoped session is closed once the response starts, so stream with our own
+        async with SessionLocal() as stream_db:
+            service = DocumentService(stream_db)
+            after = -1
+            while True:
+                rows = await service.get_chunk_page(
+                    document_id, after=after, limit=settings.CHUNK_EXPORT_BATCH_SIZE, chunking_config_id=chunk_set
+                )
+                if not rows:
+                    break
+                for chunk, content in rows:
+                    yield _chunk_response(chunk, document_row.extraction_metadata, content).model_dump_json() + "\n"
+                after = rows[-1][0].chunk_index
+                stream_db.expunge_all()
+
+    return StreamingResponse(
+        generate_lines(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{document_id}-chunks.ndjson"'}
+    )
+
+
 @router.get("/documents/{document_id}/chunks/{chunk_id}", response_model=DocumentChunkResponse)
-async def get_document_chunk(document_id: str, chunk_id: str, db: Session = Depends(get_db)):
-    chunk = db.query(DocumentChunk).filter(
-        DocumentChunk.id == chunk_id,
-        DocumentChunk.document_id == document_id
-    ).first()
-    if not chunk:
+async def get_document_chunk(document_id: str, chunk_id: str, db: AsyncSession = Depends(get_db)):
+    # Looked up by id alone, so chunk ids from earlier chunk sets keep resolving after a rechunk
+    row = await DocumentService(db).get_chunk(document_id, chunk_id)
+    if not row:
         raise HTTPException(status_code=404, detail="Chunk not found")
-    return DocumentChunkResponse(
-        id=chunk.id,
-        chunk_index=chunk.chunk_index,
-        content=chunk.content,
-        content_length=chunk.content_length,
-        start_pos=chunk.start_pos,
-        end_pos=chunk.end_pos,
-        chunk_metadata=chunk.chunk_metadata,
-        document_id=chunk.document_id,
-        created_at=chunk.created_at
+    chunk, content = row
+    document_metadata = await db.scalar(
+        select(Document.extraction_metadata).where(Document.id == document_id)
     )
+    return _chunk_response(chunk, document_metadata, content)
 
 @router.delete("/documents/{document_id}")
-async def delete_document(document_id: str, db: Session = Depends(get_db)):
+async def delete_document(document_id: str, db: AsyncSession = Depends(get_db)):
     service = DocumentService(db)
-    document = service.get_document(document_id)
+    document = await service.get_document(document_id)
     if not document:
         raise HTTPException(status_code=404, detail="Document not found")
-    db.query(DocumentChunk).filter(DocumentChunk.document_id == document_id).delete()
-    db.delete(document)
+    try:
+        await service.delete_document(document_id)
+    except DocumentBusyError:
+        raise HTTPException(
+            status_code=409,
+            detail="Document is being processed; delete it once processing has finished"
+        )
     file_path = Path(document.file_path)
     if file_path.exists():
         file_path.unlink()
-    db.commit()
     return {"message": "Document deleted successfully"}
\ No newline at end of file
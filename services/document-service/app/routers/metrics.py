@@ -0,0 +1,15 @@
+from fastapi import APIRouter, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+from app.services.job_queue import job_queue
+from app.services.metrics import JOBS_IN_FLIGHT, QUEUE_DEPTH
+
+router = APIRouter()
+
+@router.get("/metrics")
+async def get_metrics():
+    """Stage timings, counters and queue gauges in the Prometheus text format"""
+
+    QUEUE_DEPTH.set(await job_queue.depth())
+    JOBS_IN_FLIGHT.set(job_queue.in_flight)
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
@@ -27,6 +27,27 @@ async def get_splitter_configurations():
                 "description": "Splits text based on token count rather than character count",
                 "default_separators": None,
                 "recommended_for": ["LLM processing", "Token-limited applications"]
+            },
+            {
+                "type": "markdown",
+                "name": "Markdown Section Splitter",
+                "description": "Splits within heading sections; chunks carry their heading path",
+                "default_separators": None,
+                "recommended_for": ["Markdown", "Documentation"]
+            },
+            {
+                "type": "html",
+                "name": "HTML Section Splitter",
+                "description": "Splits the text rendered from HTML (markup, scripts and styles removed) within heading sections; chunks carry their heading path",
+                "default_separators": None,
+                "recommended_for": ["Web pages", "HTML documentation"]
+            },
+            {
+                "type": "code",
+                "name": "Code Splitter",
+                "description": "Splits on language-specific separators (language taken from the file extension or additional_params.language); chunks carry their enclosing class/function path",
+                "default_separators": None,
+                "recommended_for": [".py", ".js", ".java", ".cpp", ".c"]
             }
         ],
         "length_functions": [
@@ -39,6 +60,23 @@ async def get_splitter_configurations():
                 "type": "tiktoken",
                 "name": "Tiktoken (GPT tokens)",
                 "description": "Count tokens using tiktoken encoder"
+            },
+            {
+                "type": "huggingface",
+                "name": "HuggingFace tokenizer",
+                "description": "Count tokens with the local tokenizer.json at HUGGINGFACE_TOKENIZER_PATH"
+            }
+        ],
+        "splitter_engines": [
+            {
+                "type": "langchain",
+                "name": "LangChain",
+                "description": "LangChain text splitters; chunk offsets are located in the text afterwards"
+            },
+            {
+                "type": "native",
+                "name": "Native",
+                "description": "Built-in span-based engine for recursive and character splitters; same chunks as LangChain, offsets tracked while splitting"
             }
         ],
         "recommendations": {
@@ -67,14 +105,20 @@ async def get_splitter_configurations():
                 "length_function": "len",
                 "separators": ["\n"]
             },
+            "md": {
+                "splitter_type": "markdown",
+                "chunk_size": 1200,
+                "chunk_overlap": 200,
+                "length_function": "len"
+            },
             "html": {
-                "splitter_type": "recursive",
+                "splitter_type": "html",
                 "chunk_size": 1500,
                 "chunk_overlap": 300,
                 "length_function": "len"
             },
             "code": {
-                "splitter_type": "recursive",
+                "splitter_type": "code",
                 "chunk_size": 800,
                 "chunk_overlap": 100,
                 "length_function": "len"
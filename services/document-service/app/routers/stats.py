@@ -1,23 +1,37 @@
 from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from app.models import Document, DocumentChunk
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.dependencies import get_db
+from app.services.extraction_cache import extraction_cache
+from app.services.process_pool import processing_pool
+from app.services.splitter_registry import registry_stats
+from app.services.stats_counters import read_statistics, stats_reconciler
 
 router = APIRouter()
 
 
 @router.get("/stats")
-async def get_statistics(db: Session = Depends(get_db)):
-    """Get service statistics"""
-    total_documents = db.query(Document).count()
-    total_chunks = db.query(DocumentChunk).count()
-    status_counts = db.query(Document.processing_status, db.func.count(Document.id))\
-        .group_by(Document.processing_status).all()
-    file_type_counts = db.query(Document.content_type, db.func.count(Document.id))\
-        .group_by(Document.content_type).all()
+async def get_statistics(db: AsyncSession = Depends(get_db)):
+    """Get service statistics from the precomputed counters, without scanning documents or chunks"""
+    return await read_statistics(db)
+
+
+@router.post("/stats/reconcile")
+async def reconcile_statistics():
+    """Recount everything from the tables and correct any counter that drifted.
+
+    Returns the corrections that were applied (empty when the counters were exact).
+    """
+    return {"corrections": await stats_reconciler.reconcile()}
+
+
+@router.get("/stats/cache")
+async def get_cache_statistics():
+    """Get extraction cache and splitter registry counters.
+
+    Splitters live in the processing pool, so ``splitter_registry`` reports the
+    counters of whichever pool worker answered (see its ``pid``).
+    """
     return {
-        "total_documents": total_documents,
-        "total_chunks": total_chunks,
-        "status_distribution": {status: count for status, count in status_counts},
-        "file_type_distribution": {file_type: count for file_type, count in file_type_counts}
+        "extraction_cache": extraction_cache.stats(),
+        "splitter_registry": await processing_pool.run(registry_stats)
     }
\ No newline at end of file
@@ -1,8 +1,10 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, ValidationInfo, field_validator
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 from enum import Enum
 
+from app.services.structured_splitter import CODE_LANGUAGES
+
 
 class SplitterType(str, Enum):
     RECURSIVE = "recursive"
@@ -19,6 +21,11 @@ class LengthFunction(str, Enum):
     HUGGINGFACE = "huggingface"
 
 
+class SplitterEngine(str, Enum):
+    LANGCHAIN = "langchain"
+    NATIVE = "native"  # Span-based RECURSIVE/CHARACTER implementation
+
+
 class ProcessingStatus(str, Enum):
     PENDING = "pending"
     PROCESSING = "processing"
@@ -33,8 +40,10 @@ class DocumentBase(BaseModel):
     file_size: int
     content_type: str
     file_extension: Optional[str] = None
+    content_hash: Optional[str] = None
     content: Optional[str] = None
     content_length: int = 0
+    extraction_metadata: Optional[Dict[str, Any]] = None
 
 
 class DocumentCreate(DocumentBase):
@@ -70,8 +79,22 @@ class ChunkingConfigBase(BaseModel):
     custom_separators: Optional[List[str]] = None
     splitter_type: Optional[SplitterType] = None
     length_function: Optional[LengthFunction] = LengthFunction.LEN
+    splitter_engine: Optional[SplitterEngine] = SplitterEngine.LANGCHAIN
     additional_params: Optional[Dict[str, Any]] = None
 
+    @field_validator("additional_params")
+    @classmethod
+    def check_code_language(cls, params: Optional[Dict[str, Any]], info: ValidationInfo):
+        """Reject an unknown code language here rather than in the worker after the upload was accepted"""
+        language = (params or {}).get("language")
+        if info.data.get("splitter_type") == SplitterType.CODE and language and (
+            not isinstance(language, str) or language not in CODE_LANGUAGES
+        ):
+            raise ValueError(
+                f"Unsupported code language: {language}. Supported languages: {sorted(CODE_LANGUAGES)}"
+            )
+        return params
+
 
 class ChunkingConfigCreate(ChunkingConfigBase):
     document_id: str
@@ -84,12 +107,15 @@ class ChunkingConfigUpdate(BaseModel):
     custom_separators: Optional[List[str]] = None
     splitter_type: Optional[SplitterType] = None
     length_function: Optional[LengthFunction] = None
+    splitter_engine: Optional[SplitterEngine] = None
     additional_params: Optional[Dict[str, Any]] = None
 
 
 class ChunkingConfigResponse(ChunkingConfigBase):
     id: str
     document_id: str
+    version: int = 1
+    created_at: Optional[datetime] = None
 
     class Config:
         orm_mode = True
@@ -126,9 +152,80 @@ class DocumentChunkResponse(DocumentChunkBase):
 
 
 class DocumentDetailResponse(DocumentResponse):
+    active_chunking_config_id: Optional[str] = None  # Config whose chunk set is returned
     chunks: List[DocumentChunkResponse] = []
 
 
+class ChunkingConfigListResponse(BaseModel):
+    active_chunking_config_id: Optional[str] = None
+    configs: List[ChunkingConfigResponse]
+
+
+class RechunkResponse(BaseModel):
+    document_id: str
+    chunking_config: ChunkingConfigResponse
+    total_chunks: int
+    reused: bool = False  # An identical config already had a chunk set; nothing was split
+
+
+class DocumentChunkPageResponse(BaseModel):
+    chunks: List[DocumentChunkResponse]
+    limit: int
+    next_after: Optional[int] = None  # Pass as ``after`` to fetch the next page
+    has_more: bool = False
+
+
+class ProcessingJobResponse(BaseModel):
+    id: str
+    status: str
+    attempts: int = 0
+    max_attempts: int
+    last_error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        orm_mode = True
+
+
+class ProcessingProfileResponse(BaseModel):
+    id: str
+    document_id: str
+    status: str  # completed, failed
+    total_seconds: Optional[float] = None
+    stages: Dict[str, float] = {}  # seconds per stage; <stage>_worker is time spent in the pool worker
+    created_at: Optional[datetime] = None
+    summary: Optional[str] = None  # Top functions by cumulative time; omitted from lists
+
+
+class ProcessingProfileListResponse(BaseModel):
+    profiles: List[ProcessingProfileResponse]
+
+
+class DocumentStatusResponse(BaseModel):
+    document_id: str
+    processing_status: ProcessingStatus
+    error_message: Optional[str] = None
+    total_chunks: int = 0
+    processed_at: Optional[datetime] = None
+    job: Optional[ProcessingJobResponse] = None
+
+
+class BatchUploadItem(BaseModel):
+    filename: str  # Uploaded name, or the member path inside an archive
+    status: str  # queued, rejected
+    document_id: Optional[str] = None
+    error: Optional[str] = None
+
+
+class BatchUploadResponse(BaseModel):
+    total: int
+    queued: int
+    rejected: int
+    results: List[BatchUploadItem]
+
+
 class DocumentListResponse(BaseModel):
     documents: List[DocumentResponse]
     total: int
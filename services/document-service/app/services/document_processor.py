@@ -1,22 +1,205 @@
 import os
+import asyncio
+import codecs
+import functools
+import itertools
 import magic
-import aiofiles
+import mmap
+import re
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Tuple
+from bisect import bisect_right
+from typing import List, Dict, Any, Callable, Iterable, Iterator, Optional, Tuple
 import PyPDF2
 import docx
+import openpyxl
 import pandas as pd
+from openpyxl.utils.exceptions import InvalidFileException
 from langchain_text_splitters import (
+    Language,
     RecursiveCharacterTextSplitter,
     CharacterTextSplitter,
     TokenTextSplitter,
 )
-import tiktoken
-import chardet
-from io import BytesIO
+from charset_normalizer import from_bytes
 
+from app.core.config import settings
 # Import enums and config from schemas for type safety and alignment
-from app.schemas.document import SplitterType, LengthFunction, ChunkingConfigBase
+from app.schemas.document import SplitterType, SplitterEngine, LengthFunction, ChunkingConfigBase
+from app.services.extraction_cache import extraction_cache
+from app.services.html_text import render_html
+from app.services.native_splitter import NativeCharacterSplitter, NativeRecursiveSplitter, supports_separators
+from app.services.process_pool import processing_pool
+from app.services.profiling import ProfileRecorder
+from app.services.splitter_registry import splitter_registry
+from app.services.structured_splitter import (
+    CODE_LANGUAGES, MARKDOWN_SEPARATORS, ChunkMetadata, CodeSectionSplitter, MarkdownSectionSplitter,
+    language_separators
+)
+from app.services.token_length import (
+    HuggingFaceEncoder, TokenLengthEngine, TokenAwareRecursiveSplitter, TokenAwareCharacterSplitter
+)
+from app.services.upload_storage import hash_file
+
+# (start_pos, end_pos) of a chunk in the extracted text; (None, None) if it cannot be located
+Span = Tuple[Optional[int], Optional[int]]
+
+_WHITESPACE = re.compile(r"\s*")
+_ASCII = bytes(range(0x80))
+
+
+def locate_chunks(
+    text: str,
+    chunks: List[str],
+    chunk_overlap: int = 0,
+    length_function: Callable[[str], int] = len,
+    max_separator: int = 0
+) -> List[Span]:
+    """Find the character offsets of each chunk in the text it was split from.
+
+    Splitters emit chunks in document order and a chunk shares at most
+    ``chunk_overlap`` (in ``length_function`` units) with the one before it, so
+    each search starts where that overlap could begin at the earliest: the end
+    of the previous chunk minus the overlap, as LangChain's ``add_start_index``
+    does. Starting any earlier matches an earlier copy of repeated text. Matches
+    are also kept within the whitespace and one separator (at most
+    ``max_separator`` characters) a splitter drops between chunks, looking
+    further ahead only when nothing fits, so a chunk that cannot be found where
+    expected doesn't drag the following ones to a later copy.
+
+    Most chunks are verbatim slices, i.e. ``text[start:end] == chunk``.
+    Splitters that re-join pieces with a single separator (``CharacterTextSplitter``
+    turns ``"\n\n"`` into ``"\n"``) produce chunks shorter than their source; for
+    those the span is the source with its whitespace runs intact.
+    """
+    spans: List[Span] = []
+    floor = 0
+    limit: Optional[int] = _gap_end(text, 0, max_separator)
+    previous: Optional[Tuple[int, int]] = None
+    for chunk in chunks:
+        span = _find_chunk(text, chunk, floor, limit, previous)
+        if span is None and previous is not None:
+            # Token counts only bound the overlap approximately; retry from the previous chunk's start
+            span = _find_chunk(text, chunk, previous[0], limit, previous)
+        if span is None and limit is not None:
+            # Look past the bound only when nothing fits inside it
+            span = _find_chunk(text, chunk, floor, None, previous)
+        if span is None:
+            spans.append((None, None))
+            limit = None
+            continue
+        spans.append(span)
+        previous = span
+        # Separators collapsed out of the chunk widen its overlap in the source by as much
+        collapsed = span[1] - span[0] - len(chunk)
+        overlap = _overlap_chars(chunk, chunk_overlap, length_function) + collapsed
+        # A chunk that fits in the overlap whole can start where the previous one did
+        floor = max(span[0], span[1] - overlap)
+        limit = _gap_end(text, span[1], max_separator)
+    return spans
+
+
+def page_ranges(spans: List[Span], page_offsets: List[int]) -> List[Optional[Dict[str, int]]]:
+    """Map chunk spans to the 1-based first and last page they cover"""
+    ranges: List[Optional[Dict[str, int]]] = []
+    for start, end in spans:
+        if start is None:
+            ranges.append(None)
+            continue
+        ranges.append({
+            "page_start": bisect_right(page_offsets, start),
+            "page_end": bisect_right(page_offsets, max(start, end - 1))
+        })
+    return ranges
+
+
+def merge_chunk_metadata(*columns: Optional[List[ChunkMetadata]]) -> Optional[List[ChunkMetadata]]:
+    """Combine per-chunk metadata lists (e.g. page ranges and section paths) key by key"""
+    columns = [column for column in columns if column]
+    if not columns:
+        return None
+    merged: List[ChunkMetadata] = []
+    for entries in zip(*columns):
+        combined = {key: value for entry in entries if entry for key, value in entry.items()}
+        merged.append(combined or None)
+    return merged
+
+
+@functools.lru_cache(maxsize=None)
+def _is_ascii_compatible(encoding: str) -> bool:
+    """Whether ``encoding`` decodes every ASCII byte to the same character"""
+    try:
+        return _ASCII.decode(encoding) == _ASCII.decode('ascii')
+    except (UnicodeDecodeError, LookupError):
+        return False
+
+
+def _overlap_chars(chunk: str, chunk_overlap: int, length_function: Callable[[str], int]) -> int:
+    """Characters in the longest suffix of ``chunk`` that fits in ``chunk_overlap``"""
+    if length_function is len or chunk_overlap <= 0:
+        return min(chunk_overlap, len(chunk))
+    low, high = 0, len(chunk)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if length_function(chunk[-middle:]) <= chunk_overlap:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def _gap_end(text: str, position: int, max_separator: int) -> int:
+    """Last offset the chunk after ``position`` can start at: past whitespace, a separator and whitespace"""
+    position = _WHITESPACE.match(text, position).end() + max_separator
+    return _WHITESPACE.match(text, min(position, len(text))).end()
+
+
+def _find_chunk(
+    text: str, chunk: str, cursor: int, limit: Optional[int], previous: Optional[Tuple[int, int]]
+) -> Optional[Tuple[int, int]]:
+    return _find_verbatim(text, chunk, cursor, limit, previous) or _find_covering(text, chunk, cursor, limit)
+
+
+def _find_verbatim(
+    text: str, chunk: str, cursor: int, limit: Optional[int], previous: Optional[Tuple[int, int]]
+) -> Optional[Tuple[int, int]]:
+    if not chunk:
+        return None
+    if previous is not None:
+        # A chunk never ends before the one it follows, nor repeats it exactly
+        cursor = max(cursor, previous[1] - len(chunk))
+        if text.startswith(chunk, cursor) and (cursor, cursor + len(chunk)) == previous:
+            cursor += 1
+    start = text.find(chunk, cursor, len(text) if limit is None else limit + len(chunk))
+    return (start, start + len(chunk)) if start != -1 else None
+
+
+def _find_covering(text: str, chunk: str, cursor: int, limit: Optional[int]) -> Optional[Tuple[int, int]]:
+    # Collapsed separators only ever shorten whitespace runs, so the chunk's
+    # words must appear in order with some whitespace between each pair
+    words = chunk.split()
+    if len(words) < 2:
+        return None
+    start = text.find(words[0], cursor)
+    while start != -1 and (limit is None or start <= limit):
+        end = _match_words(text, start, words)
+        if end is not None:
+            return start, end
+        start = text.find(words[0], start + 1)
+    return None
+
+
+def _match_words(text: str, position: int, words: List[str]) -> Optional[int]:
+    for i, word in enumerate(words):
+        if i:
+            gap_end = _WHITESPACE.match(text, position).end()
+            if gap_end == position:
+                return None
+            position = gap_end
+        if not text.startswith(word, position):
+            return None
+        position += len(word)
+    return position
+
 
 class DocumentProcessor:
     SUPPORTED_EXTENSIONS = {
@@ -44,44 +227,128 @@ class DocumentProcessor:
         self.upload_dir = Path(upload_dir)
         self.upload_dir.mkdir(exist_ok=True)
 
-    async def extract_text_from_file(self, file_path: str, file_type: str) -> Tuple[str, Dict[str, Any]]:
+    async def extract_text_from_file(
+        self,
+        file_path: str,
+        file_type: str,
+        content_hash: Optional[str] = None,
+        profile: Optional[ProfileRecorder] = None
+    ) -> Tuple[str, Dict[str, Any]]:
+        """Extract text content in the processing pool, reusing cached results for identical bytes"""
+        if profile is not None:
+            # A profiled run always extracts, so the profile shows the extractor rather than a cache hit
+            return await profile.run("extract", self.extract_text, file_path, file_type)
+        if content_hash is None:
+            content_hash = await asyncio.to_thread(hash_file, file_path)
+        # Keyed by the type actually extracted: the same bytes as .txt and .html extract differently
+        extracted_as = self.extraction_type(file_path, file_type)
+        cached = extraction_cache.get(content_hash, extracted_as)
+        if cached is not None:
+            return cached
+        text, metadata = await processing_pool.run(self.extract_text, file_path, file_type)
+        extraction_cache.put(content_hash, extracted_as, text, metadata)
+        return text, metadata
+
+    async def split_text(
+        self, content: str, config: ChunkingConfigBase, profile: Optional[ProfileRecorder] = None
+    ) -> Tuple[List[str], List[Span], Optional[List[ChunkMetadata]]]:
+        """Split text in the processing pool, returning the chunks, their character offsets
+        and, for structure-aware splitters, each chunk's section path"""
+        if profile is not None:
+            return await profile.run("split", self.split_text_sync, content, config)
+        return await processing_pool.run(self.split_text_sync, content, config)
+
+    @staticmethod
+    def extraction_type(file_path: str, file_type: str) -> str:
+        """The type ``extract_text`` handles a file as: its sniffed MIME type, except for .html/.htm"""
+        if Path(file_path).suffix.lower() in ('.html', '.htm'):
+            # Fragments without <html> sniff as text/plain, so the extension counts too
+            return 'text/html'
+        return file_type
+
+    def extract_text(self, file_path: str, file_type: str) -> Tuple[str, Dict[str, Any]]:
         """Extract text content from various file types"""
         metadata = {}
+        file_type = self.extraction_type(file_path, file_type)
         try:
             if file_type == 'application/pdf':
-                return await self._extract_from_pdf(file_path, metadata)
+                return self._extract_from_pdf(file_path, metadata)
             elif file_type in [
                 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
                 'application/msword'
             ]:
-                return await self._extract_from_docx(file_path, metadata)
+                return self._extract_from_docx(file_path, metadata)
             elif file_type in [
                 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
                 'application/vnd.ms-excel'
             ]:
-                return await self._extract_from_excel(file_path, metadata)
+                return self._extract_from_excel(file_path, metadata)
             elif file_type == 'text/csv':
-                return await self._extract_from_csv(file_path, metadata)
+                return self._extract_from_csv(file_path, metadata)
+            elif file_type == 'text/html':
+                return self._extract_from_html(file_path, metadata)
             elif 'text/' in file_type or file_type in ['application/json', 'application/xml']:
-                return await self._extract_from_text(file_path, metadata)
+                return self._extract_from_text(file_path, metadata)
             else:
                 # Try to extract as text for unknown types
-                return await self._extract_from_text(file_path, metadata)
+                return self._extract_from_text(file_path, metadata)
         except Exception as e:
             raise ValueError(f"Failed to extract text from file: {str(e)}")
 
-    async def _extract_from_pdf(self, file_path: str, metadata: Dict) -> Tuple[str, Dict]:
-        async with aiofiles.open(file_path, 'rb') as file:
-            content = await file.read()
-            pdf_reader = PyPDF2.PdfReader(BytesIO(content))
-            text = ""
-            metadata['pages'] = len(pdf_reader.pages)
+    def split_text_sync(
+        self, content: str, config: ChunkingConfigBase
+    ) -> Tuple[List[str], List[Span], Optional[List[ChunkMetadata]]]:
+        splitter = self.get_text_splitter(config)
+        if hasattr(splitter, "split_text_with_metadata"):
+            return splitter.split_text_with_metadata(content)
+        if hasattr(splitter, "split_text_with_spans"):
+            # Native splitters track offsets as they go; no need to search for the chunks
+            chunks, spans = splitter.split_text_with_spans(content)
+            return chunks, spans, None
+        chunks = splitter.split_text(content)
+        if isinstance(splitter, TokenTextSplitter):
+            # Its overlap is counted in tokens, whatever the length function says
+            tokenizer = splitter._tokenizer
+            length_function = lambda piece: len(tokenizer.encode(piece, disallowed_special=()))
+        else:
+            length_function = splitter._length_function
+        # A regex separator's pattern is taken as an upper bound on what it matches
+        separators = getattr(splitter, "_separators", None) or [getattr(splitter, "_separator", "")]
+        max_separator = max(map(len, separators))
+        try:
+            spans = locate_chunks(content, chunks, splitter._chunk_overlap, length_function, max_separator)
+        finally:
+            reset = getattr(length_function, "reset", None)
+            if reset is not None:
+                reset()
+        return chunks, spans, None
+
+    def _extract_from_pdf(self, file_path: str, metadata: Dict) -> Tuple[str, Dict]:
+        # Pages are pulled one at a time and joined once at the end; the offset of
+        # each page in the result is kept so chunks can be mapped back to pages
+        parts: List[str] = []
+        page_offsets: List[int] = []
+        position = 0
+        for page_number, page_text in self._iter_pdf_pages(file_path):
+            if parts:
+                parts.append("\n\n")
+                position += 2
+            segment = f"--- Page {page_number} ---\n{page_text}"
+            page_offsets.append(position)
+            parts.append(segment)
+            position += len(segment)
+        metadata['pages'] = len(page_offsets)
+        metadata['page_offsets'] = page_offsets
+        return "".join(parts).rstrip(), metadata
+
+    def _iter_pdf_pages(self, file_path: str) -> Iterator[Tuple[int, str]]:
+        """Yield (page_number, text) for each page, reading from the open file handle"""
+        with open(file_path, 'rb') as file:
+            pdf_reader = PyPDF2.PdfReader(file)
             for page_num, page in enumerate(pdf_reader.pages):
-                page_text = page.extract_text() or ""
-                text += f"\n--- Page {page_num + 1} ---\n{page_text}\n"
-            return text.strip(), metadata
+                yield page_num + 1, page.extract_text() or ""
 
-    async def _extract_from_docx(self, file_path: str, metadata: Dict) -> Tuple[str, Dict]:
+    def _extract_from_docx(self, file_path: str, metadata: Dict) -> Tuple[str, Dict]:
         try:
             doc = docx.Document(file_path)
         except Exception as e:
@@ -92,49 +359,195 @@ class DocumentProcessor:
         metadata['paragraphs'] = len(doc.paragraphs)
         return text.strip(), metadata
 
-    async def _extract_from_excel(self, file_path: str, metadata: Dict) -> Tuple[str, Dict]:
+    def _extract_from_excel(self, file_path: str, metadata: Dict) -> Tuple[str, Dict]:
+        # Sheets are streamed row by row in read-only mode; legacy .xls files are
+        # not readable by openpyxl and go through pandas instead
         try:
-            df = pd.read_excel(file_path, sheet_name=None)  # Read all sheets
+            workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+        except InvalidFileException:
+            return self._extract_from_legacy_excel(file_path, metadata)
         except Exception as e:
             raise ValueError(f"Failed to read Excel file: {str(e)}")
-        text = ""
+        parts: List[str] = []
+        sheets: List[str] = []
+        total_rows = 0
+        try:
+            for sheet in workbook.worksheets:
+                sheets.append(sheet.title)
+                rows = (row for row in sheet.iter_rows(values_only=True) if any(v is not None for v in row))
+                header = next(rows, None)
+                if header is None:
+                    continue
+                parts.append(f"--- Sheet: {sheet.title} ---")
+                for group, row_count in self._iter_row_groups(header, rows):
+                    parts.append(group)
+                    total_rows += row_count
+        finally:
+            workbook.close()
+        metadata['sheets'] = sheets
+        metadata['total_rows'] = total_rows
+        return "\n\n".join(parts), metadata
+
+    def _extract_from_legacy_excel(self, file_path: str, metadata: Dict) -> Tuple[str, Dict]:
+        try:
+            df = pd.read_excel(file_path, sheet_name=None, dtype=str, keep_default_na=False)
+        except Exception as e:
+            raise ValueError(f"Failed to read Excel file: {str(e)}")
+        parts: List[str] = []
         for sheet_name, sheet_df in df.items():
-            text += f"\n--- Sheet: {sheet_name} ---\n"
-            # Limit rows for very large sheets
-            if len(sheet_df) > 1000:
-                text += sheet_df.head(1000).to_string(index=False) + "\n... (truncated)\n"
-            else:
-                text += sheet_df.to_string(index=False) + "\n"
+            parts.append(f"--- Sheet: {sheet_name} ---")
+            parts.extend(group for group, _ in self._iter_row_groups(
+                sheet_df.columns, sheet_df.itertuples(index=False, name=None)
+            ))
         metadata['sheets'] = list(df.keys())
         metadata['total_rows'] = sum(len(sheet_df) for sheet_df in df.values())
-        return text.strip(), metadata
+        return "\n\n".join(parts), metadata
 
-    async def _extract_from_csv(self, file_path: str, metadata: Dict) -> Tuple[str, Dict]:
+    def _extract_from_csv(self, file_path: str, metadata: Dict) -> Tuple[str, Dict]:
+        # Parsed in fixed-size row batches so memory does not grow with the file;
+        # every cell is kept as text, exactly as written
         try:
-            df = pd.read_csv(file_path)
+            reader = pd.read_csv(
+                file_path, chunksize=settings.TABULAR_READ_BATCH_ROWS, dtype=str, keep_default_na=False
+            )
+            batches = iter(reader)
+            first = next(batches, None)
         except Exception as e:
             raise ValueError(f"Failed to read CSV file: {str(e)}")
-        # Limit rows for very large CSVs
-        if len(df) > 1000:
-            text = df.head(1000).to_string(index=False) + "\n... (truncated)"
-        else:
-            text = df.to_string(index=False)
-        metadata['rows'] = len(df)
-        metadata['columns'] = list(df.columns)
+        if first is None:
+            metadata['rows'] = 0
+            metadata['columns'] = []
+            return "", metadata
+        columns = list(first.columns)
+
+        def rows() -> Iterator[Tuple]:
+            for batch in itertools.chain([first], batches):
+                yield from batch.itertuples(index=False, name=None)
+
+        parts: List[str] = []
+        total_rows = 0
+        try:
+            for group, row_count in self._iter_row_groups(columns, rows()):
+                parts.append(group)
+                total_rows += row_count
+        except Exception as e:
+            raise ValueError(f"Failed to read CSV file: {str(e)}")
+        metadata['rows'] = total_rows
+        metadata['columns'] = columns
+        return "\n\n".join(parts), metadata
+
+    def _iter_row_groups(self, header: Iterable[Any], rows: Iterable[Iterable[Any]]) -> Iterator[Tuple[str, int]]:
+        """Render rows as " | "-separated lines in groups that each start with the header line.
+
+        Groups are separated by blank lines in the extracted text, so a
+        paragraph-aware splitter keeps rows with their column names.
+        """
+        rows_per_group = settings.TABULAR_ROWS_PER_GROUP
+        header_line = self._format_row(header)
+        lines: List[str] = [header_line]
+        for row in rows:
+            lines.append(self._format_row(row))
+            if len(lines) > rows_per_group:
+                yield "\n".join(lines), len(lines) - 1
+                lines = [header_line]
+        if len(lines) > 1:
+            yield "\n".join(lines), len(lines) - 1
+
+    @staticmethod
+    def _format_row(values: Iterable[Any]) -> str:
+        return " | ".join(
+            "" if value is None else str(value).replace("\r", " ").replace("\n", " ")
+            for value in values
+        )
+
+    def _extract_from_html(self, file_path: str, metadata: Dict) -> Tuple[str, Dict]:
+        try:
+            text, html_metadata = render_html(file_path)
+        except Exception as e:
+            raise ValueError(f"Failed to parse HTML file: {str(e)}")
+        metadata.update(html_metadata)
         return text, metadata
 
-    async def _extract_from_text(self, file_path: str, metadata: Dict) -> Tuple[str, Dict]:
-        # Detect encoding
-        async with aiofiles.open(file_path, 'rb') as file:
-            raw_data = await file.read()
-            encoding = chardet.detect(raw_data)['encoding'] or 'utf-8'
-        async with aiofiles.open(file_path, 'r', encoding=encoding) as file:
-            text = await file.read()
+    # Checked longest first: the UTF-32-LE BOM starts with the UTF-16-LE one
+    _BOMS = (
+        (codecs.BOM_UTF32_LE, 'utf-32'),
+        (codecs.BOM_UTF32_BE, 'utf-32'),
+        (codecs.BOM_UTF8, 'utf-8-sig'),
+        (codecs.BOM_UTF16_LE, 'utf-16'),
+        (codecs.BOM_UTF16_BE, 'utf-16'),
+    )
+
+    def _extract_from_text(self, file_path: str, metadata: Dict) -> Tuple[str, Dict]:
+        # The file is mapped once; detection reads a bounded sample of the mapping
+        # and the text is decoded straight from it, with no intermediate bytes copy
+        with open(file_path, 'rb') as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                text, encoding = "", 'utf-8'
+            else:
+                with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data, memoryview(data) as view:
+                    encoding = self._detect_encoding(view[:settings.TEXT_ENCODING_SAMPLE_BYTES])
+                    try:
+                        text = str(view, encoding)
+                    except UnicodeDecodeError as e:
+                        candidates = self._FALLBACK_ENCODINGS
+                        if encoding == 'utf-8':
+                            # The sample was UTF-8, so the file is ASCII-compatible; detect again
+                            # around the bad byte among encodings that keep its ASCII intact
+                            start = max(0, e.start - settings.TEXT_ENCODING_SAMPLE_BYTES // 2)
+                            candidates = (self._detect_encoding(
+                                view[start:start + settings.TEXT_ENCODING_SAMPLE_BYTES],
+                                utf8_first=False, ascii_compatible=True
+                            ),) + candidates
+                        text, encoding = self._decode(view, candidates)
+        if '\r' in text:
+            # Same universal-newline translation as reading the file in text mode
+            text = text.replace('\r\n', '\n').replace('\r', '\n')
         metadata['encoding'] = encoding
-        metadata['lines'] = len(text.split('\n'))
+        metadata['lines'] = text.count('\n') + 1
         return text, metadata
 
+    def _detect_encoding(self, sample: memoryview, utf8_first: bool = True, ascii_compatible: bool = False) -> str:
+        """Encoding of a text sample: a BOM, else UTF-8 if the sample decodes as UTF-8, else charset_normalizer's guess"""
+        for bom, encoding in self._BOMS:
+            if sample[:len(bom)] == bom:
+                return encoding
+        if utf8_first:
+            try:
+                # Incremental and not final, so a character cut off by the sample boundary is fine
+                codecs.getincrementaldecoder('utf-8')().decode(sample, final=False)
+                return 'utf-8'
+            except UnicodeDecodeError:
+                pass
+        matches = list(from_bytes(bytes(sample)))
+        if ascii_compatible:
+            # A few stray bytes in ASCII text otherwise leave EBCDIC or multi-byte CJK guesses in the running
+            matches = [match for match in matches if _is_ascii_compatible(match.encoding)]
+        if not matches:
+            return 'cp1252'
+        # Western single-byte code pages often tie on a sample; cp1252 is by far the most
+        # common of them, so it wins when it decodes the sample about as cleanly as the best
+        for match in matches:
+            if 'cp1252' in match.could_be_from_charset and match.chaos <= matches[0].chaos + 0.1:
+                return 'cp1252'
+        return matches[0].encoding
+
+    # Tried in order when the detected encoding fails on the rest of the file; latin-1 decodes any bytes
+    _FALLBACK_ENCODINGS = ('cp1252', 'latin-1')
+
+    def _decode(self, data: memoryview, encodings: Iterable[str]) -> Tuple[str, str]:
+        """Decode with the first of ``encodings`` that accepts all of ``data``"""
+        for encoding in dict.fromkeys(encodings):
+            try:
+                return str(data, encoding), encoding
+            except UnicodeDecodeError:
+                continue
+        raise ValueError("No fallback encoding could decode the file")
+
     def get_text_splitter(self, config: ChunkingConfigBase):
+        """Return the text splitter for a config, reusing the process-wide instance when one exists"""
+        return splitter_registry.get_splitter(config, self._build_text_splitter)
+
+    def _build_text_splitter(self, config: ChunkingConfigBase):
         """Create and configure text splitter based on config"""
         # Use enums for type safety
         splitter_type = config.splitter_type or SplitterType.RECURSIVE
@@ -148,8 +561,36 @@ class DocumentProcessor:
         strip_whitespace = getattr(config, "strip_whitespace", True)
         separators = getattr(config, "custom_separators", None) or getattr(config, "separators", None)
 
-        if splitter_type == SplitterType.RECURSIVE:
-            return RecursiveCharacterTextSplitter(
+        # Token-counted splits use subclasses that batch and memoize length queries
+        token_counted = isinstance(length_function, TokenLengthEngine)
+        native = (
+            getattr(config, "splitter_engine", None) == SplitterEngine.NATIVE
+            and supports_separators(separators or [], is_separator_regex)
+        )
+
+        if splitter_type == SplitterType.RECURSIVE and native:
+            return NativeRecursiveSplitter(
+                chunk_size=config.chunk_size,
+                chunk_overlap=config.chunk_overlap,
+                separators=separators or ["\n\n", "\n", " ", ""],
+                length_function=length_function,
+                is_separator_regex=is_separator_regex,
+                keep_separator=keep_separator,
+                strip_whitespace=strip_whitespace
+            )
+        elif splitter_type == SplitterType.CHARACTER and native:
+            return NativeCharacterSplitter(
+                chunk_size=config.chunk_size,
+                chunk_overlap=config.chunk_overlap,
+                separator=(separators[0] if separators else "\n"),
+                length_function=length_function,
+                is_separator_regex=is_separator_regex,
+                keep_separator=keep_separator,
+                strip_whitespace=strip_whitespace
+            )
+        elif splitter_type == SplitterType.RECURSIVE:
+            splitter_class = TokenAwareRecursiveSplitter if token_counted else RecursiveCharacterTextSplitter
+            return splitter_class(
                 chunk_size=config.chunk_size,
                 chunk_overlap=config.chunk_overlap,
                 separators=separators or ["\n\n", "\n", " ", ""],
@@ -161,7 +602,8 @@ class DocumentProcessor:
             )
         elif splitter_type == SplitterType.CHARACTER:
             separator = (separators[0] if separators else "\n")
-            return CharacterTextSplitter(
+            splitter_class = TokenAwareCharacterSplitter if token_counted else CharacterTextSplitter
+            return splitter_class(
                 chunk_size=config.chunk_size,
                 chunk_overlap=config.chunk_overlap,
                 separator=separator,
@@ -178,6 +620,31 @@ class DocumentProcessor:
                 encoding_name="cl100k_base",
                 add_start_index=add_start_index
             )
+        elif splitter_type in (SplitterType.MARKDOWN, SplitterType.HTML):
+            # HTML is extracted to text with markdown-style heading lines, so both use one splitter
+            return MarkdownSectionSplitter(NativeRecursiveSplitter(
+                chunk_size=config.chunk_size,
+                chunk_overlap=config.chunk_overlap,
+                separators=MARKDOWN_SEPARATORS,
+                length_function=length_function,
+                is_separator_regex=True,
+                keep_separator=True,
+                strip_whitespace=strip_whitespace
+            ))
+        elif splitter_type == SplitterType.CODE:
+            language = self._get_code_language(config)
+            code_separators = language_separators(language)
+            if not supports_separators(code_separators, True):
+                language, code_separators = None, language_separators(None)
+            return CodeSectionSplitter(NativeRecursiveSplitter(
+                chunk_size=config.chunk_size,
+                chunk_overlap=config.chunk_overlap,
+                separators=list(code_separators),
+                length_function=length_function,
+                is_separator_regex=True,
+                keep_separator=True,
+                strip_whitespace=strip_whitespace
+            ), language)
         else:
             # Warn and fallback
             import warnings
@@ -187,10 +654,23 @@ class DocumentProcessor:
                 chunk_overlap=config.chunk_overlap
             )
 
+    def _get_code_language(self, config: ChunkingConfigBase) -> Optional[Language]:
+        """Language named in ``additional_params["language"]`` (set from the file extension if not given)"""
+        language = (config.additional_params or {}).get("language")
+        if not language:
+            return None
+        if language not in CODE_LANGUAGES:
+            raise ValueError(f"Unsupported code language: {language}")
+        return Language(language)
+
     def _get_length_function(self, length_func: Optional[str]):
         """Get the appropriate length function"""
         if length_func == LengthFunction.TIKTOKEN or length_func == "tiktoken":
-            encoder = tiktoken.get_encoding("cl100k_base")
-            return lambda text: len(encoder.encode(text))
+            return TokenLengthEngine(splitter_registry.get_encoding("cl100k_base"))
+        elif length_func == LengthFunction.HUGGINGFACE or length_func == "huggingface":
+            return TokenLengthEngine(HuggingFaceEncoder(splitter_registry.get_hf_tokenizer()))
         else:
-            return len
\ No newline at end of file
+            return len
+
+
+document_processor = DocumentProcessor()
\ No newline at end of file
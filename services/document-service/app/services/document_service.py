@@ -1,19 +1,81 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from contextlib import nullcontext
 from datetime import datetime
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 
+import logging
 
-from app.models import Document, DocumentChunk, ChunkingConfig
-from app.schemas.document import ChunkingConfigBase
-from app.services.document_processor import DocumentProcessor
+
+from app.core.config import settings
+from app.db.writer import WriteOperation, db_writer
+from app.models import Document, DocumentChunk, ChunkingConfig, ProcessingJob, ProcessingProfile
+from app.schemas.document import ChunkingConfigBase, SplitterType
+from app.services.document_processor import (
+    DocumentProcessor, document_processor, merge_chunk_metadata, page_ranges
+)
+from app.services.stats_counters import (
+    BYTES_INGESTED, CHUNK_CHARACTERS, CHUNKS, CONTENT_TYPE_PREFIX, DOCUMENTS, STATUS_PREFIX,
+    bump_counters, chunk_totals, status_deltas
+)
+from app.services.metrics import (
+    CHUNKS_CREATED, DB_INSERT_SECONDS, DOCUMENTS_PROCESSED, EXTRACTION_SECONDS, PROCESSING_FAILURES, SPLIT_SECONDS
+)
+from app.services.profiling import ProfileRecorder, save_profile
+from app.services.splitter_registry import splitter_cache_key
+from app.services.structured_splitter import code_language
+
+logger = logging.getLogger(__name__)
+
+
+class DocumentNotFoundError(ValueError):
+    """Raised when a document is missing, including one deleted while it was being processed"""
+
+
+def update_document(document_id: str, **values) -> WriteOperation:
+    """Write that updates one document's columns, moving it between status counters if its status changes.
+
+    Returns whether the document exists; a deleted one is left alone, so no counter moves for it.
+    """
+    async def write(session: AsyncSession) -> bool:
+        if "processing_status" in values:
+            row = (await session.execute(
+                select(Document.processing_status).where(Document.id == document_id).with_for_update()
+            )).first()
+            if row is None:
+                return False
+            await bump_counters(session, status_deltas(row.processing_status, values["processing_status"]))
+        result = await session.execute(update(Document).where(Document.id == document_id).values(**values))
+        return result.rowcount > 0
+    return write
+
+
+class DocumentBusyError(ValueError):
+    """Raised when deleting a document whose processing job is running"""
+
+
+async def lock_document(session: AsyncSession, document_id: str):
+    """Check that a document still exists and lock its row until the transaction ends.
+
+    Writes that add chunks and move counters call this first, so a document
+    deleted meanwhile aborts them rather than leaving orphan chunks and
+    counters for rows that are gone.
+    """
+    exists = await session.scalar(select(Document.id).where(Document.id == document_id).with_for_update())
+    if exists is None:
+        raise DocumentNotFoundError(f"Document {document_id} not found")
+
+
+def _new_chunk_totals(chunks: List[str]) -> Dict[str, int]:
+    return {CHUNKS: len(chunks), CHUNK_CHARACTERS: sum(map(len, chunks))}
 
 
 class DocumentService:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession, processor: Optional[DocumentProcessor] = None):
         self.db = db
-        self.processor = DocumentProcessor()
+        self.processor = processor or document_processor
 
-    async def process_document(
+    async def create_document(
         self,
         file_path: str,
         filename: str,
@@ -21,86 +83,455 @@ class DocumentService:
         file_size: int,
         content_type: str,
         file_extension: str,
-        config: ChunkingConfigBase
+        config: ChunkingConfigBase,
+        content_hash: Optional[str] = None,
+        profile: bool = False
     ) -> Document:
-        """Process uploaded document and create chunks"""
+        """Register an uploaded document and queue it for background processing"""
 
-        # Create document record with file_path set
-        document = Document(
+        [document_id] = await self.create_documents([dict(
+            file_path=file_path,
             filename=filename,
             original_filename=original_filename,
-            file_path=file_path,
             file_size=file_size,
             content_type=content_type,
             file_extension=file_extension,
-            processing_status="processing"
-        )
-        self.db.add(document)
-        self.db.commit()
-        self.db.refresh(document)
+            content_hash=content_hash
+        )], config, profile=profile)
+        return await self.get_document(document_id)
 
-        # Store chunking config
-        chunking_config = ChunkingConfig(
-            document_id=document.id,
-            chunk_size=config.chunk_size,
-            chunk_overlap=config.chunk_overlap,
-            separator_type=config.separator_type,
-            custom_separators=config.custom_separators,
-            splitter_type=config.splitter_type.value if config.splitter_type else None,
-            length_function=config.length_function.value if config.length_function else "len",
-            additional_params=config.additional_params
-        )
-        self.db.add(chunking_config)
-        self.db.commit()
+    async def create_documents(
+        self, uploads: List[Dict[str, Any]], config: ChunkingConfigBase, profile: bool = False
+    ) -> List[str]:
+        """Register several uploaded documents, each with its own copy of ``config``, in one transaction.
+
+        ``uploads`` holds the Document column values of each file. Rows are
+        added per table and flushed together, so a batch costs three flushes
+        and one commit however many files it has. Returns the new document ids
+        in input order. With ``profile`` each document's processing is profiled.
+        """
+        return await db_writer.run(lambda session: self._add_documents(session, uploads, config, profile))
+
+    @staticmethod
+    async def _add_documents(
+        session: AsyncSession, uploads: List[Dict[str, Any]], config: ChunkingConfigBase, profile: bool = False
+    ) -> List[str]:
+        documents = [Document(processing_status="pending", **upload) for upload in uploads]
+        session.add_all(documents)
+        await session.flush()
+
+        deltas: Dict[str, int] = {
+            DOCUMENTS: len(documents),
+            f"{STATUS_PREFIX}pending": len(documents),
+            BYTES_INGESTED: sum(document.file_size or 0 for document in documents),
+        }
+        for document in documents:
+            key = f"{CONTENT_TYPE_PREFIX}{document.content_type}"
+            deltas[key] = deltas.get(key, 0) + 1
+        await bump_counters(session, deltas)
 
+        chunking_configs = [DocumentService._config_record(document.id, config) for document in documents]
+        session.add_all(chunking_configs)
+        await session.flush()
+
+        now = datetime.utcnow()
+        session.add_all([
+            ProcessingJob(
+                document_id=chunking_config.document_id,
+                chunking_config_id=chunking_config.id,
+                status="pending",
+                attempts=0,
+                max_attempts=settings.JOB_MAX_ATTEMPTS,
+                available_at=now,
+                profile_requested=profile
+            )
+            for chunking_config in chunking_configs
+        ])
+        return [document.id for document in documents]
+
+    async def process_document(
+        self,
+        document_id: str,
+        chunking_config_id: str,
+        profile: bool = False,
+        mark_failed: bool = True
+    ) -> Document:
+        """Extract text from a stored document and create its chunks.
+
+        With ``profile`` (or PROFILE_ALL_DOCUMENTS) extraction and splitting run
+        under cProfile, and the attempt's profile and stage timings are saved
+        whether it succeeds or fails. A failed attempt marks the document
+        failed unless ``mark_failed`` is False; the job queue passes False and
+        moves it to pending or failed itself, depending on the retries left.
+        """
+
+        document = await self.get_document(document_id)
+        if not document:
+            raise DocumentNotFoundError(f"Document {document_id} not found")
+        chunking_config = await self.db.get(ChunkingConfig, chunking_config_id)
+        if not chunking_config:
+            raise ValueError(f"Chunking config {chunking_config_id} not found")
+        config = self._config_from_record(chunking_config)
+
+        await db_writer.run(update_document(document_id, processing_status="processing", error_message=None))
+
+        recorder = ProfileRecorder() if profile or settings.PROFILE_ALL_DOCUMENTS else None
+        # Stage that is running, reported with a failure
+        stage = "extract"
+        status = "failed"
         try:
             # Extract text content
-            content, metadata = await self.processor.extract_text_from_file(file_path, content_type)
-
-            # Update document with content
-            document.content = content
-            document.content_length = len(content)
-
-            # Create text splitter and split content
-            splitter = self.processor.get_text_splitter(config)
-            chunks = splitter.split_text(content)
-
-            # Create chunk records
-            for i, chunk_content in enumerate(chunks):
-                chunk = DocumentChunk(
-                    document_id=document.id,
-                    chunk_index=i,
-                    content=chunk_content,
-                    content_length=len(chunk_content),
-                    chunk_metadata=metadata
+            with EXTRACTION_SECONDS.labels(content_type=document.content_type).time():
+                content, metadata = await self.processor.extract_text_from_file(
+                    document.file_path, document.content_type, document.content_hash, profile=recorder
+                )
+
+            # Page boundaries become per-chunk provenance rather than document metadata
+            page_offsets = metadata.pop('page_offsets', None)
+
+            # Split content with the configured text splitter
+            stage = "split"
+            chunks, spans, chunk_metadata = await self._split(
+                content, page_offsets, config, document.file_extension, profile=recorder
+            )
+
+            async def write_chunks(session: AsyncSession):
+                await lock_document(session, document_id)
+                # Drop chunks left over from an earlier attempt so retries stay idempotent
+                leftover = (
+                    DocumentChunk.document_id == document_id,
+                    DocumentChunk.chunking_config_id == chunking_config_id
+                )
+                removed = await chunk_totals(session, *leftover)
+                await bump_counters(session, {name: -value for name, value in removed.items()})
+                await session.execute(delete(DocumentChunk).where(*leftover))
+                await bump_counters(session, _new_chunk_totals(chunks))
+
+                # Create chunk records
+                await DocumentService(session, self.processor).insert_chunks(
+                    document_id, chunks, spans, chunk_metadata, chunking_config_id=chunking_config_id
                 )
-                self.db.add(chunk)
 
-            # Update document status
-            document.total_chunks = len(chunks)
-            document.processing_status = "completed"
-            document.processed_at = datetime.utcnow()
+                # Store the content and status; extraction metadata is stored once here, not per chunk
+                await update_document(
+                    document_id,
+                    content=content,
+                    content_length=len(content),
+                    extraction_metadata=metadata,
+                    page_offsets=page_offsets,
+                    active_chunking_config_id=chunking_config_id,
+                    total_chunks=len(chunks),
+                    processing_status="completed",
+                    processed_at=datetime.utcnow()
+                )(session)
 
-            self.db.commit()
-            self.db.refresh(document)  # <-- Refresh to ensure file_path and all fields are up-to-date
+            stage = "store"
+            with DB_INSERT_SECONDS.time(), (recorder.stage("store") if recorder else nullcontext()):
+                await db_writer.run(write_chunks)
+            status = "completed"
+            CHUNKS_CREATED.inc(len(chunks))
+            DOCUMENTS_PROCESSED.inc()
+            # End this session's read snapshot so the refresh sees the committed write
+            await self.db.commit()
+            await self.db.refresh(document)
             return document
 
+        except DocumentNotFoundError:
+            # Deleted while it was being processed; there is nothing left to mark failed or profile
+            recorder = None
+            raise
         except Exception as e:
-            document.processing_status = "failed"
-            document.error_message = str(e)
-            self.db.commit()
+            PROCESSING_FAILURES.labels(stage=stage).inc()
+            if mark_failed:
+                await db_writer.run(update_document(document_id, processing_status="failed", error_message=str(e)))
             raise e
+        finally:
+            if recorder is not None:
+                await self._save_profile(recorder, document_id, status)
+
+    @staticmethod
+    async def _save_profile(recorder: ProfileRecorder, document_id: str, status: str):
+        record = recorder.to_record(document_id, status)
+        try:
+            await db_writer.run(lambda session: save_profile(session, record))
+        except Exception:
+            # Losing a profile must not change the outcome of the processing it measured
+            logger.exception("Could not save the processing profile of document %s", document_id)
+
+    async def rechunk_document(self, document: Document, config: ChunkingConfigBase) -> Tuple[ChunkingConfig, bool]:
+        """Split a processed document's stored text again, as a new chunk set under a new config version.
+
+        Extraction is not repeated. If the document already has a config with
+        identical parameters, its chunk set is made active again and nothing
+        is split. Returns the now active config and whether it was reused.
+        """
+        key = self._config_key(config)
+        for record in await self.list_chunking_configs(document.id):
+            if self._config_key(self._config_from_record(record)) == key:
+                await db_writer.run(self._activate_config(document.id, record.id))
+                return record, True
+
+        content, page_offsets = (await self.db.execute(
+            select(Document.content, Document.page_offsets).where(Document.id == document.id)
+        )).one()
+        content = content or ""
+        chunks, spans, chunk_metadata = await self._split(
+            content, page_offsets, config.model_copy(deep=True), document.file_extension
+        )
+
+        async def write_chunk_set(session: AsyncSession) -> str:
+            await lock_document(session, document.id)
+            latest = await session.scalar(
+                select(func.max(ChunkingConfig.version)).where(ChunkingConfig.document_id == document.id)
+            )
+            record = self._config_record(document.id, config, version=(latest or 0) + 1)
+            session.add(record)
+            await session.flush()
+            await DocumentService(session, self.processor).insert_chunks(
+                document.id, chunks, spans, chunk_metadata, chunking_config_id=record.id
+            )
+            await bump_counters(session, _new_chunk_totals(chunks))
+            await update_document(
+                document.id, active_chunking_config_id=record.id, total_chunks=len(chunks)
+            )(session)
+            return record.id
+
+        with DB_INSERT_SECONDS.time():
+            config_id = await db_writer.run(write_chunk_set)
+        CHUNKS_CREATED.inc(len(chunks))
+        # End this session's read snapshot so the new config is visible
+        await self.db.commit()
+        return await self.db.get(ChunkingConfig, config_id), False
+
+    async def delete_document(self, document_id: str):
+        """Delete a document with its chunks, configs and jobs, and take it out of the counters.
+
+        Raises DocumentBusyError while a worker is processing the document
+        (its job is running and it is not completed or failed yet); queued
+        jobs are deleted with it, since claiming one goes through the same
+        writer (or row locks) as this delete.
+        """
+        async def delete_rows(session: AsyncSession):
+            document = (await session.execute(
+                select(Document.processing_status, Document.content_type, Document.file_size).where(
+                    Document.id == document_id
+                ).with_for_update()
+            )).first()
+            if document is None:
+                return
+            # Once completed or failed, the worker has nothing left to write for the document itself
+            if document.processing_status in ("pending", "processing"):
+                running = await session.scalar(
+                    select(ProcessingJob.id).where(
+                        ProcessingJob.document_id == document_id,
+                        ProcessingJob.status == "running"
+                    ).limit(1).with_for_update()
+                )
+                if running is not None:
+                    raise DocumentBusyError(f"Document {document_id} is being processed")
+            removed = await chunk_totals(session, DocumentChunk.document_id == document_id)
+            removed.update({
+                DOCUMENTS: 1,
+                BYTES_INGESTED: document.file_size or 0,
+                f"{STATUS_PREFIX}{document.processing_status}": 1,
+                f"{CONTENT_TYPE_PREFIX}{document.content_type}": 1,
+            })
+            await bump_counters(session, {name: -value for name, value in removed.items()})
+            await session.execute(delete(ProcessingJob).where(ProcessingJob.document_id == document_id))
+            await session.execute(delete(ProcessingProfile).where(ProcessingProfile.document_id == document_id))
+            await session.execute(delete(DocumentChunk).where(DocumentChunk.document_id == document_id))
+            await session.execute(delete(ChunkingConfig).where(ChunkingConfig.document_id == document_id))
+            await session.execute(delete(Document).where(Document.id == document_id))
+
+        await db_writer.run(delete_rows)
+
+    async def _split(
+        self,
+        content: str,
+        page_offsets: Optional[List[int]],
+        config: ChunkingConfigBase,
+        file_extension: Optional[str],
+        profile: Optional[ProfileRecorder] = None
+    ) -> Tuple[List[str], List[Tuple[Optional[int], Optional[int]]], Optional[List[Optional[Dict[str, Any]]]]]:
+        """Chunks, spans and per-chunk metadata (page ranges, section paths) of ``content``"""
+        if config.splitter_type == SplitterType.CODE and not (config.additional_params or {}).get("language"):
+            language = code_language(file_extension)
+            if language is not None:
+                config.additional_params = {**(config.additional_params or {}), "language": language.value}
+        splitter_type = config.splitter_type or SplitterType.RECURSIVE
+        with SPLIT_SECONDS.labels(splitter_type=splitter_type.value).time():
+            chunks, spans, section_metadata = await self.processor.split_text(content, config, profile=profile)
+        chunk_metadata = merge_chunk_metadata(
+            page_ranges(spans, page_offsets) if page_offsets else None, section_metadata
+        )
+        return chunks, spans, chunk_metadata
+
+    @staticmethod
+    def _activate_config(document_id: str, chunking_config_id: str) -> WriteOperation:
+        chunk_count = select(func.count()).select_from(DocumentChunk).where(
+            DocumentChunk.chunking_config_id == chunking_config_id
+        ).scalar_subquery()
+        return update_document(
+            document_id, active_chunking_config_id=chunking_config_id, total_chunks=chunk_count
+        )
+
+    async def insert_chunks(
+        self,
+        document_id: str,
+        chunks: List[str],
+        spans: Optional[List[Tuple[Optional[int], Optional[int]]]] = None,
+        chunk_metadata: Optional[List[Optional[Dict[str, Any]]]] = None,
+        batch_size: int = settings.CHUNK_INSERT_BATCH_SIZE,
+        storage_mode: str = settings.CHUNK_STORAGE_MODE,
+        chunking_config_id: Optional[str] = None
+    ):
+        """Write chunk rows with batched executemany inserts instead of per-row ORM adds.
+
+        In ``offsets`` storage mode, chunks that are verbatim slices of the
+        extracted text are stored without their text and sliced from
+        ``Document.content`` on read.
+        """
+        offsets_only = storage_mode == "offsets"
+        statement = insert(DocumentChunk.__table__)
+        for start in range(0, len(chunks), batch_size):
+            rows = []
+            for i, chunk_content in enumerate(chunks[start:start + batch_size], start=start):
+                start_pos, end_pos = spans[i] if spans else (None, None)
+                # Only verbatim slices can be rebuilt from offsets; covering spans keep their text
+                verbatim = start_pos is not None and end_pos - start_pos == len(chunk_content)
+                rows.append({
+                    "document_id": document_id,
+                    "chunking_config_id": chunking_config_id,
+                    "chunk_index": i,
+                    "content": None if offsets_only and verbatim else chunk_content,
+                    "content_length": len(chunk_content),
+                    "start_pos": start_pos,
+                    "end_pos": end_pos,
+                    "chunk_metadata": chunk_metadata[i] if chunk_metadata else None
+                })
+            await self.db.execute(statement, rows)
+
+    async def get_document(self, document_id: str) -> Optional[Document]:
+        # A query rather than Session.get, so attributes expired by a flush are reloaded here
+        return await self.db.scalar(select(Document).where(Document.id == document_id))
+
+    async def get_document_chunks(self, document_id: str) -> List[DocumentChunk]:
+        result = await self.db.scalars(
+            select(DocumentChunk).where(
+                DocumentChunk.document_id == document_id
+            ).order_by(DocumentChunk.chunk_index)
+        )
+        return list(result)
+
+    async def get_chunk(self, document_id: str, chunk_id: str) -> Optional[Tuple[DocumentChunk, str]]:
+        """One chunk and its text by id, from whichever of the document's chunk sets holds it"""
+        chunk = await self.db.scalar(
+            select(DocumentChunk).where(DocumentChunk.document_id == document_id, DocumentChunk.id == chunk_id)
+        )
+        if chunk is None:
+            return None
+        return (await self._with_content(document_id, [chunk]))[0]
+
+    async def get_chunk_page(
+        self,
+        document_id: str,
+        after: int = -1,
+        limit: Optional[int] = None,
+        chunking_config_id: Optional[str] = None
+    ) -> List[Tuple[DocumentChunk, str]]:
+        """Keyset page of (chunk, text) ordered by chunk_index, starting after the given index.
+
+        Chunks come from the given config's chunk set, or the document's active one.
+        """
+        if chunking_config_id is None:
+            chunking_config_id = await self.db.scalar(
+                select(Document.active_chunking_config_id).where(Document.id == document_id)
+            )
+            if chunking_config_id is None:
+                return []
+        query = select(DocumentChunk).where(
+            DocumentChunk.document_id == document_id,
+            DocumentChunk.chunking_config_id == chunking_config_id,
+            DocumentChunk.chunk_index > after
+        ).order_by(DocumentChunk.chunk_index)
+        if limit is not None:
+            query = query.limit(limit)
+        return await self._with_content(document_id, list(await self.db.scalars(query)))
+
+    async def _with_content(self, document_id: str, chunks: List[DocumentChunk]) -> List[Tuple[DocumentChunk, str]]:
+        """Pair chunks with their text; offsets-only chunks are sliced from Document.content.
+
+        The span the chunks cover is read once and sliced here: slicing in SQL
+        loads the whole document text once per chunk.
+        """
+        sliced = [chunk for chunk in chunks if chunk.content is None and chunk.start_pos is not None]
+        if not sliced:
+            return [(chunk, chunk.content) for chunk in chunks]
+        start = min(chunk.start_pos for chunk in sliced)
+        end = max(chunk.end_pos for chunk in sliced)
+        text = await self.db.scalar(
+            select(func.substr(Document.content, start + 1, end - start)).where(Document.id == document_id)
+        ) or ""
+        return [
+            (chunk, chunk.content if chunk.content is not None or chunk.start_pos is None
+             else text[chunk.start_pos - start:chunk.end_pos - start])
+            for chunk in chunks
+        ]
+
+    async def list_chunking_configs(self, document_id: str) -> List[ChunkingConfig]:
+        result = await self.db.scalars(
+            select(ChunkingConfig).where(
+                ChunkingConfig.document_id == document_id
+            ).order_by(ChunkingConfig.version)
+        )
+        return list(result)
+
+    async def get_latest_job(self, document_id: str) -> Optional[ProcessingJob]:
+        return await self.db.scalar(
+            select(ProcessingJob).where(
+                ProcessingJob.document_id == document_id
+            ).order_by(ProcessingJob.created_at.desc()).limit(1)
+        )
+
+    async def list_documents(self, skip: int = 0, limit: int = 100) -> tuple[List[Document], int]:
+        total = await self.db.scalar(select(func.count()).select_from(Document))
+        documents = await self.db.scalars(select(Document).offset(skip).limit(limit))
+        return list(documents), total
+
+    @staticmethod
+    def _config_record(document_id: str, config: ChunkingConfigBase, version: int = 1) -> ChunkingConfig:
+        return ChunkingConfig(
+            document_id=document_id,
+            chunk_size=config.chunk_size,
+            chunk_overlap=config.chunk_overlap,
+            separator_type=config.separator_type,
+            custom_separators=config.custom_separators,
+            splitter_type=config.splitter_type.value if config.splitter_type else None,
+            length_function=config.length_function.value if config.length_function else "len",
+            splitter_engine=config.splitter_engine.value if config.splitter_engine else "langchain",
+            additional_params=config.additional_params,
+            version=version,
+            created_at=datetime.utcnow()
+        )
 
-    def get_document(self, document_id: str) -> Optional[Document]:
-        return self.db.query(Document).filter(Document.id == document_id).first()
+    @staticmethod
+    def _config_key(config: ChunkingConfigBase) -> Tuple:
+        """Canonical form of a config's parameters; equal keys produce identical chunk sets.
 
-    def get_document_chunks(self, document_id: str) -> List[DocumentChunk]:
-        return self.db.query(DocumentChunk).filter(
-            DocumentChunk.document_id == document_id
-        ).order_by(DocumentChunk.chunk_index).all()
+        The fields that build the splitter, as the splitter registry keys it, so
+        labels such as ``separator_type`` do not defeat reuse.
+        """
+        return splitter_cache_key(config)
 
-    def list_documents(self, skip: int = 0, limit: int = 100) -> tuple[List[Document], int]:
-        query = self.db.query(Document)
-        total = query.count()
-        documents = query.offset(skip).limit(limit).all()
-        return documents, total
\ No newline at end of file
+    @staticmethod
+    def _config_from_record(record: ChunkingConfig) -> ChunkingConfigBase:
+        return ChunkingConfigBase(
+            chunk_size=record.chunk_size,
+            chunk_overlap=record.chunk_overlap,
+            separator_type=record.separator_type,
+            custom_separators=record.custom_separators,
+            splitter_type=record.splitter_type,
+            length_function=record.length_function,
+            splitter_engine=record.splitter_engine or "langchain",
+            additional_params=record.additional_params
+        )
\ No newline at end of file
@@ -0,0 +1,66 @@
+import copy
+import sys
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.config import settings
+
+
+class ExtractionCache:
+    """Size-bounded LRU of extracted text keyed by the SHA-256 of the raw upload and
+    the type it was extracted as.
+
+    Re-uploading bytes that were already parsed (typically to try other chunking
+    settings) skips extraction and goes straight to splitting.
+    """
+
+    def __init__(self, max_bytes: int = settings.EXTRACTION_CACHE_MAX_MB * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[str, Dict[str, Any], int]]" = OrderedDict()
+
+    def get(self, content_hash: str, file_type: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        entry = self._entries.get((content_hash, file_type))
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end((content_hash, file_type))
+        self.hits += 1
+        text, metadata, _ = entry
+        return text, copy.deepcopy(metadata)
+
+    def put(self, content_hash: str, file_type: str, text: str, metadata: Dict[str, Any]):
+        size = sys.getsizeof(text)
+        if size > self.max_bytes:
+            return
+        key = (content_hash, file_type)
+        if key in self._entries:
+            self.current_bytes -= self._entries.pop(key)[2]
+        self._entries[key] = (text, copy.deepcopy(metadata), size)
+        self.current_bytes += size
+        while self.current_bytes > self.max_bytes:
+            _, (_, _, evicted_size) = self._entries.popitem(last=False)
+            self.current_bytes -= evicted_size
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+        self.current_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "size_bytes": self.current_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+
+extraction_cache = ExtractionCache()
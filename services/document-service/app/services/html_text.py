@@ -0,0 +1,146 @@
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from lxml import etree
+
+HEADING_LEVELS = {"h1": 1, "h2": 2, "h3": 3, "h4": 4, "h5": 5, "h6": 6}
+# Elements whose content never reaches the text
+SKIP_TAGS = {
+    "script", "style", "noscript", "template", "svg", "math", "iframe", "object",
+    "canvas", "select", "button"
+}
+BLOCK_TAGS = {
+    "address", "article", "aside", "blockquote", "body", "dd", "details", "div", "dl", "dt",
+    "fieldset", "figcaption", "figure", "footer", "form", "header", "html", "main", "nav",
+    "ol", "p", "section", "summary", "table", "tbody", "tfoot", "thead", "tr", "ul"
+}
+CELL_TAGS = {"td", "th"}
+_WHITESPACE = re.compile(r"\s+")
+
+
+class _TextWriter:
+    """Accumulates rendered text, collapsing HTML whitespace and block breaks"""
+
+    def __init__(self):
+        self.parts: List[str] = []
+        self.pending_break = 0
+        self.line_empty = True
+
+    def block_break(self, newlines: int):
+        self.pending_break = max(self.pending_break, newlines)
+        self.line_empty = True
+
+    def write(self, text: str, preformatted: bool = False):
+        if not preformatted:
+            text = _WHITESPACE.sub(" ", text)
+            if self.line_empty:
+                text = text.lstrip(" ")
+        if text:
+            self.write_raw(text)
+
+    def write_raw(self, text: str):
+        if self.pending_break and self.parts:
+            self.parts[-1] = self.parts[-1].rstrip(" ")
+            self.parts.append("\n" * self.pending_break)
+        self.pending_break = 0
+        self.line_empty = False
+        self.parts.append(text)
+
+    def getvalue(self) -> str:
+        return "".join(self.parts).strip()
+
+
+def render_html(file_path: str) -> Tuple[str, Dict[str, Any]]:
+    """Render an HTML file to plain text in one streaming pass.
+
+    Markup, scripts and styles are dropped; headings become markdown-style
+    ``#`` lines so the heading-aware splitter can rebuild the section path of
+    every chunk. Elements are cleared as soon as their text and tail have been
+    written, so memory stays bounded by the nesting depth, not the file size.
+    """
+    writer = _TextWriter()
+    title_parts: List[str] = []
+    headings = 0
+    skip_depth = 0
+    pre_depth = 0
+    in_head = in_title = in_heading = False
+    # .text is only complete once the next event arrives, .tail once the one after that
+    open_text: Optional[Any] = None
+    pending_tail: Optional[Any] = None
+
+    def emit(text: Optional[str]):
+        if not text or skip_depth:
+            return
+        if in_title:
+            title_parts.append(text)
+        elif not in_head:
+            writer.write(text, preformatted=pre_depth > 0)
+
+    for event, elem in etree.iterparse(
+        file_path, events=("start", "end"), html=True, remove_comments=True, remove_pis=True
+    ):
+        if pending_tail is not None:
+            emit(pending_tail.tail)
+            parent = pending_tail.getparent()
+            pending_tail.clear()
+            if parent is not None:
+                while pending_tail.getprevious() is not None:
+                    del parent[0]
+            pending_tail = None
+        if open_text is not None:
+            emit(open_text.text)
+            open_text = None
+
+        tag = elem.tag.lower() if isinstance(elem.tag, str) else ""
+        if event == "start":
+            if skip_depth or tag in SKIP_TAGS:
+                skip_depth += 1
+            elif tag == "head":
+                in_head = True
+            elif tag == "title":
+                in_title = True
+            elif tag in HEADING_LEVELS:
+                headings += 1
+                in_heading = True
+                writer.block_break(2)
+                writer.write_raw("#" * HEADING_LEVELS[tag] + " ")
+                writer.line_empty = True
+            elif tag == "pre":
+                writer.block_break(2)
+                pre_depth += 1
+            elif tag == "li":
+                writer.block_break(1)
+                writer.write_raw("- ")
+                writer.line_empty = True
+            elif tag in CELL_TAGS and not writer.line_empty:
+                writer.write_raw(" | ")
+                writer.line_empty = True
+            elif tag in BLOCK_TAGS:
+                writer.block_break(2 if tag == "p" else 1)
+            open_text = elem
+        else:
+            if skip_depth:
+                skip_depth -= 1
+            elif tag == "head":
+                in_head = False
+            elif tag == "title":
+                in_title = False
+            elif tag in HEADING_LEVELS:
+                in_heading = False
+                writer.block_break(2)
+            elif tag == "pre":
+                pre_depth -= 1
+                writer.block_break(2)
+            elif tag == "br" and not in_heading:
+                writer.block_break(1)
+            elif tag == "hr":
+                writer.block_break(2)
+            elif tag in BLOCK_TAGS or tag == "li":
+                writer.block_break(2 if tag == "p" else 1)
+            pending_tail = elem
+
+    title = _WHITESPACE.sub(" ", "".join(title_parts)).strip()
+    metadata: Dict[str, Any] = {"headings": headings}
+    if title:
+        metadata["title"] = title
+    return writer.getvalue(), metadata
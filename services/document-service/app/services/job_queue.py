@@ -0,0 +1,174 @@
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+from sqlalchemy import func, select, update
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.db.writer import db_writer
+from app.models import Document, ProcessingJob
+from app.services.document_service import DocumentService, update_document
+from app.services.stats_counters import bump_counters, status_deltas
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueue:
+    """Bounded pool of asyncio workers draining the persistent ``processing_jobs`` table.
+
+    Jobs live in the database, so anything queued survives a restart; the
+    in-process event only shortens the wait between an upload and its pickup.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = settings.WORKER_CONCURRENCY,
+        poll_interval: float = settings.JOB_POLL_INTERVAL_SECONDS,
+        retry_backoff: float = settings.JOB_RETRY_BACKOFF_SECONDS
+    ):
+        self.concurrency = concurrency or os.cpu_count() or 1
+        self.poll_interval = poll_interval
+        self.retry_backoff = retry_backoff
+        self.in_flight = 0
+        self._workers: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+
+    async def start(self):
+        """Requeue jobs interrupted by a previous shutdown and spawn the workers"""
+        if self._workers:
+            return
+        await self._recover_interrupted_jobs()
+        self._wakeup = asyncio.Event()
+        self._workers = [
+            asyncio.create_task(self._worker(i), name=f"document-worker-{i}")
+            for i in range(self.concurrency)
+        ]
+
+    async def stop(self):
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._wakeup = None
+
+    def notify(self):
+        """Wake idle workers after new jobs were committed"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def depth(self) -> int:
+        """Number of jobs waiting to be picked up"""
+        async with SessionLocal() as db:
+            return await db.scalar(
+                select(func.count()).select_from(ProcessingJob).where(ProcessingJob.status == "pending")
+            )
+
+    async def _worker(self, worker_id: int):
+        while True:
+            job = await self._claim_next_job()
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            self.in_flight += 1
+            try:
+                await self._run_job(*job)
+            except Exception:
+                logger.exception("Worker %s crashed while handling job %s", worker_id, job[0])
+            finally:
+                self.in_flight -= 1
+
+    async def _claim_next_job(self) -> Optional[Tuple[str, str, str, bool]]:
+        """Atomically move the oldest runnable job from pending to running"""
+        return await db_writer.run(self._claim)
+
+    @staticmethod
+    async def _claim(db) -> Optional[Tuple[str, str, str, bool]]:
+        while True:
+            now = datetime.utcnow()
+            job = (await db.execute(
+                select(
+                    ProcessingJob.id,
+                    ProcessingJob.document_id,
+                    ProcessingJob.chunking_config_id,
+                    ProcessingJob.profile_requested
+                ).where(
+                    ProcessingJob.status == "pending",
+                    ProcessingJob.available_at <= now
+                ).order_by(ProcessingJob.created_at).limit(1)
+            )).first()
+            if job is None:
+                return None
+            # Guarded on the status in case another process claimed it first
+            claimed = await db.execute(
+                update(ProcessingJob).where(
+                    ProcessingJob.id == job.id,
+                    ProcessingJob.status == "pending"
+                ).values({
+                    ProcessingJob.status: "running",
+                    ProcessingJob.attempts: ProcessingJob.attempts + 1,
+                    ProcessingJob.started_at: now
+                }).execution_options(synchronize_session=False)
+            )
+            if claimed.rowcount:
+                return job.id, job.document_id, job.chunking_config_id, job.profile_requested
+
+    async def _run_job(self, job_id: str, document_id: str, chunking_config_id: str, profile: bool = False):
+        async with SessionLocal() as db:
+            try:
+                # The document's status follows the job's retry state, written by _record_failure
+                await DocumentService(db).process_document(
+                    document_id, chunking_config_id, profile=profile, mark_failed=False
+                )
+            except Exception as e:
+                logger.warning("Job %s for document %s failed: %s", job_id, document_id, e)
+                error = str(e)
+                await db_writer.run(lambda session: self._record_failure(session, job_id, error))
+                return
+        await db_writer.run(lambda session: session.execute(
+            update(ProcessingJob).where(ProcessingJob.id == job_id).values(
+                status="completed", last_error=None, finished_at=datetime.utcnow()
+            )
+        ))
+
+    async def _record_failure(self, db, job_id: str, error: str):
+        job = await db.get(ProcessingJob, job_id)
+        if job is None:
+            # Deleted with its document while it ran; nothing to retry
+            return
+        job.last_error = error
+        if job.attempts < job.max_attempts:
+            # Exponential backoff; the document goes back to pending until the retry runs
+            delay = self.retry_backoff * (2 ** (job.attempts - 1))
+            job.status = "pending"
+            job.available_at = datetime.utcnow() + timedelta(seconds=delay)
+            await update_document(job.document_id, processing_status="pending", error_message=error)(db)
+        else:
+            job.status = "failed"
+            job.finished_at = datetime.utcnow()
+            await update_document(job.document_id, processing_status="failed", error_message=error)(db)
+
+    async def _recover_interrupted_jobs(self):
+        async def recover(db):
+            await db.execute(
+                update(ProcessingJob).where(ProcessingJob.status == "running").values(status="pending")
+            )
+            interrupted = await db.scalar(
+                select(func.count()).select_from(Document).where(Document.processing_status == "processing")
+            )
+            await bump_counters(db, status_deltas("processing", "pending", interrupted))
+            await db.execute(
+                update(Document).where(Document.processing_status == "processing").values(
+                    processing_status="pending"
+                )
+            )
+        await db_writer.run(recover)
+
+
+job_queue = JobQueue()
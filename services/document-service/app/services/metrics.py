@@ -0,0 +1,87 @@
+import asyncio
+import time
+from typing import Optional
+
+from prometheus_client import Counter, Gauge, Histogram
+
+from app.core.config import settings
+from app.db.writer import db_writer
+
+# Stages range from a MIME sniff (well under a millisecond) to extracting a large PDF
+STAGE_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+UPLOAD_RECEIVE_SECONDS = Histogram(
+    "document_upload_receive_seconds",
+    "Time to stream one uploaded file to disk, including hashing and MIME sniffing",
+    buckets=STAGE_BUCKETS
+)
+MIME_SNIFF_SECONDS = Histogram(
+    "document_mime_sniff_seconds",
+    "Time to sniff the MIME type of an upload from its first buffer",
+    buckets=STAGE_BUCKETS
+)
+EXTRACTION_SECONDS = Histogram(
+    "document_extraction_seconds",
+    "Time to extract the text of a document, including waiting for a pool worker",
+    ["content_type"],
+    buckets=STAGE_BUCKETS
+)
+SPLIT_SECONDS = Histogram(
+    "document_split_seconds",
+    "Time to split extracted text into chunks, including waiting for a pool worker",
+    ["splitter_type"],
+    buckets=STAGE_BUCKETS
+)
+DB_INSERT_SECONDS = Histogram(
+    "document_db_insert_seconds",
+    "Time to store a document's chunks and content, including waiting for the database writer",
+    buckets=STAGE_BUCKETS
+)
+
+UPLOAD_BYTES = Counter("document_upload_bytes", "Bytes of uploaded files stored on disk")
+CHUNKS_CREATED = Counter("document_chunks_created", "Chunks written by processing and rechunking")
+DOCUMENTS_PROCESSED = Counter("document_processing_completed", "Processing attempts that stored their chunks")
+PROCESSING_FAILURES = Counter(
+    "document_processing_failures",
+    "Processing attempts that failed, by the stage that raised",
+    ["stage"]
+)
+
+# The job queue gauges are set by the /metrics endpoint on each scrape
+QUEUE_DEPTH = Gauge("document_job_queue_depth", "Processing jobs waiting to be picked up")
+JOBS_IN_FLIGHT = Gauge("document_jobs_in_flight", "Processing jobs currently being handled by a worker")
+DB_WRITE_QUEUE_DEPTH = Gauge("document_db_write_queue_depth", "Writes waiting for the database writer's next group")
+DB_WRITE_QUEUE_DEPTH.set_function(db_writer.depth)
+
+EVENT_LOOP_LAG_SECONDS = Histogram(
+    "event_loop_lag_seconds",
+    "How late the event loop ran a timed wakeup; blocking code on the loop shows up here",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+)
+
+
+class LoopLagMonitor:
+    """Background task that sleeps for a fixed interval and records how late it woke up (off when the interval is 0)"""
+
+    def __init__(self, interval: float = settings.EVENT_LOOP_LAG_INTERVAL_SECONDS):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if self._task is None and self.interval > 0:
+            self._task = asyncio.create_task(self._run(), name="loop-lag-monitor")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            EVENT_LOOP_LAG_SECONDS.observe(max(0.0, time.perf_counter() - started - self.interval))
+
+
+loop_lag_monitor = LoopLagMonitor()
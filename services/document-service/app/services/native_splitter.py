@@ -0,0 +1,262 @@
+import logging
+import re
+from itertools import accumulate, compress, repeat
+from operator import lt, ne, sub
+from typing import Callable, List, Literal, Optional, Sequence, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# Parallel lists of piece start and end offsets (half-open) into the text being split
+Pieces = Tuple[List[int], List[int]]
+# Chunk offsets as stored on DocumentChunk; (None, None) when the chunk is not in the text
+Span = Tuple[Optional[int], Optional[int]]
+KeepSeparator = Union[bool, Literal["start", "end"]]
+
+
+def supports_separators(separators: Sequence[str], is_separator_regex: bool) -> bool:
+    """Whether the native engine reproduces LangChain for these separators.
+
+    ``re.split`` returns the text of capturing groups as extra pieces, which
+    has no span equivalent; such patterns stay on the LangChain splitters.
+    """
+    if not is_separator_regex:
+        return True
+    return all(re.compile(separator).groups == 0 for separator in separators if separator)
+
+
+class _NativeSplitter:
+    """Span-based counterpart of LangChain's ``TextSplitter`` merge logic.
+
+    Pieces are offsets into the one input string; with the default ``len``
+    length function nothing is sliced until a final chunk is emitted. Output
+    (chunks and their order) matches LangChain's splitters for the same
+    options, and each chunk comes with its offsets in the input.
+    """
+
+    def __init__(
+        self,
+        chunk_size: int,
+        chunk_overlap: int,
+        length_function: Callable[[str], int] = len,
+        keep_separator: KeepSeparator = False,
+        is_separator_regex: bool = False,
+        strip_whitespace: bool = True
+    ):
+        if chunk_overlap > chunk_size:
+            raise ValueError(
+                f"Got a larger chunk overlap ({chunk_overlap}) than chunk size "
+                f"({chunk_size}), should be smaller."
+            )
+        self._chunk_size = chunk_size
+        self._chunk_overlap = chunk_overlap
+        self._length_function = length_function
+        self._keep_separator = keep_separator
+        self._is_separator_regex = is_separator_regex
+        self._strip_whitespace = strip_whitespace
+
+    def split_text(self, text: str) -> List[str]:
+        return self.split_text_with_spans(text)[0]
+
+    def split_text_with_spans(self, text: str) -> Tuple[List[str], List[Span]]:
+        try:
+            results = self._split_with_spans(text)
+        finally:
+            # Memoizing length functions (TokenLengthEngine) are scoped to one call
+            reset = getattr(self._length_function, "reset", None)
+            if reset is not None:
+                reset()
+        return [chunk for chunk, _ in results], [span for _, span in results]
+
+    def _split_with_spans(self, text: str) -> List[Tuple[str, Span]]:
+        raise NotImplementedError
+
+    def _lengths(self, text: str, starts: List[int], ends: List[int]) -> List[int]:
+        if self._length_function is len:
+            return list(map(sub, ends, starts))
+        pieces = [text[start:end] for start, end in zip(starts, ends)]
+        # Token counters (TokenLengthEngine) count a whole level in one batched call
+        prime = getattr(self._length_function, "prime", None)
+        if prime is not None:
+            prime(pieces)
+        return list(map(self._length_function, pieces))
+
+    def _split_pieces(self, text: str, start: int, end: int, separator: str) -> Pieces:
+        """Equivalent of LangChain's ``_split_text_with_regex`` over text[start:end]"""
+        if not separator:
+            return list(range(start, end)), list(range(start + 1, end + 1))
+        match_starts, match_ends = self._find_separators(text, start, end, separator)
+        if not self._keep_separator:
+            starts, ends = [start, *match_ends], [*match_starts, end]
+        else:
+            # keep_separator True / "start" opens each piece with its separator; "end" closes it
+            boundaries = [start, *(match_ends if self._keep_separator == "end" else match_starts), end]
+            starts, ends = boundaries[:-1], boundaries[1:]
+        non_empty = list(map(lt, starts, ends))
+        if all(non_empty):
+            return starts, ends
+        return list(compress(starts, non_empty)), list(compress(ends, non_empty))
+
+    def _find_separators(self, text: str, start: int, end: int, separator: str) -> Pieces:
+        """Start and end offsets of every separator match in text[start:end]"""
+        if self._is_separator_regex:
+            # Match against the slice so anchors and lookbehinds see what LangChain sees
+            spans = [match.span() for match in re.finditer(separator, text[start:end])]
+            return [start + s for s, _ in spans], [start + e for _, e in spans]
+        # Literal separators: str.split in C, then rebuild offsets from the piece lengths
+        width = len(separator)
+        piece_lengths = map(len, text[start:end].split(separator))
+        match_ends = list(accumulate(map(width.__add__, piece_lengths), initial=start))[1:-1]
+        return [offset - width for offset in match_ends], match_ends
+
+    def _contains(self, text: str, start: int, end: int, separator: str) -> bool:
+        if self._is_separator_regex:
+            return re.search(separator, text[start:end]) is not None
+        return text.find(separator, start, end) != -1
+
+    def _merge_pieces(
+        self, text: str, starts: List[int], ends: List[int], lengths: List[int], separator: str
+    ) -> List[Tuple[str, Span]]:
+        """Equivalent of LangChain's ``_merge_splits`` over pieces"""
+        chunk_size, chunk_overlap = self._chunk_size, self._chunk_overlap
+        separator_len = self._length_function(separator)
+        docs: List[Tuple[str, Span]] = []
+        # broken[j] counts the gaps before piece j that are not exactly one separator;
+        # a run of pieces is a verbatim slice of the text when it spans none of them
+        if self._is_separator_regex and separator:
+            gaps = (text[gap_start:gap_end] != separator for gap_start, gap_end in zip(ends, starts[1:]))
+        else:
+            # Between two kept pieces there are only whole separator matches
+            gaps = map(ne, map(sub, starts[1:], ends), repeat(len(separator)))
+        broken = list(accumulate(gaps, initial=0))
+        # The current chunk is always the run of pieces [first, i)
+        first = 0
+        total = 0
+        for i, piece_len in enumerate(lengths):
+            if total + piece_len + (separator_len if i > first else 0) > chunk_size:
+                if total > chunk_size:
+                    logger.warning(
+                        "Created a chunk of size %s, which is longer than the specified %s",
+                        total, chunk_size
+                    )
+                if i > first:
+                    doc = self._join(text, starts, ends, first, i, separator, broken[i - 1] == broken[first])
+                    if doc is not None:
+                        docs.append(doc)
+                    while total > chunk_overlap or (
+                        total + piece_len + (separator_len if i > first else 0) > chunk_size
+                        and total > 0
+                    ):
+                        total -= lengths[first] + (separator_len if i - first > 1 else 0)
+                        first += 1
+            total += piece_len + (separator_len if i > first else 0)
+        stop = len(lengths)
+        if stop > first:
+            doc = self._join(text, starts, ends, first, stop, separator, broken[stop - 1] == broken[first])
+            if doc is not None:
+                docs.append(doc)
+        return docs
+
+    def _join(
+        self,
+        text: str,
+        starts: List[int],
+        ends: List[int],
+        first: int,
+        stop: int,
+        separator: str,
+        contiguous: bool
+    ) -> Optional[Tuple[str, Span]]:
+        chunk_start, chunk_end = starts[first], ends[stop - 1]
+        if contiguous:
+            return self._finish(text[chunk_start:chunk_end], chunk_start, chunk_end)
+        # Dropped empty pieces (e.g. "\n\n" split on "\n") or a regex separator make
+        # LangChain re-join with the separator string, so the chunk is not a verbatim slice
+        if self._is_separator_regex:
+            pieces = [text[start:end] for start, end in zip(starts[first:stop], ends[first:stop])]
+        else:
+            # The run's pieces are exactly the non-empty splits of its covering slice
+            pieces = filter(None, text[chunk_start:chunk_end].split(separator))
+        doc = self._finish(separator.join(pieces), chunk_start, chunk_end)
+        if doc is not None and doc[1][1] - doc[1][0] == len(doc[0]):
+            # Storage treats a span of the chunk's length as verbatim; give up the
+            # position rather than have offsets-only storage rebuild the wrong text
+            return doc[0], (None, None)
+        return doc
+
+    def _finish(self, chunk: str, start: int, end: int) -> Optional[Tuple[str, Span]]:
+        if self._strip_whitespace:
+            stripped = chunk.strip()
+            if len(stripped) != len(chunk):
+                start += len(chunk) - len(chunk.lstrip()) if stripped else 0
+                end = start + len(stripped)
+                chunk = stripped
+        if chunk == "":
+            return None
+        return chunk, (start, end)
+
+
+class NativeRecursiveSplitter(_NativeSplitter):
+    """Span-based equivalent of ``RecursiveCharacterTextSplitter``"""
+
+    def __init__(self, separators: Optional[List[str]] = None, **kwargs):
+        super().__init__(**kwargs)
+        self._separators = separators or ["\n\n", "\n", " ", ""]
+
+    def _split_with_spans(self, text: str) -> List[Tuple[str, Span]]:
+        return self._split(text, 0, len(text), self._separators)
+
+    def split_range(self, text: str, start: int, end: int) -> List[Tuple[str, Span]]:
+        """Split text[start:end] as if it were the whole input, with spans into ``text``.
+
+        Callers that split many ranges of one text reset a memoizing length
+        function themselves once they are done.
+        """
+        return self._split(text, start, end, self._separators)
+
+    def _split(self, text: str, start: int, end: int, separators: List[str]) -> List[Tuple[str, Span]]:
+        final_chunks: List[Tuple[str, Span]] = []
+        separator = separators[-1]
+        new_separators: List[str] = []
+        for i, candidate in enumerate(separators):
+            if candidate == "":
+                separator = candidate
+                break
+            if self._contains(text, start, end, candidate):
+                separator = candidate
+                new_separators = separators[i + 1:]
+                break
+
+        starts, ends = self._split_pieces(text, start, end, separator)
+        lengths = self._lengths(text, starts, ends)
+        merge_separator = "" if self._keep_separator else separator
+        # Runs of pieces under chunk_size are merged; each oversized piece in between
+        # is split further with the remaining separators
+        run_start = 0
+        oversized = [j for j, piece_len in enumerate(lengths) if piece_len >= self._chunk_size]
+        for j in oversized + [len(lengths)]:
+            if j > run_start:
+                final_chunks.extend(self._merge_pieces(
+                    text, starts[run_start:j], ends[run_start:j], lengths[run_start:j], merge_separator
+                ))
+            run_start = j + 1
+            if j == len(lengths):
+                break
+            if not new_separators:
+                # LangChain emits an unsplittable piece as-is, without stripping
+                final_chunks.append((text[starts[j]:ends[j]], (starts[j], ends[j])))
+            else:
+                final_chunks.extend(self._split(text, starts[j], ends[j], new_separators))
+        return final_chunks
+
+
+class NativeCharacterSplitter(_NativeSplitter):
+    """Span-based equivalent of ``CharacterTextSplitter``"""
+
+    def __init__(self, separator: str = "\n\n", **kwargs):
+        super().__init__(**kwargs)
+        self._separator = separator
+
+    def _split_with_spans(self, text: str) -> List[Tuple[str, Span]]:
+        starts, ends = self._split_pieces(text, 0, len(text), self._separator)
+        merge_separator = "" if self._keep_separator else self._separator
+        return self._merge_pieces(text, starts, ends, self._lengths(text, starts, ends), merge_separator)
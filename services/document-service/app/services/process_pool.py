@@ -0,0 +1,138 @@
+import asyncio
+import functools
+import logging
+import multiprocessing
+import os
+import resource
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional
+
+from app.core.config import settings
+from app.services.splitter_registry import splitter_registry
+
+logger = logging.getLogger(__name__)
+
+
+def _init_worker(memory_limit_mb: int):
+    """Cap the address space of a pool process and warm its encoder cache"""
+    if memory_limit_mb > 0:
+        limit = memory_limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    splitter_registry.warm()
+
+
+class ProcessingPool:
+    """Process pool that runs CPU-bound extraction and splitting off the event loop.
+
+    A task that exceeds ``task_timeout`` or dies (e.g. by hitting the memory
+    limit) takes the pool down with it: the remaining workers are terminated
+    and a fresh pool is created on the next call. Tasks that were only in
+    flight alongside it are not failed: after a timeout they are resubmitted,
+    and after a worker death (whose cause is unknown) each is rerun alone in a
+    single-worker quarantine pool, so only the task that kills a worker fails.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = settings.PROCESS_POOL_WORKERS,
+        task_timeout: float = settings.PROCESS_TASK_TIMEOUT_SECONDS,
+        memory_limit_mb: int = settings.PROCESS_TASK_MEMORY_LIMIT_MB
+    ):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.task_timeout = task_timeout
+        self.memory_limit_mb = memory_limit_mb
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._quarantine: Optional[ProcessPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._quarantine_lock: Optional[asyncio.Lock] = None
+        # Pools terminated because one of their tasks timed out
+        self._timed_out: "weakref.WeakSet[ProcessPoolExecutor]" = weakref.WeakSet()
+
+    def start(self):
+        # One submission per worker, so the timeout never counts time spent queued
+        self._slots = asyncio.Semaphore(self.max_workers)
+        self._quarantine_lock = asyncio.Lock()
+        self._get_executor()
+
+    def shutdown(self):
+        for executor in (self._executor, self._quarantine):
+            if executor is not None:
+                executor.shutdown(wait=True, cancel_futures=True)
+        self._executor = self._quarantine = None
+        self._slots = self._quarantine_lock = None
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run a picklable callable in the pool, enforcing the per-task timeout"""
+        if self._slots is None:
+            self.start()
+        call = functools.partial(fn, *args, **kwargs)
+        while True:
+            async with self._slots:
+                executor = self._get_executor()
+                try:
+                    return await self._submit(executor, call)
+                except BrokenProcessPool:
+                    if executor not in self._timed_out:
+                        self._terminate(executor)
+                        break
+                    # Killed because another task timed out; resubmit
+        # A worker died; rerun alone so a failure here is this task's own
+        async with self._quarantine_lock:
+            executor = self._get_quarantine()
+            try:
+                return await self._submit(executor, call)
+            except BrokenProcessPool:
+                self._terminate(executor)
+                raise RuntimeError(
+                    f"Processing worker died (memory limit is {self.memory_limit_mb} MB)"
+                )
+
+    async def _submit(self, executor: ProcessPoolExecutor, call: Callable[[], Any]) -> Any:
+        future = asyncio.get_running_loop().run_in_executor(executor, call)
+        try:
+            if self.task_timeout > 0:
+                return await asyncio.wait_for(future, timeout=self.task_timeout)
+            return await future
+        except asyncio.TimeoutError:
+            self._timed_out.add(executor)
+            self._terminate(executor)
+            raise TimeoutError(f"Processing task exceeded {self.task_timeout}s timeout")
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = self._create_executor(self.max_workers)
+        return self._executor
+
+    def _get_quarantine(self) -> ProcessPoolExecutor:
+        if self._quarantine is None:
+            self._quarantine = self._create_executor(1)
+        return self._quarantine
+
+    def _create_executor(self, max_workers: int) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.memory_limit_mb,)
+        )
+
+    def _terminate(self, executor: ProcessPoolExecutor):
+        if executor is self._executor:
+            self._executor = None
+        elif executor is self._quarantine:
+            self._quarantine = None
+        else:
+            # Already torn down by another of its tasks
+            return
+        # ProcessPoolExecutor cannot cancel a running task, so kill its workers outright;
+        # queued tasks are failed with BrokenProcessPool and resubmitted by their callers
+        for process in list((executor._processes or {}).values()):
+            if process.is_alive():
+                process.terminate()
+        executor.shutdown(wait=False)
+        logger.warning("Processing pool terminated; it will be recreated on the next task")
+
+
+processing_pool = ProcessingPool()
@@ -0,0 +1,109 @@
+import cProfile
+import io
+import marshal
+import pstats
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models import ProcessingProfile
+from app.services.process_pool import processing_pool
+
+# Upload header that asks for the document's processing to be profiled
+PROFILE_HEADER = "X-Profile-Processing"
+
+
+def profile_requested(value: Optional[str]) -> bool:
+    """Whether a header value turns profiling on (ignored unless PROFILE_HEADER_ENABLED)"""
+    return settings.PROFILE_HEADER_ENABLED and (value or "").strip().lower() in ("1", "true", "yes", "on")
+
+
+def profiled_call(fn: Callable[..., Any], *args, **kwargs) -> Tuple[Any, Optional[BaseException], Dict, float]:
+    """Run ``fn`` under cProfile; runs in a pool worker, so the profile covers the real work.
+
+    Returns the result, the exception raised (if any), the raw pstats table
+    and the elapsed seconds; a failing call still yields its profile.
+    """
+    profiler = cProfile.Profile()
+    result, error = None, None
+    started = time.perf_counter()
+    try:
+        result = profiler.runcall(fn, *args, **kwargs)
+    except Exception as e:
+        error = e
+    elapsed = time.perf_counter() - started
+    profiler.create_stats()
+    return result, error, profiler.stats, elapsed
+
+
+class _RawStats:
+    """Adapter that lets ``pstats.Stats.add`` merge a stats table shipped back from a worker"""
+
+    def __init__(self, stats: Dict):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+class ProfileRecorder:
+    """Stage timings and merged cProfile data of one profiled processing attempt.
+
+    Stages run in the processing pool are profiled there and timed twice:
+    ``<stage>`` is the wall time seen by the caller (including waiting for a
+    worker) and ``<stage>_worker`` the time the worker spent on it.
+    """
+
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+        self._stats = pstats.Stats()
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - started
+
+    async def run(self, name: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run ``fn`` in the processing pool under cProfile as stage ``name``"""
+        with self.stage(name):
+            result, error, stats, elapsed = await processing_pool.run(profiled_call, fn, *args, **kwargs)
+        self.stages[f"{name}_worker"] = self.stages.get(f"{name}_worker", 0.0) + elapsed
+        if stats:
+            self._stats.add(_RawStats(stats))
+        if error is not None:
+            raise error
+        return result
+
+    def summary(self, limit: int = settings.PROFILE_SUMMARY_LINES) -> str:
+        stream = io.StringIO()
+        self._stats.stream = stream
+        self._stats.sort_stats("cumulative").print_stats(limit)
+        return stream.getvalue()
+
+    def to_record(self, document_id: str, status: str) -> ProcessingProfile:
+        return ProcessingProfile(
+            document_id=document_id,
+            status=status,
+            total_seconds=time.perf_counter() - self._started,
+            stages=self.stages,
+            summary=self.summary(),
+            profile_data=marshal.dumps(self._stats.stats),
+            created_at=datetime.utcnow()
+        )
+
+
+async def save_profile(session: AsyncSession, record: ProcessingProfile, keep: int = settings.PROFILE_MAX_KEPT):
+    """Write a profile and drop the oldest ones beyond the retention cap"""
+    session.add(record)
+    await session.flush()
+    stale = select(ProcessingProfile.id).order_by(ProcessingProfile.created_at.desc()).offset(keep)
+    await session.execute(delete(ProcessingProfile).where(ProcessingProfile.id.in_(stale)))
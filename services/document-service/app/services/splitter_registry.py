@@ -0,0 +1,128 @@
+import logging
+import os
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Tuple
+
+import tiktoken
+
+from app.core.config import settings
+from app.schemas.document import ChunkingConfigBase, LengthFunction, SplitterEngine, SplitterType
+
+logger = logging.getLogger(__name__)
+
+
+def splitter_cache_key(config: ChunkingConfigBase) -> Tuple[Hashable, ...]:
+    """Reduce a chunking config to the fields that change the splitter it builds.
+
+    Defaults are filled in so ``None`` and the explicit default map to the same
+    entry; ``separator_type`` is a label only and is ignored.
+    """
+    length_function = config.length_function or LengthFunction.LEN
+    separators = getattr(config, "custom_separators", None) or getattr(config, "separators", None)
+    return (
+        SplitterType(config.splitter_type or SplitterType.RECURSIVE).value,
+        config.chunk_size,
+        config.chunk_overlap,
+        LengthFunction(length_function).value,
+        SplitterEngine(getattr(config, "splitter_engine", None) or SplitterEngine.LANGCHAIN).value,
+        tuple(separators) if separators else None,
+        getattr(config, "is_separator_regex", False),
+        getattr(config, "keep_separator", False),
+        getattr(config, "add_start_index", False),
+        getattr(config, "strip_whitespace", True),
+        (config.additional_params or {}).get("language"),  # CODE splitter language
+    )
+
+
+class SplitterRegistry:
+    """Per-process cache of tiktoken encoders, HuggingFace tokenizers and configured text splitters.
+
+    Building a splitter (and loading an encoder) is fixed cost that short
+    uploads would otherwise pay on every call. Each pool worker warms its own
+    registry when it starts.
+    """
+
+    def __init__(self, max_splitters: int = settings.SPLITTER_CACHE_SIZE):
+        self.max_splitters = max_splitters
+        self._encoders: Dict[str, Any] = {}
+        self._tokenizers: Dict[str, Any] = {}
+        self._splitters: "OrderedDict[Tuple[Hashable, ...], Any]" = OrderedDict()
+        self.splitter_hits = 0
+        self.splitter_misses = 0
+        self.encoder_loads = 0
+
+    def get_encoding(self, name: str = "cl100k_base"):
+        encoder = self._encoders.get(name)
+        if encoder is None:
+            encoder = tiktoken.get_encoding(name)
+            self._encoders[name] = encoder
+            self.encoder_loads += 1
+        return encoder
+
+    def get_hf_tokenizer(self, path: str = settings.HUGGINGFACE_TOKENIZER_PATH):
+        """Load a HuggingFace tokenizer from a local tokenizer.json, once per process"""
+        tokenizer = self._tokenizers.get(path)
+        if tokenizer is None:
+            if not os.path.isfile(path):
+                raise ValueError(f"HuggingFace tokenizer file not found: {path}")
+            try:
+                from tokenizers import Tokenizer
+            except ImportError:
+                raise ValueError("The huggingface length function requires the 'tokenizers' package")
+            tokenizer = Tokenizer.from_file(path)
+            self._tokenizers[path] = tokenizer
+            self.encoder_loads += 1
+        return tokenizer
+
+    def get_splitter(self, config: ChunkingConfigBase, factory: Callable[[ChunkingConfigBase], Any]):
+        key = splitter_cache_key(config)
+        splitter = self._splitters.get(key)
+        if splitter is not None:
+            self._splitters.move_to_end(key)
+            self.splitter_hits += 1
+            return splitter
+        self.splitter_misses += 1
+        splitter = factory(config)
+        self._splitters[key] = splitter
+        if len(self._splitters) > self.max_splitters:
+            self._splitters.popitem(last=False)
+        return splitter
+
+    def warm(
+        self,
+        encodings: List[str] = settings.WARM_ENCODINGS,
+        tokenizer_path: str = settings.HUGGINGFACE_TOKENIZER_PATH
+    ):
+        for name in encodings:
+            try:
+                self.get_encoding(name)
+            except Exception as e:
+                # Offline hosts without a tiktoken cache still serve len-based chunking
+                logger.warning("Could not preload tiktoken encoding %s: %s", name, e)
+        if tokenizer_path and os.path.isfile(tokenizer_path):
+            try:
+                self.get_hf_tokenizer(tokenizer_path)
+            except Exception as e:
+                logger.warning("Could not preload HuggingFace tokenizer %s: %s", tokenizer_path, e)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.splitter_hits + self.splitter_misses
+        return {
+            "pid": os.getpid(),
+            "encoders": sorted(self._encoders),
+            "hf_tokenizers": sorted(self._tokenizers),
+            "encoder_loads": self.encoder_loads,
+            "splitters": len(self._splitters),
+            "max_splitters": self.max_splitters,
+            "splitter_hits": self.splitter_hits,
+            "splitter_misses": self.splitter_misses,
+            "splitter_hit_rate": self.splitter_hits / lookups if lookups else 0.0
+        }
+
+
+splitter_registry = SplitterRegistry()
+
+
+def registry_stats() -> Dict[str, Any]:
+    """Stats of the current process's registry; picklable entry point for pool workers"""
+    return splitter_registry.stats()
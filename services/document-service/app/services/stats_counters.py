@@ -0,0 +1,140 @@
+import asyncio
+import logging
+from typing import Any, Dict, Mapping, Optional
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.writer import db_writer
+from app.models import Document, DocumentChunk, StatCounter
+
+logger = logging.getLogger(__name__)
+
+# Counter names; per-status and per-content-type counters use these prefixes
+DOCUMENTS = "documents"
+CHUNKS = "chunks"
+CHUNK_CHARACTERS = "chunk_characters"
+BYTES_INGESTED = "bytes_ingested"
+STATUS_PREFIX = "status:"
+CONTENT_TYPE_PREFIX = "content_type:"
+
+
+async def bump_counters(session: AsyncSession, deltas: Mapping[str, int]):
+    """Add the deltas to their counters in one upsert, inside the caller's transaction"""
+    rows = [{"name": name, "value": delta} for name, delta in deltas.items() if delta]
+    if not rows:
+        return
+    dialect = sqlite if session.bind.dialect.name == "sqlite" else postgresql
+    statement = dialect.insert(StatCounter).values(rows)
+    statement = statement.on_conflict_do_update(
+        index_elements=[StatCounter.name],
+        set_={"value": StatCounter.value + statement.excluded.value}
+    )
+    await session.execute(statement)
+
+
+def status_deltas(old_status: Optional[str], new_status: str, count: int = 1) -> Dict[str, int]:
+    if old_status == new_status:
+        return {}
+    deltas = {f"{STATUS_PREFIX}{new_status}": count}
+    if old_status is not None:
+        deltas[f"{STATUS_PREFIX}{old_status}"] = -count
+    return deltas
+
+
+async def chunk_totals(session: AsyncSession, *criteria) -> Dict[str, int]:
+    """Chunk and character counts of the chunk rows matching ``criteria``, as counter deltas"""
+    count, characters = (await session.execute(
+        select(func.count(), func.coalesce(func.sum(DocumentChunk.content_length), 0)).where(*criteria)
+    )).one()
+    return {CHUNKS: count, CHUNK_CHARACTERS: characters}
+
+
+async def read_statistics(session: AsyncSession) -> Dict[str, Any]:
+    """Statistics from the counters alone; one read of a table with a row per status and content type"""
+    counters = dict((await session.execute(select(StatCounter.name, StatCounter.value))).all())
+    chunks = counters.get(CHUNKS, 0)
+    return {
+        "total_documents": counters.get(DOCUMENTS, 0),
+        "total_chunks": chunks,
+        "bytes_ingested": counters.get(BYTES_INGESTED, 0),
+        "average_chunk_length": round(counters.get(CHUNK_CHARACTERS, 0) / chunks, 1) if chunks else 0.0,
+        "status_distribution": _with_prefix(counters, STATUS_PREFIX),
+        "file_type_distribution": _with_prefix(counters, CONTENT_TYPE_PREFIX),
+    }
+
+
+async def reconcile_counters(session: AsyncSession) -> Dict[str, int]:
+    """Recompute every counter from the tables and replace the stored values.
+
+    This is the full scan the counters exist to avoid; it repairs drift from
+    writes made outside the service (manual SQL, restored backups). Returns
+    the counters whose stored value was wrong, with the correction applied.
+    """
+    expected: Dict[str, int] = {}
+    documents, bytes_ingested = (await session.execute(
+        select(func.count(), func.coalesce(func.sum(Document.file_size), 0))
+    )).one()
+    expected[DOCUMENTS] = documents
+    expected[BYTES_INGESTED] = bytes_ingested
+    expected.update(await chunk_totals(session))
+    for status, count in await session.execute(
+        select(Document.processing_status, func.count()).group_by(Document.processing_status)
+    ):
+        expected[f"{STATUS_PREFIX}{status}"] = count
+    for content_type, count in await session.execute(
+        select(Document.content_type, func.count()).group_by(Document.content_type)
+    ):
+        expected[f"{CONTENT_TYPE_PREFIX}{content_type}"] = count
+
+    stored = dict((await session.execute(select(StatCounter.name, StatCounter.value))).all())
+    drift = {
+        name: expected.get(name, 0) - stored.get(name, 0)
+        for name in expected.keys() | stored.keys()
+        if expected.get(name, 0) != stored.get(name, 0)
+    }
+    await bump_counters(session, drift)
+    await session.execute(delete(StatCounter).where(StatCounter.value == 0))
+    return drift
+
+
+def _with_prefix(counters: Mapping[str, int], prefix: str) -> Dict[str, int]:
+    return {name[len(prefix):]: value for name, value in counters.items() if name.startswith(prefix) and value}
+
+
+class StatsReconciler:
+    """Background task that periodically reconciles the counters with the tables (off when the interval is 0)"""
+
+    def __init__(self, interval: float = settings.STATS_RECONCILE_INTERVAL_SECONDS):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if self._task is None and self.interval > 0:
+            self._task = asyncio.create_task(self._run(), name="stats-reconciler")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def reconcile(self) -> Dict[str, int]:
+        # Through the writer, so no counted write can land between the scan and the correction
+        drift = await db_writer.run(reconcile_counters)
+        if drift:
+            logger.warning("Reconciled drifted statistics counters: %s", drift)
+        return drift
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.reconcile()
+            except Exception:
+                logger.exception("Statistics reconciliation failed")
+
+
+stats_reconciler = StatsReconciler()
@@ -0,0 +1,225 @@
+import re
+from bisect import bisect_right
+from typing import Any, Dict, List, Optional, Pattern, Sequence, Tuple
+
+from langchain_text_splitters import Language, RecursiveCharacterTextSplitter
+
+from app.services.native_splitter import NativeRecursiveSplitter, Span
+
+ChunkMetadata = Optional[Dict[str, Any]]
+SectionPath = Tuple[str, ...]
+
+# File extensions the CODE splitter can infer a language from
+EXTENSION_LANGUAGES = {
+    ".py": Language.PYTHON,
+    ".js": Language.JS,
+    ".java": Language.JAVA,
+    ".cpp": Language.CPP,
+    ".c": Language.C,
+}
+
+MARKDOWN_SEPARATORS = RecursiveCharacterTextSplitter.get_separators_for_language(Language.MARKDOWN)
+
+
+def _has_separators(language: Language) -> bool:
+    try:
+        RecursiveCharacterTextSplitter.get_separators_for_language(language)
+    except ValueError:
+        return False
+    return True
+
+
+# Values additional_params["language"] may take for the CODE splitter
+CODE_LANGUAGES = frozenset(language.value for language in Language if _has_separators(language))
+
+_ATX_HEADING = re.compile(r" {0,3}(#{1,6})(?:[ \t]+(.*?))?(?:[ \t]+#+)?[ \t]*$")
+_SETEXT_UNDERLINE = re.compile(r" {0,3}(=+|-+)[ \t]*$")
+_FENCE = re.compile(r" {0,3}(`{3,}|~{3,})")
+
+_CONTROL = r"(?!(?:if|else|for|while|do|switch|case|return|throw|catch|try|new|delete|sizeof)\b)"
+# Definition lines per language: group 1 is the indentation, group 2 the name
+_DEFINITIONS: Dict[Language, List[Pattern]] = {
+    Language.PYTHON: [
+        re.compile(r"([ \t]*)(?:async[ \t]+)?(?:def|class)[ \t]+(\w+)"),
+    ],
+    Language.JS: [
+        re.compile(r"([ \t]*)(?:export[ \t]+)?(?:default[ \t]+)?(?:async[ \t]+)?"
+                   r"(?:function\*?[ \t]*|class[ \t]+)([\w$]+)"),
+        re.compile(r"([ \t]*)(?:export[ \t]+)?(?:const|let|var)[ \t]+([\w$]+)[ \t]*=[ \t]*"
+                   r"(?:async[ \t]*)?(?:function\b|\([^)]*\)[ \t]*=>|[\w$]+[ \t]*=>)"),
+        re.compile(r"([ \t]*)" + _CONTROL + r"(?:static[ \t]+)?(?:async[ \t]+)?([\w$]+)[ \t]*\([^;]*\)[ \t]*\{"),
+    ],
+    Language.JAVA: [
+        re.compile(r"([ \t]*)(?:(?:public|protected|private|static|final|abstract|sealed|strictfp)[ \t]+)*"
+                   r"(?:class|interface|enum|record)[ \t]+(\w+)"),
+        re.compile(r"([ \t]*)" + _CONTROL + r"(?:(?:public|protected|private|static|final|abstract|"
+                   r"synchronized|native|default)[ \t]+)*(?:<[^>]*>[ \t]+)?[\w<>\[\],.?]+[ \t]+"
+                   r"(\w+)[ \t]*\([^;]*$"),
+    ],
+    Language.CPP: [
+        re.compile(r"([ \t]*)(?:template[ \t]*<[^>]*>[ \t]*)?(?:class|struct|namespace|union)[ \t]+"
+                   r"(\w+)[^;]*$"),
+        re.compile(r"([ \t]*)" + _CONTROL + r"[\w:*&<>,~ \t]*?[\w*&>][ \t*&]+([\w:~]+)[ \t]*\([^;]*$"),
+    ],
+}
+_DEFINITIONS[Language.C] = _DEFINITIONS[Language.CPP]
+
+
+def code_language(extension: Optional[str]) -> Optional[Language]:
+    return EXTENSION_LANGUAGES.get((extension or "").lower())
+
+
+def section_metadata(path: SectionPath) -> ChunkMetadata:
+    return {"section_path": list(path)} if path else None
+
+
+def _iter_lines(text: str):
+    """Yield (offset, line) for each line without its newline"""
+    position = 0
+    while position < len(text):
+        newline = text.find("\n", position)
+        if newline == -1:
+            newline = len(text)
+        yield position, text[position:newline]
+        position = newline + 1
+
+
+def markdown_sections(text: str) -> List[Tuple[int, SectionPath]]:
+    """Offsets where each heading's section starts, with its heading path.
+
+    ATX (``## Title``) and setext (``Title`` over ``===``/``---``) headings
+    are recognised in a single pass; lines inside fenced code blocks are not
+    headings. The text before the first heading is a section with an empty path.
+    """
+    sections: List[Tuple[int, SectionPath]] = [(0, ())]
+    stack: List[Tuple[int, str]] = []
+    fence: Optional[str] = None
+    previous: Optional[Tuple[int, str]] = None  # paragraph line a setext underline may apply to
+
+    def open_section(offset: int, level: int, title: str):
+        while stack and stack[-1][0] >= level:
+            stack.pop()
+        stack.append((level, title))
+        if sections[-1][0] == offset:
+            sections.pop()
+        sections.append((offset, tuple(name for _, name in stack)))
+
+    for offset, line in _iter_lines(text):
+        fence_match = _FENCE.match(line)
+        if fence is not None:
+            if fence_match and fence_match.group(1)[0] == fence[0] and len(fence_match.group(1)) >= len(fence):
+                fence = None
+            continue
+        if fence_match:
+            fence, previous = fence_match.group(1), None
+            continue
+        heading = _ATX_HEADING.match(line)
+        if heading:
+            open_section(offset, len(heading.group(1)), (heading.group(2) or "").strip())
+            previous = None
+            continue
+        underline = _SETEXT_UNDERLINE.match(line)
+        if underline and previous is not None:
+            open_section(previous[0], 1 if underline.group(1)[0] == "=" else 2, previous[1].strip())
+            previous = None
+            continue
+        previous = (offset, line) if line.strip() else None
+    return sections
+
+
+def code_outline(text: str, language: Language) -> Tuple[List[int], List[SectionPath]]:
+    """Offsets where the enclosing definition path changes, and the path from there on.
+
+    Scopes are tracked by indentation: a definition stays open until a
+    non-blank line at the same or a smaller indent (a closing brace in
+    C-like code, the next statement in Python).
+    """
+    patterns = _DEFINITIONS.get(language, [])
+    offsets: List[int] = [0]
+    paths: List[SectionPath] = [()]
+    stack: List[Tuple[int, str]] = []
+    for offset, line in _iter_lines(text):
+        stripped = line.lstrip()
+        if not stripped:
+            continue
+        indent = len(line[:len(line) - len(stripped)].expandtabs(4))
+        changed = False
+        while stack and stack[-1][0] >= indent:
+            stack.pop()
+            changed = True
+        for pattern in patterns:
+            match = pattern.match(line)
+            if match:
+                stack.append((indent, match.group(2)))
+                changed = True
+                break
+        if changed:
+            path = tuple(name for _, name in stack)
+            if path != paths[-1]:
+                offsets.append(offset)
+                paths.append(path)
+    return offsets, paths
+
+
+class _SectionSplitter:
+    """Structure-aware splitter that also reports each chunk's section path"""
+
+    def __init__(self, body_splitter: NativeRecursiveSplitter):
+        self.body_splitter = body_splitter
+
+    def split_text(self, text: str) -> List[str]:
+        return self.split_text_with_metadata(text)[0]
+
+    def split_text_with_metadata(self, text: str) -> Tuple[List[str], List[Span], List[ChunkMetadata]]:
+        raise NotImplementedError
+
+
+class MarkdownSectionSplitter(_SectionSplitter):
+    """Splits markdown (and HTML rendered to heading-marked text) section by section.
+
+    Chunks never straddle a heading; each section is split on its own with
+    the body splitter and its chunks carry the heading path above them.
+    """
+
+    def split_text_with_metadata(self, text: str) -> Tuple[List[str], List[Span], List[ChunkMetadata]]:
+        sections = markdown_sections(text)
+        chunks: List[str] = []
+        spans: List[Span] = []
+        metadata: List[ChunkMetadata] = []
+        try:
+            for (start, path), (end, _) in zip(sections, sections[1:] + [(len(text), ())]):
+                section_meta = section_metadata(path)
+                for chunk, span in self.body_splitter.split_range(text, start, end):
+                    chunks.append(chunk)
+                    spans.append(span)
+                    metadata.append(section_meta)
+        finally:
+            reset = getattr(self.body_splitter._length_function, "reset", None)
+            if reset is not None:
+                reset()
+        return chunks, spans, metadata
+
+
+class CodeSectionSplitter(_SectionSplitter):
+    """Splits source code on its language's separators and labels chunks with their enclosing definitions"""
+
+    def __init__(self, body_splitter: NativeRecursiveSplitter, language: Language):
+        super().__init__(body_splitter)
+        self.language = language
+
+    def split_text_with_metadata(self, text: str) -> Tuple[List[str], List[Span], List[ChunkMetadata]]:
+        chunks, spans = self.body_splitter.split_text_with_spans(text)
+        offsets, paths = code_outline(text, self.language)
+        metadata: List[ChunkMetadata] = []
+        for start, _ in spans:
+            if start is None:
+                metadata.append(None)
+                continue
+            metadata.append(section_metadata(paths[bisect_right(offsets, start) - 1]))
+        return chunks, spans, metadata
+
+
+def language_separators(language: Optional[Language]) -> Sequence[str]:
+    if language is None:
+        return ["\n\n", "\n", " ", ""]
+    return RecursiveCharacterTextSplitter.get_separators_for_language(language)
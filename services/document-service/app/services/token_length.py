@@ -0,0 +1,125 @@
+import re
+from typing import Any, Dict, Iterable, List
+
+from langchain_text_splitters import CharacterTextSplitter, RecursiveCharacterTextSplitter
+from langchain_text_splitters.character import _split_text_with_regex
+
+from app.core.config import settings
+
+
+class TokenLengthEngine:
+    """Memoized token counter used as a splitter ``length_function``.
+
+    LangChain measures every piece several times while merging (once when
+    deciding whether to recurse, again when merging, again when trimming the
+    overlap), and the separator once per merge. Lengths are cached for the
+    duration of one ``split_text`` call, and the splitters below prime the cache
+    for a whole level of pieces with a single ``encode_batch`` call.
+    """
+
+    def __init__(self, encoder: Any, batch_threads: int = settings.TOKEN_BATCH_THREADS):
+        self.encoder = encoder
+        self.batch_threads = batch_threads
+        self._lengths: Dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __call__(self, text: str) -> int:
+        length = self._lengths.get(text)
+        if length is not None:
+            self.hits += 1
+            return length
+        self.misses += 1
+        length = len(self.encoder.encode(text))
+        self._lengths[text] = length
+        return length
+
+    def prime(self, texts: Iterable[str]):
+        """Count all uncached texts in one batched, multi-threaded encode"""
+        pending = list({text for text in texts if text not in self._lengths})
+        if len(pending) < 2:
+            return
+        for text, tokens in zip(pending, self.encoder.encode_batch(pending, num_threads=self.batch_threads)):
+            self._lengths[text] = len(tokens)
+
+    def reset(self):
+        self._lengths.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "cached": len(self._lengths)}
+
+
+class HuggingFaceEncoder:
+    """Adapts a ``tokenizers.Tokenizer`` to the tiktoken-style ``encode``/``encode_batch``
+    interface TokenLengthEngine expects.
+
+    Special tokens are left out so lengths measure the chunk text only. The
+    Rust tokenizer parallelises batches itself, so ``num_threads`` is
+    accepted for compatibility and ignored. ``encode_batch_fast`` (tokenizers
+    >= 0.20) skips offset tracking, which length counting never needs.
+    """
+
+    def __init__(self, tokenizer: Any):
+        self.tokenizer = tokenizer
+        self._encode_batch = getattr(tokenizer, "encode_batch_fast", tokenizer.encode_batch)
+
+    def encode(self, text: str) -> List[int]:
+        return self.tokenizer.encode(text, add_special_tokens=False).ids
+
+    def encode_batch(self, texts: List[str], num_threads: int = 1) -> List[List[int]]:
+        return [encoding.ids for encoding in self._encode_batch(texts, add_special_tokens=False)]
+
+
+class TokenAwareRecursiveSplitter(RecursiveCharacterTextSplitter):
+    """RecursiveCharacterTextSplitter that batch-counts each level of pieces before merging.
+
+    Drop-in replacement whose ``length_function`` must be a TokenLengthEngine.
+    """
+
+    def __init__(self, length_function: TokenLengthEngine, **kwargs: Any):
+        super().__init__(length_function=length_function, **kwargs)
+        self._length_engine = length_function
+
+    def split_text(self, text: str) -> List[str]:
+        try:
+            return super().split_text(text)
+        finally:
+            self._length_engine.reset()
+
+    def _split_text(self, text: str, separators: List[str]) -> List[str]:
+        # Same separator choice as the parent; the pieces are recomputed there (a
+        # cheap regex split) and every length lookup then hits the primed cache
+        separator = separators[-1]
+        for _s in separators:
+            if _s == "":
+                separator = _s
+                break
+            if re.search(_s if self._is_separator_regex else re.escape(_s), text):
+                separator = _s
+                break
+        pattern = separator if self._is_separator_regex else re.escape(separator)
+        splits = _split_text_with_regex(text, pattern, self._keep_separator)
+        self._length_engine.prime(splits + [separator])
+        return super()._split_text(text, separators)
+
+
+class TokenAwareCharacterSplitter(CharacterTextSplitter):
+    """CharacterTextSplitter that batch-counts all pieces before merging.
+
+    Drop-in replacement whose ``length_function`` must be a TokenLengthEngine.
+    """
+
+    def __init__(self, length_function: TokenLengthEngine, **kwargs: Any):
+        super().__init__(length_function=length_function, **kwargs)
+        self._length_engine = length_function
+
+    def split_text(self, text: str) -> List[str]:
+        try:
+            return super().split_text(text)
+        finally:
+            self._length_engine.reset()
+
+    def _merge_splits(self, splits: Iterable[str], separator: str) -> List[str]:
+        splits = list(splits)
+        self._length_engine.prime(splits + [separator])
+        return super()._merge_splits(splits, separator)
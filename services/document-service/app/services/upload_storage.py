@@ -0,0 +1,236 @@
+import functools
+import hashlib
+import tarfile
+import uuid
+import zipfile
+import zlib
+from dataclasses import dataclass
+from pathlib import Path, PurePosixPath
+from typing import BinaryIO, Callable, Collection, Iterator, List, Optional, Tuple
+
+import aiofiles
+import magic
+from fastapi import UploadFile
+
+from app.core.config import settings
+from app.services.metrics import MIME_SNIFF_SECONDS, UPLOAD_BYTES, UPLOAD_RECEIVE_SECONDS
+
+
+class UploadTooLargeError(ValueError):
+    """Raised when an upload exceeds MAX_UPLOAD_SIZE_MB"""
+
+
+@dataclass
+class StoredUpload:
+    file_path: Path
+    file_size: int
+    content_type: str
+    sha256: str
+
+
+# Multi-file uploads may send these; each supported member becomes its own document
+ARCHIVE_SUFFIXES = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+
+
+@dataclass
+class BatchEntry:
+    """One file of a batch upload: stored on disk, or rejected with a reason"""
+    filename: str
+    file_extension: str
+    upload: Optional[StoredUpload] = None
+    error: Optional[str] = None
+    document_id: Optional[str] = None
+
+
+class _UploadDigest:
+    """Byte count, SHA-256 and sniffed MIME type of a stream, updated buffer by buffer"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.digest = hashlib.sha256()
+        self.file_size = 0
+        self.content_type: Optional[str] = None
+
+    def update(self, buffer: bytes):
+        self.file_size += len(buffer)
+        if self.file_size > self.max_bytes:
+            raise UploadTooLargeError(
+                f"File exceeds maximum upload size of {self.max_bytes // (1024 * 1024)} MB"
+            )
+        if self.content_type is None:
+            with MIME_SNIFF_SECONDS.time():
+                self.content_type = magic.from_buffer(buffer, mime=True)
+        self.digest.update(buffer)
+
+    def stored(self, destination: Path) -> StoredUpload:
+        return StoredUpload(
+            file_path=destination,
+            file_size=self.file_size,
+            content_type=self.content_type or "application/x-empty",
+            sha256=self.digest.hexdigest()
+        )
+
+
+async def save_upload(
+    file: UploadFile,
+    destination: Path,
+    max_bytes: int = settings.MAX_UPLOAD_SIZE_MB * 1024 * 1024,
+    chunk_size: int = settings.UPLOAD_CHUNK_SIZE_BYTES
+) -> StoredUpload:
+    """Stream an upload to disk in fixed-size chunks.
+
+    The hash and byte count are computed as the data goes by and the MIME type
+    is sniffed from the first buffer, so the file is never held in memory or
+    read back. A partially written file is removed if the size limit is hit.
+    """
+    digest = _UploadDigest(max_bytes)
+    try:
+        with UPLOAD_RECEIVE_SECONDS.time():
+            async with aiofiles.open(destination, "wb") as out:
+                while True:
+                    buffer = await file.read(chunk_size)
+                    if not buffer:
+                        break
+                    digest.update(buffer)
+                    await out.write(buffer)
+    except Exception:
+        destination.unlink(missing_ok=True)
+        raise
+    UPLOAD_BYTES.inc(digest.file_size)
+    return digest.stored(destination)
+
+
+def save_stream(
+    source: BinaryIO,
+    destination: Path,
+    max_bytes: int = settings.MAX_UPLOAD_SIZE_MB * 1024 * 1024,
+    chunk_size: int = settings.UPLOAD_CHUNK_SIZE_BYTES
+) -> StoredUpload:
+    """Blocking counterpart of ``save_upload`` for file objects such as archive members"""
+    digest = _UploadDigest(max_bytes)
+    try:
+        with open(destination, "wb") as out:
+            for buffer in iter(lambda: source.read(chunk_size), b""):
+                digest.update(buffer)
+                out.write(buffer)
+    except Exception:
+        destination.unlink(missing_ok=True)
+        raise
+    return digest.stored(destination)
+
+
+class _ExpandedArchive:
+    """Readable view of the current archive member that counts every byte decompressed from the archive.
+
+    Members are read through one instance so a zip bomb is stopped once the
+    archive as a whole, not just one member, exceeds ``max_bytes``.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.expanded_size = 0
+        self.member: Optional[BinaryIO] = None
+
+    def read(self, size: int = -1) -> bytes:
+        buffer = self.member.read(size)
+        self.expanded_size += len(buffer)
+        if self.expanded_size > self.max_bytes:
+            raise ValueError(f"Archive expands to more than {self.max_bytes // (1024 * 1024)} MB")
+        return buffer
+
+
+def is_archive(filename: str) -> bool:
+    return filename.lower().endswith(ARCHIVE_SUFFIXES)
+
+
+def _iter_archive_members(archive_path: Path) -> Iterator[Tuple[str, Callable[[], BinaryIO]]]:
+    """Yield (name, opener) for every regular file in a zip or tar archive, in order.
+
+    Members are opened by the caller, so one that cannot be opened (encrypted,
+    unsupported compression) fails on its own instead of ending the iteration.
+    """
+    if zipfile.is_zipfile(archive_path):
+        with zipfile.ZipFile(archive_path) as archive:
+            for info in archive.infolist():
+                if not info.is_dir():
+                    yield info.filename, functools.partial(archive.open, info)
+        return
+    # Members are read in archive order, so compressed tars are decompressed only once
+    with tarfile.open(archive_path, "r:*") as archive:
+        for info in archive:
+            if info.isfile():
+                yield info.name, functools.partial(archive.extractfile, info)
+
+
+def save_archive_members(
+    archive_path: Path,
+    destination_dir: Path,
+    extensions: Collection[str],
+    max_members: int,
+    max_bytes: int = settings.MAX_UPLOAD_SIZE_MB * 1024 * 1024,
+    max_expanded_bytes: int = settings.BATCH_MAX_EXPANDED_SIZE_MB * 1024 * 1024
+) -> List[BatchEntry]:
+    """Store each supported file of an archive under a fresh name in ``destination_dir``.
+
+    Member names are only used as display names, never as paths, so entries
+    like ``../x`` cannot escape the upload directory. Hidden files are
+    skipped; unsupported, oversized or unreadable (e.g. encrypted) members
+    come back as rejected entries.
+    Raises ValueError, after removing what was stored, for a corrupt archive,
+    one with more than ``max_members`` files or one whose members decompress
+    to more than ``max_expanded_bytes`` in total.
+    """
+    entries: List[BatchEntry] = []
+    expanded = _ExpandedArchive(max_expanded_bytes)
+    try:
+        for name, open_member in _iter_archive_members(archive_path):
+            if PurePosixPath(name).name.startswith("."):
+                continue
+            if len(entries) >= max_members:
+                raise ValueError(f"Archive contains more than {max_members} files")
+            extension = PurePosixPath(name).suffix.lower()
+            entry = BatchEntry(filename=name, file_extension=extension)
+            entries.append(entry)
+            if extension not in extensions:
+                entry.error = f"Unsupported file type: {extension}"
+                continue
+            try:
+                with open_member() as member:
+                    expanded.member = member
+                    entry.upload = save_stream(expanded, destination_dir / f"{uuid.uuid4()}{extension}", max_bytes)
+            except UploadTooLargeError as e:
+                entry.error = str(e)
+            except (NotImplementedError, zipfile.BadZipFile, zlib.error) as e:
+                # Compressed with an unsupported method, or corrupt
+                entry.error = f"Could not read archive member: {e}"
+            except RuntimeError:
+                # zipfile's error for a member that needs a password
+                entry.error = "Archive member is encrypted"
+    except tarfile.ReadError:
+        # Not a zip (checked first) and tarfile could not open it with any compression
+        discard_entries(entries)
+        raise ValueError("Could not read archive: not a zip or tar file")
+    except (zipfile.BadZipFile, tarfile.TarError, EOFError, OSError) as e:
+        discard_entries(entries)
+        raise ValueError(f"Could not read archive: {e}")
+    except Exception:
+        discard_entries(entries)
+        raise
+    return entries
+
+
+def discard_entries(entries: List[BatchEntry]):
+    """Remove the stored files of batch entries that will not be queued"""
+    for entry in entries:
+        if entry.upload is not None:
+            entry.upload.file_path.unlink(missing_ok=True)
+            entry.upload = None
+
+
+def hash_file(file_path: str, chunk_size: int = settings.UPLOAD_CHUNK_SIZE_BYTES) -> str:
+    """SHA-256 of a file already on disk, read in fixed-size chunks"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for buffer in iter(lambda: f.read(chunk_size), b""):
+            digest.update(buffer)
+    return digest.hexdigest()
@@ -0,0 +1,351 @@
+"""Drive the HTTP API with concurrent uploads and reads and report latency per endpoint.
+
+A number of virtual users each loop until --duration is up, picking a request
+from the scenario mix by weight and sending it as soon as the previous one
+returns. Endpoints:
+
+  upload  POST /documents/upload with a generated text file
+  list    GET  /documents
+  detail  GET  /documents/{id} (chunks included)
+  chunks  GET  /documents/{id}/chunks
+  status  GET  /documents/{id}/status
+  stats   GET  /stats
+
+Unless --url is given, a uvicorn server for app.main:app is started on a free
+port with a throwaway SQLite database and upload directory, and stopped
+afterwards. The report has latency percentiles, throughput and error rates
+per endpoint, the server's event-loop lag over the run (from the
+event_loop_lag_seconds histogram on /metrics) and the load generator's own
+loop lag, which should stay low for the numbers to mean anything.
+
+Usage (from services/document-service):
+
+    python -m benchmarks.load --scenario mixed --users 32 --duration 60
+    python -m benchmarks.load --mix upload=1,detail=4,stats=2 --output load.json
+    python -m benchmarks.load --url http://localhost:8000 --scenario read-heavy
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+from prometheus_client.parser import text_string_to_metric_families
+
+SERVICE_DIR = Path(__file__).resolve().parent.parent
+API = "/api/v1"
+
+SCENARIOS = {
+    "mixed": {"upload": 2, "list": 2, "detail": 4, "chunks": 1, "status": 1, "stats": 1},
+    "read-heavy": {"upload": 1, "list": 3, "detail": 8, "chunks": 4, "status": 2, "stats": 4},
+    "upload-heavy": {"upload": 6, "list": 1, "detail": 2, "status": 2, "stats": 1},
+}
+WORDS = (
+    "the quick brown fox jumps over lazy dog chunking service document token "
+    "splitter overlap paragraph sentence embedding vector retrieval context"
+).split()
+SPLITTER_CONFIG = json.dumps({
+    "chunk_size": 1000, "chunk_overlap": 200, "separator_type": "default", "splitter_type": "recursive"
+})
+
+
+def parse_mix(value: str) -> Dict[str, int]:
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name not in SCENARIOS["mixed"]:
+            raise argparse.ArgumentTypeError(f"unknown endpoint {name!r}")
+        mix[name] = int(weight or 1)
+    return mix
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile"""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+class LoadRun:
+    def __init__(self, client: httpx.AsyncClient, args):
+        self.client = client
+        self.args = args
+        self.document_ids: List[str] = []
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, Counter] = defaultdict(Counter)
+        self.uploads = 0
+        self._body = self._make_body(random.Random(args.seed), args.upload_kb * 1024)
+
+    @staticmethod
+    def _make_body(rng: random.Random, size: int) -> bytes:
+        words: List[str] = []
+        while sum(map(len, words)) + len(words) < size:
+            words.append(rng.choice(WORDS))
+            if rng.random() < 0.02:
+                words.append("\n\n")
+        return " ".join(words).encode()
+
+    def _upload_file(self) -> bytes:
+        # Unique bytes per upload, so the extraction cache never short-circuits processing
+        self.uploads += 1
+        return f"upload {self.uploads}\n\n".encode() + self._body
+
+    async def upload(self) -> httpx.Response:
+        response = await self.client.post(
+            f"{API}/documents/upload",
+            files={"file": (f"load-{self.uploads}.txt", self._upload_file(), "text/plain")},
+            data={"splitter_config": SPLITTER_CONFIG},
+        )
+        if response.status_code < 400:
+            self.document_ids.append(response.json()["id"])
+        return response
+
+    async def request(self, endpoint: str, rng: random.Random) -> Optional[httpx.Response]:
+        if endpoint == "upload":
+            return await self.upload()
+        if endpoint == "list":
+            return await self.client.get(f"{API}/documents", params={"limit": 50})
+        if endpoint == "stats":
+            return await self.client.get(f"{API}/stats")
+        if not self.document_ids:
+            return None
+        document_id = rng.choice(self.document_ids)
+        if endpoint == "detail":
+            return await self.client.get(f"{API}/documents/{document_id}")
+        if endpoint == "chunks":
+            return await self.client.get(f"{API}/documents/{document_id}/chunks", params={"limit": 50})
+        return await self.client.get(f"{API}/documents/{document_id}/status")
+
+    async def user(self, number: int, mix: Dict[str, int], deadline: float):
+        rng = random.Random(self.args.seed * 1000 + number)
+        endpoints, weights = list(mix), list(mix.values())
+        while time.perf_counter() < deadline:
+            endpoint = rng.choices(endpoints, weights)[0]
+            started = time.perf_counter()
+            try:
+                response = await self.request(endpoint, rng)
+            except httpx.HTTPError as e:
+                self.errors[endpoint][type(e).__name__] += 1
+                self.latencies[endpoint].append(time.perf_counter() - started)
+                continue
+            if response is None:
+                continue
+            self.latencies[endpoint].append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                self.errors[endpoint][str(response.status_code)] += 1
+
+    def report(self, elapsed: float) -> Dict[str, Dict]:
+        endpoints = {}
+        for endpoint, timings in sorted(self.latencies.items()):
+            errors = sum(self.errors[endpoint].values())
+            endpoints[endpoint] = {
+                "requests": len(timings),
+                "requests_per_s": len(timings) / elapsed,
+                "errors": errors,
+                "error_rate": errors / len(timings),
+                "errors_by_kind": dict(self.errors[endpoint]),
+                "latency_ms": {
+                    "p50": percentile(timings, 50) * 1000,
+                    "p90": percentile(timings, 90) * 1000,
+                    "p99": percentile(timings, 99) * 1000,
+                    "max": max(timings) * 1000,
+                },
+            }
+        return endpoints
+
+
+async def sample_loop_lag(samples: List[float], interval: float = 0.05):
+    while True:
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, time.perf_counter() - started - interval))
+
+
+async def scrape_loop_lag(client: httpx.AsyncClient) -> Optional[Dict[float, float]]:
+    """Cumulative bucket counts of the server's event_loop_lag_seconds histogram"""
+    try:
+        response = await client.get(f"{API}/metrics")
+        response.raise_for_status()
+    except httpx.HTTPError:
+        return None
+    buckets = {}
+    for family in text_string_to_metric_families(response.text):
+        if family.name == "event_loop_lag_seconds":
+            for sample in family.samples:
+                if sample.name.endswith("_bucket"):
+                    buckets[float(sample.labels["le"])] = sample.value
+    return buckets or None
+
+
+def lag_summary(before: Optional[Dict[float, float]], after: Optional[Dict[float, float]]) -> Optional[Dict]:
+    """Samples taken during the run and the bucket bound each percentile falls under"""
+    if before is None or after is None:
+        return None
+    bounds = sorted(after)
+    counts = [after[bound] - before.get(bound, 0) for bound in bounds]
+    total = counts[-1]
+    if not total:
+        return {"samples": 0}
+    summary = {"samples": int(total)}
+    for q in (50, 90, 99):
+        bound = next(bound for bound, count in zip(bounds, counts) if count >= q / 100 * total)
+        summary[f"p{q}_ms_le"] = bound * 1000
+    return summary
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(workdir: Path, port: int) -> subprocess.Popen:
+    """uvicorn on a fresh SQLite database; uploads land in workdir"""
+    from sqlalchemy import create_engine
+
+    from app.models.document import Base
+
+    database_url = f"sqlite:///{workdir / 'load.db'}"
+    engine = create_engine(database_url)
+    Base.metadata.create_all(engine)
+    engine.dispose()
+    env = {**os.environ, "DATABASE_URL": database_url, "PYTHONPATH": str(SERVICE_DIR)}
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        cwd=workdir,
+        env=env,
+    )
+
+
+async def wait_until_healthy(client: httpx.AsyncClient, timeout: float = 60):
+    deadline = time.perf_counter() + timeout
+    while True:
+        try:
+            if (await client.get(f"{API}/health")).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        if time.perf_counter() > deadline:
+            raise RuntimeError(f"Server did not become healthy within {timeout}s")
+        await asyncio.sleep(0.2)
+
+
+async def run(args, base_url: str) -> Dict:
+    limits = httpx.Limits(max_connections=args.users, max_keepalive_connections=args.users)
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+        await wait_until_healthy(client)
+        load = LoadRun(client, args)
+        for _ in range(args.seed_documents):
+            await load.upload()
+
+        client_lag: List[float] = []
+        sampler = asyncio.create_task(sample_loop_lag(client_lag))
+        lag_before = await scrape_loop_lag(client)
+        started = time.perf_counter()
+        deadline = started + args.duration
+        await asyncio.gather(*(load.user(number, args.mix, deadline) for number in range(args.users)))
+        elapsed = time.perf_counter() - started
+        lag_after = await scrape_loop_lag(client)
+        sampler.cancel()
+        await asyncio.gather(sampler, return_exceptions=True)
+        stats = (await client.get(f"{API}/stats")).json()
+
+    return {
+        "elapsed_s": elapsed,
+        "endpoints": load.report(elapsed),
+        "server_loop_lag": lag_summary(lag_before, lag_after),
+        "client_loop_lag_ms": {
+            "p99": percentile(client_lag, 99) * 1000, "max": max(client_lag) * 1000
+        } if client_lag else None,
+        "documents_by_status_at_end": stats.get("status_distribution"),
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True, cwd=SERVICE_DIR
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_summary(result: Dict):
+    for endpoint, data in result["endpoints"].items():
+        latency = data["latency_ms"]
+        print(
+            f"  {endpoint:<8} {data['requests']:>7} req  {data['requests_per_s']:8.1f}/s  "
+            f"p50 {latency['p50']:8.1f}ms  p90 {latency['p90']:8.1f}ms  p99 {latency['p99']:8.1f}ms  "
+            f"errors {data['error_rate']:6.2%}",
+            file=sys.stderr,
+        )
+    print(f"  server loop lag: {result['server_loop_lag']}", file=sys.stderr)
+    print(f"  client loop lag: {result['client_loop_lag_ms']}", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="load an already running server instead of starting one")
+    parser.add_argument("--scenario", choices=list(SCENARIOS), default="mixed")
+    parser.add_argument("--mix", type=parse_mix, help="endpoint weights, e.g. upload=1,detail=4; overrides --scenario")
+    parser.add_argument("--users", type=int, default=16, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=30, help="seconds of load")
+    parser.add_argument("--seed-documents", type=int, default=10, help="uploads made before the clock starts")
+    parser.add_argument("--upload-kb", type=int, default=64)
+    parser.add_argument("--timeout", type=float, default=60, help="per-request timeout in seconds")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+    args.mix = args.mix or SCENARIOS[args.scenario]
+
+    server = None
+    base_url = args.url
+    if base_url is None:
+        port = _free_port()
+        server = start_server(Path(tempfile.mkdtemp(prefix="load-")), port)
+        base_url = f"http://127.0.0.1:{port}"
+    try:
+        result = asyncio.run(run(args, base_url))
+    finally:
+        if server is not None:
+            server.terminate()
+            try:
+                server.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                server.kill()
+
+    print_summary(result)
+    report = {
+        "commit": _git_commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "target": args.url or "local uvicorn",
+        "parameters": {
+            "mix": args.mix, "users": args.users, "duration": args.duration,
+            "seed_documents": args.seed_documents, "upload_kb": args.upload_kb, "seed": args.seed,
+        },
+        **result,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""Differential check and timing of the native splitters against LangChain.
+
+Usage (from services/document-service):
+
+    python -m benchmarks.native_splitter --cases 2000 --paragraphs 5000
+
+Runs randomized texts and option combinations (separators, regex separators,
+keep_separator, strip_whitespace, chunk size/overlap) through both engines.
+Chunks must be identical and every span must be safe for offsets-only
+storage: a span as long as its chunk must slice to exactly that chunk. The script exits
+non-zero on the first mismatch, printing the failing case.
+"""
+import argparse
+import random
+import sys
+import time
+
+from langchain_text_splitters import CharacterTextSplitter, RecursiveCharacterTextSplitter
+
+from app.services.document_processor import locate_chunks
+from app.services.native_splitter import NativeCharacterSplitter, NativeRecursiveSplitter
+
+WORDS = (
+    "the quick brown fox jumps over lazy dog chunking service document token "
+    "splitter overlap paragraph sentence embedding vector retrieval context "
+    "naïve café Œuvre 東京 данные"
+).split()
+GLUE = [" ", " ", " ", "  ", "\n", "\n\n", "\n\n\n", "\t", " \n ", ". ", ", "]
+SEPARATOR_SETS = [
+    (["\n\n", "\n", " ", ""], False),
+    (["\n", " "], False),
+    (["\n\n", ". ", ""], False),
+    ([". ", ", ", " "], False),
+    ([r"\n\s*\n", r"\n", r"\s+", ""], True),
+    ([r"(?<=\.) ", r"\s"], True),
+    ([r"^#+ ", r"\n"], True),
+]
+KEEP_SEPARATOR = [False, True, "start", "end"]
+
+
+def make_text(rng: random.Random, words: int) -> str:
+    parts = []
+    for _ in range(words):
+        parts.append(rng.choice(WORDS))
+        parts.append(rng.choice(GLUE))
+    if rng.random() < 0.3:
+        parts.insert(0, rng.choice(GLUE))
+    return "".join(parts)
+
+
+def check_spans(text, chunks, spans) -> bool:
+    for chunk, (start, end) in zip(chunks, spans):
+        if start is None and end is None:
+            continue
+        if not (0 <= start <= end <= len(text)):
+            return False
+        # Storage relies on this: a span of the chunk's length is the chunk itself
+        if end - start == len(chunk) and text[start:end] != chunk:
+            return False
+    return len(chunks) == len(spans)
+
+
+def run_case(rng: random.Random):
+    separators, is_regex = rng.choice(SEPARATOR_SETS)
+    chunk_size = rng.randint(1, 120)
+    options = dict(
+        chunk_size=chunk_size,
+        chunk_overlap=rng.randint(0, chunk_size),
+        keep_separator=rng.choice(KEEP_SEPARATOR),
+        is_separator_regex=is_regex,
+        strip_whitespace=rng.random() < 0.8,
+    )
+    text = make_text(rng, rng.randint(0, 120))
+    if rng.random() < 0.5:
+        expected = RecursiveCharacterTextSplitter(separators=separators, **options).split_text(text)
+        native = NativeRecursiveSplitter(separators=separators, **options)
+        kind = "recursive"
+    else:
+        separator = separators[0] if separators[0] else "\n"
+        expected = CharacterTextSplitter(separator=separator, **options).split_text(text)
+        native = NativeCharacterSplitter(separator=separator, **options)
+        kind = "character"
+    chunks, spans = native.split_text_with_spans(text)
+    ok = chunks == expected and check_spans(text, chunks, spans)
+    return ok, dict(kind=kind, separators=separators, text=text, **options)
+
+
+def timed(split, text: str, repeat: int = 3):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = split(text)
+        best = min(best, time.perf_counter() - started)
+    return result, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cases", type=int, default=2000)
+    parser.add_argument("--paragraphs", type=int, default=5000)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--chunk-overlap", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    for i in range(args.cases):
+        ok, case = run_case(rng)
+        if not ok:
+            print(f"mismatch in case {i}: {case!r}")
+            sys.exit(1)
+    print(f"{args.cases} randomized cases identical")
+
+    text = "\n\n".join(make_text(rng, rng.randint(20, 200)) for _ in range(args.paragraphs))
+    options = dict(chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap, keep_separator=False)
+    print(f"{len(text):,} chars")
+    mismatch = False
+    for name, baseline, native in (
+        ("recursive", RecursiveCharacterTextSplitter(**options), NativeRecursiveSplitter(**options)),
+        ("character", CharacterTextSplitter(separator="\n", **options),
+         NativeCharacterSplitter(separator="\n", **options)),
+    ):
+        expected, baseline_time = timed(baseline.split_text, text)
+        # What the service pays on the LangChain engine: split, then search for the spans
+        _, located_time = timed(lambda t: locate_chunks(t, baseline.split_text(t), args.chunk_overlap), text)
+        (actual, _), native_time = timed(native.split_text_with_spans, text)
+        mismatch |= expected != actual
+        print(
+            f"  {name:<10} langchain {baseline_time:7.3f}s  +locate {located_time:7.3f}s  "
+            f"native {native_time:7.3f}s  speedup {located_time / native_time:5.1f}x  "
+            f"chunks {len(actual)}  identical {expected == actual}"
+        )
+    sys.exit(1 if mismatch else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,497 @@
+"""Benchmark extraction, splitting and end-to-end processing on generated corpora.
+
+Synthetic PDF, DOCX, XLSX, CSV and text/markdown files are generated at each
+requested size (deterministically, from --seed) and three groups of cases
+are run:
+
+  extraction  DocumentProcessor.extract_text_from_file per format and size
+  split       every splitter type x length function (x engine for recursive
+              and character) through DocumentProcessor.split_text_sync
+  process     DocumentService.process_document end to end against SQLite
+
+Each case runs in a fresh process, so its peak RSS is its own; pool workers
+that do the extraction report theirs separately. Results are written as JSON
+with latency percentiles, throughput and peak RSS, plus the commit they were
+measured on, for comparing runs.
+
+Usage (from services/document-service):
+
+    python -m benchmarks.pipeline --output bench.json
+    python -m benchmarks.pipeline --groups extraction --sizes large --repeat 10
+    python -m benchmarks.pipeline --groups split --split-size medium --tokenizer-file tokenizers/tokenizer.json
+
+Without DATABASE_URL a throwaway SQLite file is used; rows created by the
+process cases are deleted afterwards. Token-counted cases need cl100k_base
+(downloadable or in TIKTOKEN_CACHE_DIR) or a local tokenizer.json; cases
+that cannot run are reported with an ``error`` instead of timings.
+"""
+import os
+import tempfile
+
+# Settings are read at import time, so these are in place before any app module
+# loads; spawned case processes inherit them
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp(prefix='bench-')}/bench.db")
+os.environ.setdefault("PROCESS_POOL_WORKERS", "1")
+os.environ.setdefault("EXTRACTION_CACHE_MAX_MB", "0")  # every iteration really extracts
+
+import argparse
+import asyncio
+import csv
+import json
+import math
+import multiprocessing
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+WORDS = (
+    "the quick brown fox jumps over lazy dog chunking service document token "
+    "splitter overlap paragraph sentence embedding vector retrieval context"
+).split()
+
+# Paragraphs for text, markdown, PDF and DOCX; spreadsheet rows are ten per unit
+SIZES = {"small": 20, "medium": 200, "large": 2000}
+FORMATS = {
+    "txt": "text/plain",
+    "md": "text/markdown",
+    "pdf": "application/pdf",
+    "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "csv": "text/csv",
+}
+SPLIT_CASES = [
+    ("recursive", "langchain"), ("recursive", "native"),
+    ("character", "langchain"), ("character", "native"),
+    ("token", "langchain"), ("markdown", "langchain"), ("html", "langchain"), ("code", "langchain"),
+]
+# TokenTextSplitter always counts cl100k_base tokens, so it has no length-function variants
+LENGTH_FUNCTIONS = ("len", "tiktoken", "huggingface")
+
+
+# --- corpus -----------------------------------------------------------------
+
+def _sentence(rng: random.Random) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(4, 30))).capitalize() + "."
+
+
+def _paragraphs(units: int, rng: random.Random) -> List[str]:
+    return [" ".join(_sentence(rng) for _ in range(rng.randint(1, 6))) for _ in range(units)]
+
+
+def _rows(units: int, rng: random.Random) -> List[List[str]]:
+    return [
+        [str(i), rng.choice(WORDS), rng.choice(WORDS), f"{rng.uniform(0, 1000):.2f}", _sentence(rng)]
+        for i in range(units * 10)
+    ]
+
+
+def make_markdown(units: int, seed: int) -> str:
+    rng = random.Random(seed)
+    parts = []
+    for i, paragraph in enumerate(_paragraphs(units, rng)):
+        if i % 10 == 0:
+            parts.append(f"{'#' * (1 + (i // 10) % 3)} Section {i // 10}")
+        parts.append(paragraph)
+    return "\n\n".join(parts)
+
+
+def make_code(units: int, seed: int) -> str:
+    rng = random.Random(seed)
+    blocks = []
+    for i in range(max(1, units // 4)):
+        methods = "\n\n".join(
+            f"    def {rng.choice(WORDS)}_{j}(self, value):\n"
+            f"        \"\"\"{_sentence(rng)}\"\"\"\n"
+            f"        result = value * {j} + len({rng.choice(WORDS)!r})\n"
+            f"        return result"
+            for j in range(4)
+        )
+        blocks.append(f"class {rng.choice(WORDS).capitalize()}{i}:\n{methods}\n")
+    return "\n\n".join(blocks)
+
+
+def _pdf_escape(line: str) -> str:
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_pdf(path: Path, paragraphs: List[str], lines_per_page: int = 50, width: int = 90):
+    """Minimal PDF with one Helvetica text stream per page, enough for PyPDF2 to extract"""
+    lines: List[str] = []
+    for paragraph in paragraphs:
+        words, line = paragraph.split(), ""
+        for word in words:
+            if len(line) + len(word) + 1 > width:
+                lines.append(line)
+                line = word
+            else:
+                line = f"{line} {word}".strip()
+        lines.extend([line, ""])
+    pages = [lines[i:i + lines_per_page] for i in range(0, len(lines), lines_per_page)] or [[""]]
+
+    # Objects 1-3 are the catalog, page tree and font; each page adds a page and a content stream
+    objects: List[bytes] = [b"<< /Type /Catalog /Pages 2 0 R >>", b"", b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for page_lines in pages:
+        text = " T* ".join(f"({_pdf_escape(line)}) Tj" for line in page_lines)
+        stream = f"BT /F1 10 Tf 14 TL 50 800 Td {text} ET".encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        kids.append(len(objects) + 1)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] /Resources << /Font << /F1 3 0 R >> >> "
+            b"/Contents %d 0 R >>" % (len(objects))
+        )
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % kid for kid in kids), len(kids)
+    )
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    path.write_bytes(bytes(out))
+
+
+def write_docx(path: Path, paragraphs: List[str]):
+    import docx
+
+    document = docx.Document()
+    for i, paragraph in enumerate(paragraphs):
+        if i % 10 == 0:
+            document.add_heading(f"Section {i // 10}", level=1)
+        document.add_paragraph(paragraph)
+    document.save(path)
+
+
+def write_xlsx(path: Path, header: List[str], rows: List[List[str]]):
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    for sheet in range(2):
+        worksheet = workbook.create_sheet(f"Sheet{sheet + 1}")
+        worksheet.append(header)
+        for row in rows[sheet::2]:
+            worksheet.append(row)
+    workbook.save(path)
+
+
+def generate_corpus(directory: Path, sizes: List[str], seed: int) -> Dict[str, Dict[str, str]]:
+    """Write every format at every size; returns {format: {size: path}}"""
+    header = ["id", "category", "label", "amount", "description"]
+    corpus: Dict[str, Dict[str, str]] = {name: {} for name in FORMATS}
+    for size in sizes:
+        units = SIZES[size]
+        paragraphs = _paragraphs(units, random.Random(seed))
+        rows = _rows(units, random.Random(seed))
+        paths = {name: directory / f"{size}.{name}" for name in FORMATS}
+        paths["txt"].write_text("\n\n".join(paragraphs), encoding="utf-8")
+        paths["md"].write_text(make_markdown(units, seed), encoding="utf-8")
+        write_pdf(paths["pdf"], paragraphs)
+        write_docx(paths["docx"], paragraphs)
+        write_xlsx(paths["xlsx"], header, rows)
+        with open(paths["csv"], "w", newline="", encoding="utf-8") as out:
+            writer = csv.writer(out)
+            writer.writerow(header)
+            writer.writerows(rows)
+        for name, path in paths.items():
+            corpus[name][size] = str(path)
+    return corpus
+
+
+# --- measurement ------------------------------------------------------------
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile; with few samples p99 is simply the slowest run"""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+def _summary(timings: List[float], units: Dict[str, float]) -> Dict[str, Any]:
+    total = sum(timings)
+    return {
+        "iterations": len(timings),
+        "latency_ms": {
+            "p50": percentile(timings, 50) * 1000,
+            "p99": percentile(timings, 99) * 1000,
+            "mean": total / len(timings) * 1000,
+            "min": min(timings) * 1000,
+            "max": max(timings) * 1000,
+        },
+        # Work per iteration over the mean iteration time
+        "throughput": {f"{name}_per_s": amount * len(timings) / total for name, amount in units.items()},
+    }
+
+
+async def _timed(call: Callable[[], Any], warmup: int, repeat: int) -> List[float]:
+    for _ in range(warmup):
+        await call()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await call()
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def _chunking_config(splitter_type: str, length_function: str, engine: str, chunk_size: int, overlap: int):
+    from app.schemas.document import ChunkingConfigBase
+
+    return ChunkingConfigBase(
+        chunk_size=chunk_size,
+        chunk_overlap=overlap,
+        separator_type="default",
+        splitter_type=splitter_type,
+        length_function=length_function,
+        splitter_engine=engine,
+        additional_params={"language": "python"} if splitter_type == "code" else None,
+    )
+
+
+async def _extraction_case(case: Dict[str, Any]) -> Dict[str, Any]:
+    from app.services.document_processor import document_processor
+
+    path, file_type = case["path"], FORMATS[case["format"]]
+    results: Dict[str, Any] = {}
+
+    async def call():
+        text, _ = await document_processor.extract_text_from_file(path, file_type)
+        results["characters"] = len(text)
+
+    timings = await _timed(call, case["warmup"], case["repeat"])
+    size = os.path.getsize(path)
+    return {
+        "input_bytes": size,
+        "output_characters": results["characters"],
+        **_summary(timings, {"mb": size / 1e6, "documents": 1}),
+    }
+
+
+async def _split_case(case: Dict[str, Any]) -> Dict[str, Any]:
+    from app.services.document_processor import document_processor
+
+    text = Path(case["path"]).read_text(encoding="utf-8")
+    config = _chunking_config(
+        case["splitter_type"], case["length_function"], case["engine"], case["chunk_size"], case["chunk_overlap"]
+    )
+    results: Dict[str, Any] = {}
+
+    async def call():
+        chunks, _, _ = document_processor.split_text_sync(text, config.model_copy(deep=True))
+        results["chunks"] = len(chunks)
+
+    timings = await _timed(call, case["warmup"], case["repeat"])
+    return {
+        "input_characters": len(text),
+        "chunks": results["chunks"],
+        **_summary(timings, {"characters": len(text), "chunks": results["chunks"]}),
+    }
+
+
+async def _process_case(case: Dict[str, Any]) -> Dict[str, Any]:
+    from sqlalchemy import select
+
+    from app.db.session import SessionLocal
+    from app.models import ChunkingConfig
+    from app.services.document_service import DocumentService
+
+    path = case["path"]
+    config = _chunking_config("recursive", "len", "langchain", case["chunk_size"], case["chunk_overlap"])
+    size = os.path.getsize(path)
+    created: List[str] = []
+    results: Dict[str, Any] = {}
+
+    async def call():
+        async with SessionLocal() as db:
+            service = DocumentService(db)
+            document = await service.create_document(
+                file_path=path,
+                filename=Path(path).name,
+                original_filename=Path(path).name,
+                file_size=size,
+                content_type=FORMATS[case["format"]],
+                file_extension=Path(path).suffix,
+                config=config,
+            )
+            created.append(document.id)
+            config_id = await db.scalar(select(ChunkingConfig.id).where(ChunkingConfig.document_id == document.id))
+            document = await service.process_document(document.id, config_id)
+            results["chunks"] = document.total_chunks
+
+    try:
+        timings = await _timed(call, case["warmup"], case["repeat"])
+    finally:
+        async with SessionLocal() as db:
+            for document_id in created:
+                await DocumentService(db).delete_document(document_id)
+    return {
+        "input_bytes": size,
+        "chunks": results["chunks"],
+        **_summary(timings, {"mb": size / 1e6, "documents": 1, "chunks": results["chunks"]}),
+    }
+
+
+CASE_RUNNERS = {"extraction": _extraction_case, "split": _split_case, "process": _process_case}
+
+
+async def _run_case(case: Dict[str, Any]) -> Dict[str, Any]:
+    from app.db.session import engine
+    from app.services.process_pool import processing_pool
+
+    processing_pool.start()
+    try:
+        return await CASE_RUNNERS[case["group"]](case)
+    finally:
+        processing_pool.shutdown()
+        await engine.dispose()
+
+
+def run_case(case: Dict[str, Any]) -> Dict[str, Any]:
+    """Entry point of a case process: run one case and attach its peak RSS"""
+    try:
+        result = asyncio.run(_run_case(case))
+    except Exception as e:
+        result = {"error": f"{type(e).__name__}: {e}"}
+    # ru_maxrss is in KiB on Linux; pool workers are reaped by the shutdown above
+    result["peak_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    result["worker_peak_rss_mb"] = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    return result
+
+
+def _prepare_database():
+    """Create the tables on the benchmark database (a no-op where they exist)"""
+    from sqlalchemy import create_engine
+
+    from app.core.config import settings
+    from app.models.document import Base
+
+    engine = create_engine(settings.DATABASE_URL)
+    Base.metadata.create_all(engine)
+    engine.dispose()
+
+
+def build_cases(args, corpus: Dict[str, Dict[str, str]], corpus_dir: Path) -> List[Dict[str, Any]]:
+    common = dict(
+        warmup=args.warmup, repeat=args.repeat, chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap
+    )
+    cases = []
+    if "extraction" in args.groups:
+        for name in FORMATS:
+            for size in args.sizes:
+                cases.append(dict(common, group="extraction", name=f"{name}-{size}", format=name, path=corpus[name][size]))
+    if "split" in args.groups:
+        markdown = corpus["md"][args.split_size]
+        code_path = corpus_dir / f"{args.split_size}.py"
+        code_path.write_text(make_code(SIZES[args.split_size], args.seed), encoding="utf-8")
+        for splitter_type, engine in SPLIT_CASES:
+            for length_function in ("len",) if splitter_type == "token" else LENGTH_FUNCTIONS:
+                cases.append(dict(
+                    common,
+                    group="split",
+                    name=f"{splitter_type}-{engine}-{length_function}",
+                    splitter_type=splitter_type,
+                    engine=engine,
+                    length_function=length_function,
+                    path=str(code_path) if splitter_type == "code" else markdown,
+                ))
+    if "process" in args.groups:
+        for name in FORMATS:
+            cases.append(dict(
+                common, group="process", name=f"{name}-{args.process_size}", format=name,
+                path=corpus[name][args.process_size]
+            ))
+    return cases
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _report_line(case: Dict[str, Any], result: Dict[str, Any]) -> str:
+    label = f"{case['group']:<10} {case['name']:<28}"
+    if "error" in result:
+        return f"{label} error: {result['error'][:100]}"
+    latency = result["latency_ms"]
+    throughput = "  ".join(f"{value:,.1f} {name}" for name, value in result["throughput"].items())
+    return (
+        f"{label} p50 {latency['p50']:9.2f}ms  p99 {latency['p99']:9.2f}ms  {throughput}  "
+        f"rss {result['peak_rss_mb']:.0f}/{result['worker_peak_rss_mb']:.0f} MB"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--groups", nargs="+", choices=list(CASE_RUNNERS), default=list(CASE_RUNNERS))
+    parser.add_argument("--sizes", nargs="+", choices=list(SIZES), default=["small", "medium"])
+    parser.add_argument("--split-size", choices=list(SIZES), default="medium")
+    parser.add_argument("--process-size", choices=list(SIZES), default="medium")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--chunk-overlap", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--corpus-dir", help="keep the generated files here instead of a temporary directory")
+    parser.add_argument("--tokenizer-file", help="tokenizer.json for the huggingface length-function cases")
+    parser.add_argument("--output", help="write the JSON results here instead of stdout")
+    args = parser.parse_args()
+    if args.tokenizer_file:
+        os.environ["HUGGINGFACE_TOKENIZER_PATH"] = os.path.abspath(args.tokenizer_file)
+
+    corpus_dir = Path(args.corpus_dir or tempfile.mkdtemp(prefix="bench-corpus-"))
+    corpus_dir.mkdir(parents=True, exist_ok=True)
+    sizes = sorted(set(args.sizes) | {args.split_size, args.process_size}, key=list(SIZES).index)
+    corpus = generate_corpus(corpus_dir, sizes, args.seed)
+    if "process" in args.groups:
+        _prepare_database()
+
+    results = []
+    # One fresh process per case keeps peak RSS and warm caches from leaking between cases
+    context = multiprocessing.get_context("spawn")
+    for case in build_cases(args, corpus, corpus_dir):
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            try:
+                result = executor.submit(run_case, case).result()
+            except Exception as e:  # the case process died
+                result = {"error": f"{type(e).__name__}: {e}"}
+        print(_report_line(case, result), file=sys.stderr)
+        results.append({key: case[key] for key in ("group", "name")} | {
+            key: case[key] for key in ("format", "splitter_type", "engine", "length_function") if key in case
+        } | result)
+
+    report = {
+        "commit": _git_commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "database": os.environ["DATABASE_URL"].split(":", 1)[0],
+        "parameters": {
+            key: getattr(args, key)
+            for key in ("sizes", "split_size", "process_size", "chunk_size", "chunk_overlap", "repeat", "warmup", "seed")
+        },
+        "results": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Compare the old per-call tiktoken lambda against TokenLengthEngine splitters.
+
+Usage (from services/document-service):
+
+    python -m benchmarks.token_length --paragraphs 2000 --chunk-size 256
+    python -m benchmarks.token_length --tokenizer-file tokenizers/tokenizer.json
+
+Needs the cl100k_base BPE file, either downloadable or already present in
+TIKTOKEN_CACHE_DIR, or a local HuggingFace tokenizer.json passed with
+--tokenizer-file. Both paths must produce identical chunks; the script
+exits non-zero if they do not. A plain ``len`` split is timed for reference.
+"""
+import argparse
+import random
+import sys
+import time
+
+import tiktoken
+from langchain_text_splitters import CharacterTextSplitter, RecursiveCharacterTextSplitter
+
+from app.services.token_length import (
+    HuggingFaceEncoder, TokenAwareCharacterSplitter, TokenAwareRecursiveSplitter, TokenLengthEngine
+)
+
+WORDS = (
+    "the quick brown fox jumps over lazy dog chunking service document token "
+    "splitter overlap paragraph sentence embedding vector retrieval context"
+).split()
+
+
+def make_text(paragraphs: int, seed: int) -> str:
+    rng = random.Random(seed)
+    return "\n\n".join(
+        "\n".join(
+            " ".join(rng.choice(WORDS) for _ in range(rng.randint(4, 40))) + "."
+            for _ in range(rng.randint(1, 8))
+        )
+        for _ in range(paragraphs)
+    )
+
+
+def timed(splitter, text: str):
+    started = time.perf_counter()
+    chunks = splitter.split_text(text)
+    return chunks, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--paragraphs", type=int, default=2000)
+    parser.add_argument("--chunk-size", type=int, default=256)
+    parser.add_argument("--chunk-overlap", type=int, default=32)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--tokenizer-file", help="local HuggingFace tokenizer.json to use instead of tiktoken")
+    args = parser.parse_args()
+
+    if args.tokenizer_file:
+        from tokenizers import Tokenizer
+        encoder = HuggingFaceEncoder(Tokenizer.from_file(args.tokenizer_file))
+    else:
+        encoder = tiktoken.get_encoding("cl100k_base")
+    text = make_text(args.paragraphs, args.seed)
+    options = dict(chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap, keep_separator=False)
+    print(f"{len(text):,} chars, {len(encoder.encode(text)):,} tokens")
+
+    mismatch = False
+    for name, baseline_class, engine_class, extra in (
+        ("recursive", RecursiveCharacterTextSplitter, TokenAwareRecursiveSplitter, {}),
+        ("character", CharacterTextSplitter, TokenAwareCharacterSplitter, {"separator": "\n"}),
+    ):
+        baseline = baseline_class(length_function=lambda t: len(encoder.encode(t)), **options, **extra)
+        engine = TokenLengthEngine(encoder)
+        fast = engine_class(length_function=engine, **options, **extra)
+        expected, baseline_time = timed(baseline, text)
+        actual, engine_time = timed(fast, text)
+        _, len_time = timed(baseline_class(**options, **extra), text)
+        mismatch |= expected != actual
+        print(
+            f"  {name:<10} lambda {baseline_time:7.3f}s  engine {engine_time:7.3f}s  "
+            f"speedup {baseline_time / engine_time:5.1f}x  len {len_time:7.3f}s  chunks {len(actual)}  "
+            f"identical {expected == actual}"
+        )
+    sys.exit(1 if mismatch else 0)
+
+
+if __name__ == "__main__":
+    main()
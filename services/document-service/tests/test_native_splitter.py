@@ -0,0 +1,69 @@
+"""Differential tests of the native splitters against LangChain.
+
+Every separator set, keep_separator mode and both splitter kinds get seeded
+random texts with random chunk sizes and overlaps; the native engine must
+return LangChain's chunks exactly, with spans that slice back to them.
+"""
+import random
+
+import pytest
+from langchain_text_splitters import CharacterTextSplitter, RecursiveCharacterTextSplitter
+
+from app.services.native_splitter import NativeCharacterSplitter, NativeRecursiveSplitter
+from benchmarks.native_splitter import KEEP_SEPARATOR, SEPARATOR_SETS, check_spans, make_text
+
+CASES = 60
+
+
+def _options(rng: random.Random, is_regex: bool, keep_separator) -> dict:
+    chunk_size = rng.randint(1, 120)
+    return dict(
+        chunk_size=chunk_size,
+        chunk_overlap=rng.randint(0, chunk_size),
+        keep_separator=keep_separator,
+        is_separator_regex=is_regex,
+        strip_whitespace=rng.random() < 0.8,
+    )
+
+
+@pytest.mark.parametrize("keep_separator", KEEP_SEPARATOR, ids=repr)
+@pytest.mark.parametrize("separators,is_regex", SEPARATOR_SETS, ids=lambda value: repr(value))
+def test_recursive_matches_langchain(separators, is_regex, keep_separator):
+    rng = random.Random(f"recursive {separators} {keep_separator}")
+    for _ in range(CASES):
+        options = _options(rng, is_regex, keep_separator)
+        text = make_text(rng, rng.randint(0, 120))
+        expected = RecursiveCharacterTextSplitter(separators=separators, **options).split_text(text)
+        chunks, spans = NativeRecursiveSplitter(separators=separators, **options).split_text_with_spans(text)
+        assert chunks == expected, (text, options)
+        assert check_spans(text, chunks, spans), (text, options)
+
+
+@pytest.mark.parametrize("keep_separator", KEEP_SEPARATOR, ids=repr)
+@pytest.mark.parametrize("separators,is_regex", SEPARATOR_SETS, ids=lambda value: repr(value))
+def test_character_matches_langchain(separators, is_regex, keep_separator):
+    separator = separators[0] or "\n"
+    rng = random.Random(f"character {separator} {keep_separator}")
+    for _ in range(CASES):
+        options = _options(rng, is_regex, keep_separator)
+        text = make_text(rng, rng.randint(0, 120))
+        expected = CharacterTextSplitter(separator=separator, **options).split_text(text)
+        chunks, spans = NativeCharacterSplitter(separator=separator, **options).split_text_with_spans(text)
+        assert chunks == expected, (text, options)
+        assert check_spans(text, chunks, spans), (text, options)
+
+
+@pytest.mark.parametrize("keep_separator", [False, True])
+@pytest.mark.parametrize("chunk_overlap", [0, 50, 200])
+def test_large_text_with_overlap(chunk_overlap, keep_separator):
+    rng = random.Random(chunk_overlap)
+    text = "\n\n".join(make_text(rng, rng.randint(20, 200)) for _ in range(200))
+    # Passed explicitly: the native default is False, RecursiveCharacterTextSplitter's is True
+    options = dict(chunk_size=400, chunk_overlap=chunk_overlap, keep_separator=keep_separator)
+    for baseline, native in (
+        (RecursiveCharacterTextSplitter(**options), NativeRecursiveSplitter(**options)),
+        (CharacterTextSplitter(separator="\n", **options), NativeCharacterSplitter(separator="\n", **options)),
+    ):
+        chunks, spans = native.split_text_with_spans(text)
+        assert chunks == baseline.split_text(text)
+        assert check_spans(text, chunks, spans)